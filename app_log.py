@@ -0,0 +1,208 @@
+import atexit
+import datetime
+import glob
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+import config
+from metrics import increment
+
+# 日志目录 (容器内通过 docker-compose 挂载 ./logs:/app/logs 持久化)，设为 None 时只输出到控制台
+DEFAULT_LOG_DIR = "/app/logs"
+LOG_FILE_NAME = "app.log"
+# text: "[时间] 消息" (与原日志格式一致) / json: 每行一个 JSON 对象，包含 run_id 与 symbol
+DEFAULT_LOG_FORMAT = "text"
+# 单个日志文件超过该大小 (字节) 或跨天时轮转，保留最近 DEFAULT_LOG_BACKUP_COUNT 个归档
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 14
+# 待写入队列的容量，写满时丢弃新日志 (只影响文件，控制台输出不受影响)，调用方永不阻塞
+DEFAULT_LOG_QUEUE_SIZE = 10000
+# 后台线程每批最多写入的条数
+LOG_BATCH_SIZE = 500
+
+_STOP = object()
+
+class AsyncLogWriter:
+    """
+    异步日志文件写入：调用方只把记录放入队列，后台线程批量写入并保持文件句柄打开
+    文件超过 max_bytes 或日期变化时轮转为 app.log.<日期>[.<序号>]，超出 backup_count 的旧归档被删除
+    """
+
+    def __init__(self, directory: str, fmt: str = DEFAULT_LOG_FORMAT, max_bytes: int = DEFAULT_LOG_MAX_BYTES,
+                 backup_count: int = DEFAULT_LOG_BACKUP_COUNT, queue_size: int = DEFAULT_LOG_QUEUE_SIZE):
+        self.directory = directory
+        self.path = os.path.join(directory, LOG_FILE_NAME)
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._file = None
+        self._day: Optional[datetime.date] = None
+        self._size = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="log-writer")
+        self._thread.start()
+
+    def submit(self, record: dict):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            increment("log_dropped")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        等待此前提交的日志全部写入文件
+        """
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+    def format(self, record: dict) -> str:
+        if self.fmt == "json":
+            return json.dumps(record, ensure_ascii=False, default=str)
+        return f"[{record['time']}] {record['message']}"
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+        # 重启后沿用已有文件时，以文件最后修改日期判断是否需要按天轮转
+        mtime = os.path.getmtime(self.path) if self._size else None
+        self._day = datetime.date.fromtimestamp(mtime) if mtime else datetime.date.today()
+
+    def _archive_path(self) -> str:
+        base = f"{self.path}.{self._day}"
+        path, index = base, 1
+        while os.path.exists(path):
+            path = f"{base}.{index}"
+            index += 1
+        return path
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        os.replace(self.path, self._archive_path())
+        archives = sorted(glob.glob(glob.escape(self.path) + ".*"), key=os.path.getmtime)
+        for old in archives[:max(0, len(archives) - self.backup_count)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        self._open()
+
+    def _write(self, lines: List[str]):
+        if self._file is None:
+            self._open()
+        data = "\n".join(lines) + "\n"
+        today = datetime.date.today()
+        if self._size and (self._day != today or self._size + len(data.encode("utf-8")) > self.max_bytes):
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data.encode("utf-8"))
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < LOG_BATCH_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = [self.format(item) for item in items if isinstance(item, dict)]
+            if lines:
+                try:
+                    self._write(lines)
+                except Exception as e:
+                    # 写入失败 (例如非容器环境无法创建目录) 时丢弃本批，不影响主流程
+                    print(f"写入日志文件失败: {e}")
+                    self._file = None
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if any(item is _STOP for item in items):
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+_writer: Optional[AsyncLogWriter] = None
+_writer_lock = threading.Lock()
+_run_id: Optional[str] = None
+
+def get_log_writer() -> Optional[AsyncLogWriter]:
+    """
+    获取进程内共享的日志写入器，config.LOG_DIR 变化时重新创建，LOG_DIR 为空时返回 None
+    """
+    global _writer
+    directory = getattr(config, 'LOG_DIR', DEFAULT_LOG_DIR)
+    with _writer_lock:
+        if _writer is not None and _writer.directory != directory:
+            _writer.close()
+            _writer = None
+        if _writer is None and directory:
+            _writer = AsyncLogWriter(
+                directory,
+                fmt=getattr(config, 'LOG_FORMAT', DEFAULT_LOG_FORMAT),
+                max_bytes=getattr(config, 'LOG_MAX_BYTES', DEFAULT_LOG_MAX_BYTES),
+                backup_count=getattr(config, 'LOG_BACKUP_COUNT', DEFAULT_LOG_BACKUP_COUNT),
+                queue_size=getattr(config, 'LOG_QUEUE_SIZE', DEFAULT_LOG_QUEUE_SIZE),
+            )
+        return _writer
+
+def close_log_writer():
+    """
+    写完队列中剩余的日志并关闭文件 (进程退出时自动调用)
+    """
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+atexit.register(close_log_writer)
+
+@contextmanager
+def run_context(run_id: str):
+    """
+    with 代码块内的日志记录 run_id (一次定时任务或盘中刷新)
+    """
+    global _run_id
+    previous, _run_id = _run_id, run_id
+    try:
+        yield
+    finally:
+        _run_id = previous
+
+def log(message, symbol: Optional[str] = None, level: str = "INFO"):
+    """
+    输出到控制台并异步写入日志文件 (不等待磁盘写入)
+    """
+    now = datetime.datetime.now()
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] {message}")
+    writer = get_log_writer()
+    if writer is not None:
+        writer.submit({
+            "time": timestamp,
+            "level": level,
+            "run_id": _run_id,
+            "symbol": symbol,
+            "message": str(message),
+        })
@@ -0,0 +1,382 @@
+"""
+离线性能基准：回放录制的 akshare 数据与预置的 LLM 回复 (可注入延迟)，不访问网络
+
+依次测量 fetch_stock_data / fetch_market_index_data / fetch_financial_news / run_analysis_job，
+输出每个规模下的吞吐量 (股票数/秒)、各阶段 p50/p95 延迟与峰值内存
+
+用法:
+    python benchmark.py                                   # 10/100/1000 只股票
+    python benchmark.py --sizes 10,100 --akshare-latency 0.02 --llm-latency 0.5 --json bench.json
+    python benchmark.py --record 600519                   # 录制真实 akshare 数据作为回放样本 (需要网络)
+
+没有录制样本时使用确定性的合成数据；所有缓存、K 线存储与报告写入临时目录，每次运行都是冷启动
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURE_DIR = os.path.join(ROOT_DIR, "benchmark_fixtures")
+AKSHARE_FIXTURE_FILE = "akshare.pkl"
+LLM_FIXTURE_FILE = "llm.json"
+DEFAULT_SIZES = (10, 100, 1000)
+DEFAULT_AKSHARE_LATENCY = 0.01   # 每次 akshare 请求注入的延迟 (秒)
+DEFAULT_LLM_LATENCY = 0.02       # 每次 LLM 请求注入的延迟 (秒)
+HISTORY_BARS = 250
+BENCH_PROVIDER = "Bench"
+
+if "config" not in sys.modules:
+    # 基准测试不读取包含 API Key 与邮箱授权码的 config.py，统一使用 config.example.py
+    _spec = importlib.util.spec_from_file_location("config", os.path.join(ROOT_DIR, "config.example.py"))
+    _config = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_config)
+    sys.modules["config"] = _config
+
+import app_log
+import config
+import data_fetcher
+import fetch_guard
+import kline_store
+import llm_cache
+import main
+import trade_calendar
+from providers import Provider
+
+DEFAULT_LLM_RESPONSES = {
+    "market": "## 宏观研判\n市场震荡，结构性机会为主。\n<recommended_stocks>[]</recommended_stocks>",
+    "stock": "## 个股结论\n趋势中性，建议观望。",
+}
+
+# ---------- 回放数据 ----------
+
+def _trading_days(count: int) -> pd.DatetimeIndex:
+    return pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=count)
+
+def _synthetic_daily(seed: int, count: int = HISTORY_BARS) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 10 + seed % 90 + np.cumsum(rng.normal(0, 0.2, count))
+    close = np.maximum(close, 1.0)
+    return pd.DataFrame({
+        "date": _trading_days(count).strftime("%Y-%m-%d"),
+        "open": close * 0.99,
+        "high": close * 1.02,
+        "low": close * 0.98,
+        "close": close,
+        "volume": rng.uniform(1e6, 5e6, count).round(),
+    })
+
+def synthetic_fixtures() -> Dict[str, pd.DataFrame]:
+    """
+    确定性的合成样本，字段与 akshare 返回值一致
+    """
+    daily = _synthetic_daily(1)
+    em_daily = daily.rename(columns={'date': '日期', 'open': '开盘', 'close': '收盘', 'high': '最高', 'low': '最低', 'volume': '成交量'})
+    em_daily['成交量'] = em_daily['成交量'] / 100
+    boards = pd.DataFrame({"板块": ["酿酒行业", "银行", "半导体", "医药", "煤炭", "房地产"],
+                           "涨跌幅": [1.2, -0.5, 2.3, 0.4, -1.1, -2.0]})
+    return {
+        "stock_zh_a_daily": daily,
+        "stock_zh_a_hist": em_daily,
+        "stock_zh_index_daily": _synthetic_daily(2),
+        "stock_zh_index_daily_em": em_daily,
+        "stock_individual_info_em": pd.DataFrame({"item": ["股票简称", "行业", "总市值"], "value": ["样本股", "酿酒行业", 2e11]}),
+        "stock_zh_valuation_baidu:市盈率(TTM)": pd.DataFrame({"date": ["2024-01-01"], "value": [25.0]}),
+        "stock_zh_valuation_baidu:市净率": pd.DataFrame({"date": ["2024-01-01"], "value": [8.0]}),
+        "stock_financial_abstract": pd.DataFrame({"选项": ["常用指标"], "指标": ["净资产收益率(ROE)"], "20240930": [24.5]}),
+        "stock_sector_spot": boards,
+        "stock_board_industry_summary_ths": boards,
+        "tool_trade_date_hist_sina": pd.DataFrame({"trade_date": pd.bdate_range(end=pd.Timestamp.today() + pd.Timedelta(days=30), periods=400).date}),
+    }
+
+def _fixture_key(endpoint: str, kwargs: Dict[str, Any]) -> str:
+    indicator = kwargs.get("indicator")
+    return f"{endpoint}:{indicator}" if endpoint == "stock_zh_valuation_baidu" and indicator else endpoint
+
+def load_fixtures(directory: str = DEFAULT_FIXTURE_DIR) -> Dict[str, pd.DataFrame]:
+    """
+    读取录制的 akshare 样本，缺少的接口用合成数据补齐
+    """
+    fixtures = synthetic_fixtures()
+    path = os.path.join(directory, AKSHARE_FIXTURE_FILE)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            fixtures.update(pickle.load(f))
+    return fixtures
+
+def load_llm_responses(directory: str = DEFAULT_FIXTURE_DIR) -> Dict[str, str]:
+    path = os.path.join(directory, LLM_FIXTURE_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return {**DEFAULT_LLM_RESPONSES, **json.load(f)}
+    return dict(DEFAULT_LLM_RESPONSES)
+
+def record_fixtures(symbol: str, index: str = "sh000001", directory: str = DEFAULT_FIXTURE_DIR) -> str:
+    """
+    调用真实 akshare 接口录制一份样本 (需要网络)，回放时所有股票共用这份样本
+    """
+    import akshare as ak
+
+    sina_symbol = data_fetcher.get_sina_symbol(symbol)
+    calls = {
+        "stock_zh_a_daily": lambda: ak.stock_zh_a_daily(symbol=sina_symbol),
+        "stock_zh_a_hist": lambda: ak.stock_zh_a_hist(symbol=symbol, period="daily", adjust=""),
+        "stock_zh_index_daily": lambda: ak.stock_zh_index_daily(symbol=index),
+        "stock_zh_index_daily_em": lambda: ak.stock_zh_index_daily_em(symbol=index),
+        "stock_individual_info_em": lambda: ak.stock_individual_info_em(symbol=symbol),
+        "stock_zh_valuation_baidu:市盈率(TTM)": lambda: ak.stock_zh_valuation_baidu(symbol=symbol, indicator="市盈率(TTM)"),
+        "stock_zh_valuation_baidu:市净率": lambda: ak.stock_zh_valuation_baidu(symbol=symbol, indicator="市净率"),
+        "stock_financial_abstract": lambda: ak.stock_financial_abstract(symbol=symbol),
+        "stock_sector_spot": lambda: ak.stock_sector_spot(indicator="新浪行业"),
+        "stock_board_industry_summary_ths": lambda: ak.stock_board_industry_summary_ths(),
+        "tool_trade_date_hist_sina": lambda: ak.tool_trade_date_hist_sina(),
+    }
+    fixtures = {}
+    for key, fetch in calls.items():
+        try:
+            fixtures[key] = fetch()
+            print(f"已录制 {key}: {len(fixtures[key])} 行")
+        except Exception as e:
+            print(f"录制 {key} 失败，回放时使用合成数据: {e}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, AKSHARE_FIXTURE_FILE)
+    with open(path, "wb") as f:
+        pickle.dump(fixtures, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+class FixtureAkshare:
+    """
+    akshare 替身：按接口返回样本数据 (返回副本，调用方可以原地修改)，每次调用前注入固定延迟
+    """
+
+    def __init__(self, fixtures: Dict[str, pd.DataFrame], latency: float = 0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def __getattr__(self, endpoint: str) -> Callable[..., pd.DataFrame]:
+        if endpoint.startswith("_"):
+            raise AttributeError(endpoint)
+
+        def call(**kwargs):
+            key = _fixture_key(endpoint, kwargs)
+            if key not in self.fixtures:
+                raise AttributeError(f"没有 {key} 的回放样本")
+            if self.latency:
+                time.sleep(self.latency)
+            return self.fixtures[key].copy()
+        return call
+
+# ---------- 计时 ----------
+
+class Recorder:
+    """
+    收集各阶段每次调用的耗时样本
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return wrapper
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "max": float(max(values)),
+            }
+            for stage, values in samples.items() if values
+        }
+
+@contextlib.contextmanager
+def _patched(target, name: str, value):
+    missing = object()
+    original = getattr(target, name, missing)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        if original is missing:
+            delattr(target, name)
+        else:
+            setattr(target, name, original)
+
+@contextlib.contextmanager
+def offline_environment(fixtures: Dict[str, pd.DataFrame], llm_responses: Dict[str, str], symbols: List[str],
+                        akshare_latency: float, llm_latency: float, recorder: Recorder, quiet: bool = True):
+    """
+    将数据获取、LLM 与邮件替换为离线回放，所有磁盘写入重定向到临时目录
+
+    Yields:
+        基准用的 Provider
+    """
+    def analyze_market(market_data_str, news_str, on_chunk=None):
+        time.sleep(llm_latency)
+        return llm_responses["market"]
+
+    def analyze_stock(stock_data_str, on_chunk=None):
+        time.sleep(llm_latency)
+        return llm_responses["stock"]
+
+    provider = Provider(
+        BENCH_PROVIDER,
+        recorder.wrap("llm_call", analyze_market),
+        recorder.wrap("llm_call", analyze_stock),
+        lambda text: [],
+    )
+    with tempfile.TemporaryDirectory(prefix="stock-bench-") as tmp, contextlib.ExitStack() as stack:
+        overrides = {
+            "KLINE_STORE_DIR": os.path.join(tmp, "kline"),
+            "CACHE_DIR": os.path.join(tmp, "cache"),
+            "REPORT_DIR": os.path.join(tmp, "reports"),
+            "METRICS_DIR": None,
+            "METRICS_PROMETHEUS_FILE": None,
+            "OUTBOX_DIR": None,
+            "STOCK_SYMBOLS": list(symbols),
+            "SCREENER_ENABLED": False,
+            "LLM_CACHE_ENABLED": False,
+            "LLM_RATE_LIMITS": {BENCH_PROVIDER: (1e6, 1e6)},
+            "REPORT_MODE": "per_model",
+        }
+        for name, value in overrides.items():
+            stack.enter_context(_patched(config, name, value))
+        stack.enter_context(_patched(config, "LOG_DIR", os.path.join(tmp, "logs")))
+        # 先写完并关闭日志文件，再删除临时目录
+        stack.callback(app_log.close_log_writer)
+        stack.enter_context(_patched(main, "send_email", recorder.wrap("send_email", lambda subject, html: None)))
+        stack.enter_context(_patched(data_fetcher, "ak", FixtureAkshare(fixtures, akshare_latency)))
+        stack.enter_context(_patched(data_fetcher, "call_akshare", recorder.wrap("akshare", data_fetcher.call_akshare)))
+        stack.enter_context(_patched(data_fetcher, "_fetch_single_stock", recorder.wrap("symbol_fetch", data_fetcher._fetch_single_stock)))
+        # 进程内共享的单例在临时目录中重新创建
+        stack.enter_context(_patched(kline_store, "_default_store", None))
+        stack.enter_context(_patched(data_fetcher, "_fundamental_cache", None))
+        stack.enter_context(_patched(data_fetcher, "_host_semaphores", {}))
+        stack.enter_context(_patched(llm_cache, "_llm_cache", None))
+        stack.enter_context(_patched(trade_calendar, "_calendar", None))
+        stack.enter_context(_patched(fetch_guard, "_breakers", {}))
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        yield provider
+
+# ---------- 基准 ----------
+
+def _run_fetch_stages(symbols: List[str], recorder: Recorder):
+    snapshot = data_fetcher.MarketSnapshot()
+    recorder.wrap("fetch_stock_data", data_fetcher.fetch_stock_data)(symbols, snapshot=snapshot)
+    recorder.wrap("fetch_market_index_data", data_fetcher.fetch_market_index_data)(config.MARKET_INDEXES)
+    recorder.wrap("fetch_financial_news", data_fetcher.fetch_financial_news)(snapshot)
+
+def _run_once(fixtures, llm_responses, symbols, akshare_latency, llm_latency, recorder, quiet):
+    """
+    数据获取各阶段与完整任务分别在独立的临时目录中冷启动 (完整任务不复用前面已写入的 K 线与缓存)
+    """
+    with offline_environment(fixtures, llm_responses, symbols, akshare_latency, llm_latency, recorder, quiet):
+        _run_fetch_stages(symbols, recorder)
+    with offline_environment(fixtures, llm_responses, symbols, akshare_latency, llm_latency, recorder, quiet) as provider:
+        recorder.wrap("run_analysis_job", main.run_analysis_job)([provider])
+
+def run_benchmark(size: int, repeat: int = 1, akshare_latency: float = DEFAULT_AKSHARE_LATENCY,
+                  llm_latency: float = DEFAULT_LLM_LATENCY, measure_memory: bool = True,
+                  fixture_dir: str = DEFAULT_FIXTURE_DIR, quiet: bool = True) -> Dict[str, Any]:
+    """
+    对 size 只股票运行 repeat 次完整流程
+
+    Returns:
+        Dict: symbols / throughput (股票数/秒，按 run_analysis_job 计) / stages (各阶段 p50/p95) / peak_memory_mb
+    """
+    fixtures = load_fixtures(fixture_dir)
+    llm_responses = load_llm_responses(fixture_dir)
+    symbols = [f"{600000 + i:06d}" for i in range(size)]
+    recorder = Recorder()
+    for _ in range(repeat):
+        _run_once(fixtures, llm_responses, symbols, akshare_latency, llm_latency, recorder, quiet)
+    stages = recorder.percentiles()
+
+    peak_memory_mb = None
+    if measure_memory:
+        # 单独跑一轮测量内存 (tracemalloc 会明显拖慢执行，不与计时混在一起)
+        tracemalloc.start()
+        try:
+            _run_once(fixtures, llm_responses, symbols, akshare_latency, llm_latency, Recorder(), quiet)
+            peak_memory_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        finally:
+            tracemalloc.stop()
+
+    job_p50 = stages["run_analysis_job"]["p50"]
+    return {
+        "symbols": size,
+        "repeat": repeat,
+        "akshare_latency": akshare_latency,
+        "llm_latency": llm_latency,
+        "throughput": size / job_p50 if job_p50 else None,
+        "stages": stages,
+        "peak_memory_mb": peak_memory_mb,
+    }
+
+def format_result(result: Dict[str, Any]) -> str:
+    lines = [f"=== {result['symbols']} 只股票 (akshare 延迟 {result['akshare_latency']}s, LLM 延迟 {result['llm_latency']}s, 重复 {result['repeat']} 次) ==="]
+    if result["throughput"] is not None:
+        lines.append(f"吞吐量: {result['throughput']:.1f} 只/秒")
+    if result["peak_memory_mb"] is not None:
+        lines.append(f"峰值内存 (tracemalloc): {result['peak_memory_mb']:.1f} MB")
+    lines.append(f"{'阶段':<24}{'次数':>8}{'p50(s)':>12}{'p95(s)':>12}{'max(s)':>12}")
+    for stage, stats in result["stages"].items():
+        lines.append(f"{stage:<24}{stats['count']:>8}{stats['p50']:>12.4f}{stats['p95']:>12.4f}{stats['max']:>12.4f}")
+    return "\n".join(lines)
+
+def main_cli(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="离线性能基准")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="逗号分隔的股票数量")
+    parser.add_argument("--repeat", type=int, default=1, help="每个规模重复运行的次数")
+    parser.add_argument("--akshare-latency", type=float, default=DEFAULT_AKSHARE_LATENCY, help="每次 akshare 请求注入的延迟 (秒)")
+    parser.add_argument("--llm-latency", type=float, default=DEFAULT_LLM_LATENCY, help="每次 LLM 请求注入的延迟 (秒)")
+    parser.add_argument("--no-memory", action="store_true", help="不测量峰值内存")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR, help="回放样本目录")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="显示运行日志")
+    parser.add_argument("--record", metavar="SYMBOL", help="录制该股票的真实 akshare 数据作为回放样本")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        print(f"样本已写入: {record_fixtures(args.record, directory=args.fixtures)}")
+        return
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        result = run_benchmark(size, args.repeat, args.akshare_latency, args.llm_latency,
+                               not args.no_memory, args.fixtures, quiet=not args.verbose)
+        print(format_result(result))
+        results.append(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main_cli()
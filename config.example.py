@@ -12,6 +12,20 @@ SMTP_PASSWORD = "your_email_auth_code"  # 请注意：这里需要填入QQ邮箱
 TO_EMAILS = ["receive1@example.com", "receive2@example.com"] 
 # 保持兼容性
 TO_EMAIL = "receive1@example.com"
+# 每个收件人单独发送一封 (收件人互不可见)，False 时一封邮件发给全部收件人
+MAIL_PER_RECIPIENT = False
+# SMTP 连接池：登录后的连接在多封邮件间复用，最多 SMTP_MAX_CONNECTIONS 个连接并行发送
+SMTP_MAX_CONNECTIONS = 3
+SMTP_TIMEOUT = 30             # 连接/命令超时 (秒)
+SMTP_IDLE_TIMEOUT = 60        # 空闲连接保留时间 (秒)
+SMTP_MAX_RETRIES = 2          # 断开连接、网络错误与 4xx 临时错误的重试次数
+SMTP_RETRY_BASE_DELAY = 1.0   # 重试退避基础时间 (秒)
+# 待发送邮件队列：报告先写入 OUTBOX_DIR 再发送，失败的邮件按退避时间重发 (进程重启后继续)，设为 None 时直接发送
+OUTBOX_DIR = "/app/data/outbox"
+OUTBOX_MAX_ATTEMPTS = 10          # 超过后移入 OUTBOX_DIR/failed/，不再自动重发
+OUTBOX_RETRY_BASE_DELAY = 60      # 第 n 次失败后等待 base * 2^(n-1) 秒
+OUTBOX_RETRY_MAX_DELAY = 3600
+OUTBOX_POLL_INTERVAL = 60         # 后台发送线程的检查间隔 (秒)
 
 # 股票配置
 # 示例：600519 (贵州茅台), 000001 (平安银行)
@@ -21,9 +35,113 @@ STOCK_SYMBOLS = ["600519", "000001"]
 # 000001: 上证指数, 399001: 深证成指, 000300: 沪深300, 399006: 创业板指
 MARKET_INDEXES = ["000001", "399001", "000300", "399006"] 
 
+# 数据获取并发配置
+# 同时处理的股票数量
+FETCH_MAX_WORKERS = 8
+# 每个数据源同时在途的请求数上限，避免触发限流
+FETCH_HOST_LIMITS = {"sina": 4, "eastmoney": 4, "baidu": 2, "ths": 2}
+# 单次请求超时 (秒)，未列出的接口使用 default
+FETCH_TIMEOUTS = {
+    "default": 20,
+    "stock_zh_valuation_baidu": 10,
+    "stock_zh_a_daily": 60,
+    "stock_zh_index_daily": 60,
+    "stock_zh_a_spot_em": 60,
+}
+FETCH_MAX_RETRIES = 2          # 网络错误的重试次数 (超时不重试)
+FETCH_RETRY_BASE_DELAY = 0.5   # 指数退避的基础等待时间 (秒)
+FETCH_BREAKER_THRESHOLD = 3    # 同一接口连续失败多少次后熔断
+FETCH_BREAKER_COOLDOWN = 300   # 熔断持续时间 (秒)，每次运行开始时重置
+
+# 本地 K 线存储 (每个标的一个 .npy 文件，只增量拉取缺失的交易日)
+KLINE_STORE_ENABLED = True
+KLINE_STORE_DIR = "/app/data/kline"
+
+# 基本面数据缓存 (行业/市值、PE/PB、ROE)，有效期单位为秒
+# 行业/市值与 PE/PB 最晚在下一次收盘时失效
+CACHE_DIR = "/app/data/cache"
+FUNDAMENTAL_CACHE_MAX_ENTRIES = 2000
+FUNDAMENTAL_CACHE_TTLS = {
+    "stock_individual_info_em": 12 * 3600,
+    "stock_zh_valuation_baidu": 12 * 3600,
+    "stock_financial_abstract": 30 * 24 * 3600,
+}
+# 交易日历 (akshare tool_trade_date_hist_sina) 的本地缓存有效期 (秒)
+# 周末与节假日使用最近一个交易日的数据，该交易日的报告已生成时跳过整次任务
+TRADE_CALENDAR_TTL = 7 * 24 * 3600
+
+# 全市场筛选 (使用东财全市场快照，筛选出的候选股会加入个股分析)
+SCREENER_ENABLED = False
+SCREENER_FILTERS = {
+    "change_pct": (-3.0, 7.0),
+    "vol_ratio": (1.2, None),
+    "pe": (0.0, 60.0),
+    "pb": (0.0, 10.0),
+    "min_amount": 1e8,
+    "sector_top_n": 0,
+    "limit": 10,
+}
+
+# 参与分析的模型 (可选 "DeepSeek" / "Gemini")，多个模型并行分析并共用一次数据获取
+LLM_PROVIDERS = ["DeepSeek"]
+REPORT_MODE = "per_model"   # per_model: 每个模型单独发送一份报告 / combined: 合并为一份报告
+
+# LLM 客户端连接池 (每个 provider 进程内只创建一个客户端并复用连接)
+LLM_POOL_SIZE = 10
+LLM_TIMEOUT = 300          # 单次请求超时 (秒)
+LLM_CONNECT_TIMEOUT = 10   # 建立连接超时 (秒)
+
+# 个股并发分析 (同时在途的请求数、每个 provider 的限流与重试)
+LLM_MAX_IN_FLIGHT = 4
+LLM_RATE_LIMITS = {
+    # provider: (每秒请求数, 突发容量)
+    "DeepSeek": (1.0, 4),
+    "Gemini": (0.5, 2),
+}
+LLM_MAX_RETRIES = 3          # 遇到 429 / 5xx / 超时时的最大重试次数
+LLM_RETRY_BASE_DELAY = 2.0   # 指数退避的基础等待时间 (秒)
+LLM_BATCH_SIZE = 1           # 每次请求合并分析的股票数 (>1 开启批量模式，解析失败的股票回退为单只分析)
+
+# 流式输出：边接收边写入报告目录 (每个章节一个文件)，并提前识别宏观分析中的推荐股票
+LLM_STREAM = True
+REPORT_DIR = "/app/data/reports"
+
+# 每次调用的输入 token 预算 (只计算数据部分)，超出时依次取整数字、减少历史行情行数、删除低价值字段、截断
+LLM_INPUT_TOKEN_BUDGETS = {
+    "stock": 1500,
+    "market": 2000,
+    "news": 2500,
+}
+
+# LLM 响应缓存 (输入与提示词模板完全相同时直接返回上次的分析结果)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_TTL = 3 * 86400    # 缓存有效期 (秒)
+LLM_CACHE_MAX_ENTRIES = 500
+
+# 运行指标 (各阶段/akshare 接口/模型调用/邮件发送的耗时，重试、缓存命中与失败次数)
+# 每次运行写入 METRICS_DIR/<交易日>_<开始时间>.json；配置 METRICS_PROMETHEUS_FILE 时同时写出 Prometheus 文本格式
+METRICS_DIR = "/app/data/metrics"
+METRICS_PROMETHEUS_FILE = None   # 例如 "/app/data/metrics/stock_assistant.prom" (供 node_exporter textfile collector 读取)
+
+# 运行日志 (后台线程批量写入 LOG_DIR/app.log，超过大小或跨天时轮转为 app.log.<日期>)，LOG_DIR 设为 None 时只输出到控制台
+LOG_DIR = "/app/logs"
+LOG_FORMAT = "text"              # text: "[时间] 消息" / json: 每行一个 JSON 对象 (time/level/run_id/symbol/message)
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 14            # 保留的归档文件数
+LOG_QUEUE_SIZE = 10000           # 待写入队列容量，写满时丢弃 (控制台输出不受影响)
+
 # 定时任务配置
 SCHEDULE_TIME = "18:00"
 
+# 盘中刷新 (交易时段内定时获取实时行情，增量更新均线与量比，只对信号明显变化的股票重新分析)
+INTRADAY_ENABLED = False
+INTRADAY_INTERVAL_MINUTES = 15
+INTRADAY_SESSIONS = [("09:30", "11:30"), ("13:00", "15:00")]
+INTRADAY_THRESHOLDS = {
+    "change_pct": 1.0,   # 涨跌幅变化 (百分点)
+    "vol_ratio": 0.5,    # 量比变化
+}
+
 # gemini 模型配置
 GEMINI_MODEL = "xxx"
 GEMINI_API_KEY = "xxx"
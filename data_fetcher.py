@@ -2,7 +2,82 @@ import akshare as ak
 import pandas as pd
 import datetime
 import os
-from typing import Dict, Any, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import config
+from kline_store import get_kline_store, MARKET_CLOSE_TIME
+from ttl_cache import TTLCache, DEFAULT_CACHE_DIR
+from indicators import compute_indicators, volume_status, MA_WINDOWS, MA_STATE_LABELS
+from trade_calendar import get_trade_calendar
+from fetch_guard import guarded_call, first_available
+from metrics import span
+from records import Bar, StockRecord, IndexRecord, STATUS_ERROR, STATUS_NO_DATA
+
+# 并发获取配置的默认值 (可在 config.py 中通过 FETCH_MAX_WORKERS / FETCH_HOST_LIMITS 覆盖)
+DEFAULT_FETCH_MAX_WORKERS = 8
+DEFAULT_HOST_LIMIT = 4
+DEFAULT_FETCH_HOST_LIMITS = {
+    "sina": 4,
+    "eastmoney": 4,
+    "baidu": 2,
+    "ths": 2,
+}
+
+# akshare 接口 -> 数据源 host，用于按 host 限制并发
+ENDPOINT_HOSTS = {
+    "stock_zh_a_daily": "sina",
+    "stock_zh_index_daily": "sina",
+    "stock_sector_spot": "sina",
+    "stock_financial_abstract": "sina",
+    "stock_individual_info_em": "eastmoney",
+    "stock_zh_a_spot_em": "eastmoney",
+    "stock_zh_a_hist": "eastmoney",
+    "stock_zh_index_daily_em": "eastmoney",
+    "stock_board_industry_name_em": "eastmoney",
+    "stock_board_industry_cons_em": "eastmoney",
+    "stock_zh_valuation_baidu": "baidu",
+    "stock_board_industry_summary_ths": "ths",
+    "tool_trade_date_hist_sina": "sina",
+}
+
+# 单只股票需要并发发起的子请求数量 (K线、基本信息、PE、PB、财务摘要)
+SUB_REQUESTS_PER_SYMBOL = 5
+
+# 变化缓慢的基本面数据的缓存有效期 (秒)，可在 config.py 中通过 FUNDAMENTAL_CACHE_TTLS 覆盖
+DEFAULT_FUNDAMENTAL_CACHE_TTLS = {
+    "stock_individual_info_em": 12 * 3600,        # 行业/市值，每日更新
+    "stock_zh_valuation_baidu": 12 * 3600,        # PE/PB，每日收盘后更新
+    "stock_financial_abstract": 30 * 24 * 3600,   # 财务摘要 (ROE)，按季度披露
+}
+# 随每日收盘变化的数据：缓存最晚在下一次收盘时失效，盘中获取的值不会带到收盘后的运行
+DAILY_CLOSE_ENDPOINTS = {"stock_individual_info_em", "stock_zh_valuation_baidu"}
+
+_host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_host_semaphores_lock = threading.Lock()
+
+def _get_host_semaphore(host: str) -> threading.BoundedSemaphore:
+    """
+    获取 (必要时创建) 指定 host 的并发信号量
+    """
+    with _host_semaphores_lock:
+        sem = _host_semaphores.get(host)
+        if sem is None:
+            limits = getattr(config, 'FETCH_HOST_LIMITS', DEFAULT_FETCH_HOST_LIMITS)
+            limit = limits.get(host, DEFAULT_HOST_LIMIT)
+            sem = threading.BoundedSemaphore(max(1, int(limit)))
+            _host_semaphores[host] = sem
+        return sem
+
+def call_akshare(endpoint: str, **kwargs):
+    """
+    调用 akshare 接口的统一入口：按数据源 host 限制同时在途的请求数，
+    并按接口设置超时、重试网络错误、连续失败时熔断 (见 fetch_guard)
+    """
+    host = ENDPOINT_HOSTS.get(endpoint, endpoint)
+    with span("akshare", endpoint=endpoint):
+        return guarded_call(endpoint, lambda: getattr(ak, endpoint)(**kwargs), semaphore=_get_host_semaphore(host))
 
 def get_sina_symbol(code: str) -> str:
     """
@@ -17,247 +92,486 @@ def get_sina_symbol(code: str) -> str:
     else:
         return code
 
-def fetch_sector_map() -> Dict[str, float]:
+class MarketSnapshot:
+    """
+    单次运行内共享的市场快照
+    行业板块数据 (新浪行业、同花顺行业) 只下载一次，两个来源并发获取，
+    同时供相对强弱计算 (fetch_sector_map) 和板块涨跌榜 (fetch_financial_news) 使用
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.sina_boards: Optional[pd.DataFrame] = None
+        self.ths_boards: Optional[pd.DataFrame] = None
+        self.errors: Dict[str, Exception] = {}
+        self._sector_matcher: Optional["SectorMatcher"] = None
+
+    def load(self) -> "MarketSnapshot":
+        """
+        获取行业板块数据 (多次调用只会下载一次)
+        """
+        with self._lock:
+            if self._loaded:
+                return self
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="market-snapshot") as pool:
+                futures = {
+                    "sina": pool.submit(call_akshare, "stock_sector_spot", indicator="新浪行业"),
+                    "ths": pool.submit(call_akshare, "stock_board_industry_summary_ths"),
+                }
+                results = {}
+                for source, future in futures.items():
+                    try:
+                        results[source] = future.result()
+                    except Exception as e:
+                        results[source] = None
+                        self.errors[source] = e
+            self.sina_boards = results["sina"]
+            self.ths_boards = results["ths"]
+            self._loaded = True
+            return self
+
+    def sector_matcher(self) -> "SectorMatcher":
+        """
+        获取基于本次快照构建的行业匹配索引 (只构建一次)
+        """
+        self.load()
+        with self._lock:
+            if self._sector_matcher is None:
+                self._sector_matcher = SectorMatcher(fetch_sector_map(self))
+            return self._sector_matcher
+
+def _boards_to_series(boards: Optional[pd.DataFrame], col_name: str = '涨跌幅', keep: str = 'last') -> pd.Series:
+    """
+    将板块 DataFrame 转换为 {板块: 涨跌幅} Series (列运算，无逐行遍历)
+    keep: 同名板块保留哪一条 ('first' / 'last')
+    """
+    if boards is None or boards.empty or '板块' not in boards.columns or col_name not in boards.columns:
+        return pd.Series(dtype='float64')
+    values = pd.to_numeric(boards[col_name], errors='coerce')
+    series = pd.Series(values.to_numpy(dtype='float64'), index=boards['板块'].astype(str))
+    series = series[series.notna()]
+    return series[~series.index.duplicated(keep=keep)]
+
+def fetch_sector_map(snapshot: Optional[MarketSnapshot] = None) -> Dict[str, float]:
     """
     获取行业板块涨跌幅数据，用于计算相对强弱
+    Args:
+        snapshot: 本次运行共享的市场快照，未传入时单独获取
     Returns: {sector_name: change_percent}
     """
-    sector_map = {}
+    snapshot = (snapshot or MarketSnapshot()).load()
     
-    # 尝试 1: 新浪行业
+    # 1: 新浪行业
+    # 逐行写入 dict，同名板块以最后一条为准
+    sina_series = _boards_to_series(snapshot.sina_boards, keep='last')
+    # 2: 同花顺行业 (总是尝试获取，以补充新浪数据的不足，新浪已覆盖的板块不覆盖)
+    # 只在板块未出现过时写入，同名板块以第一条为准
+    ths_series = _boards_to_series(snapshot.ths_boards, keep='first')
+    ths_series = ths_series[~ths_series.index.isin(sina_series.index)]
+            
+    return pd.concat([sina_series, ths_series]).to_dict()
+
+class SectorMatcher:
+    """
+    行业名称 -> 板块涨跌幅 的匹配索引
+    匹配规则与原先的线性扫描一致：精确匹配 -> 去除 "行业" 后精确匹配 -> 包含匹配 (取板块列表中最靠前的一个)
+    - 精确匹配与去后缀匹配直接查 dict：O(1)
+    - 包含匹配：板块名 2-gram 倒排索引 + 行业名子串查表，避免遍历全部板块
+    - 每个行业名的匹配结果会被缓存
+    """
+
+    def __init__(self, sector_map: Dict[str, float]):
+        self.sector_map = sector_map
+        self.names: List[str] = list(sector_map.keys())
+        self._position = {name: i for i, name in enumerate(self.names)}
+        self._bigrams: Dict[str, set] = {}
+        for i, name in enumerate(self.names):
+            if len(name) >= 2:
+                for j in range(len(name) - 1):
+                    self._bigrams.setdefault(name[j:j + 2], set()).add(i)
+        self._memo: Dict[str, Optional[str]] = {}
+        self._memo_lock = threading.Lock()
+
+    def _match_contains(self, industry: str) -> Optional[str]:
+        # 避免过于宽泛的匹配 (如 "车" 匹配 "汽车")，要求至少2个字且包含
+        if len(industry) < 2:
+            return None
+        candidates = set()
+        # a) 板块名是行业名的子串：枚举行业名的所有子串查表
+        for i in range(len(industry)):
+            for j in range(i + 2, len(industry) + 1):
+                pos = self._position.get(industry[i:j])
+                if pos is not None:
+                    candidates.add(pos)
+        # b) 行业名是板块名的子串：板块需包含行业名的全部 2-gram，再逐个确认
+        postings = [self._bigrams.get(industry[j:j + 2], set()) for j in range(len(industry) - 1)]
+        for pos in set.intersection(*postings) if postings else set():
+            if industry in self.names[pos]:
+                candidates.add(pos)
+        if not candidates:
+            return None
+        return self.names[min(candidates)]
+
+    def match_name(self, industry: str) -> Optional[str]:
+        """
+        返回与行业名匹配的板块名，找不到时返回 None
+        """
+        with self._memo_lock:
+            if industry in self._memo:
+                return self._memo[industry]
+        # 1. 精确匹配
+        if industry in self.sector_map:
+            matched = industry
+        else:
+            # 2. 去除 "行业" 后缀 (e.g., "酿酒行业" -> "酿酒")，否则 3. 包含匹配
+            simple_name = industry.replace("行业", "")
+            matched = simple_name if simple_name in self.sector_map else self._match_contains(industry)
+        with self._memo_lock:
+            self._memo[industry] = matched
+        return matched
+
+    def match(self, industry: str) -> Optional[Tuple[str, float]]:
+        """
+        返回 (板块名, 板块涨跌幅)，找不到时返回 None
+        """
+        name = self.match_name(industry)
+        if name is None:
+            return None
+        return name, self.sector_map[name]
+
+_fundamental_cache: Optional[TTLCache] = None
+_fundamental_cache_lock = threading.Lock()
+
+def get_fundamental_cache() -> TTLCache:
+    """
+    获取基本面数据缓存 (进程内共享，磁盘目录可在容器重启后保留)
+    """
+    global _fundamental_cache
+    with _fundamental_cache_lock:
+        if _fundamental_cache is None:
+            _fundamental_cache = TTLCache(
+                "fundamentals",
+                root=getattr(config, 'CACHE_DIR', DEFAULT_CACHE_DIR),
+                max_entries=getattr(config, 'FUNDAMENTAL_CACHE_MAX_ENTRIES', 2000),
+            )
+        return _fundamental_cache
+
+def _next_market_close(now: datetime.datetime) -> datetime.datetime:
+    """
+    返回 now 之后最近的一次收盘时间
+    """
+    close = datetime.datetime.combine(now.date(), MARKET_CLOSE_TIME)
+    if now >= close:
+        close += datetime.timedelta(days=1)
+    return close
+
+def _cached_ak_call(endpoint: str, **kwargs):
+    """
+    带 TTL 缓存的 akshare 调用，用于基本信息、估值、财务摘要等变化缓慢的数据
+    空结果不写入缓存，下次运行会重新请求
+    """
+    ttls = getattr(config, 'FUNDAMENTAL_CACHE_TTLS', DEFAULT_FUNDAMENTAL_CACHE_TTLS)
+    ttl = ttls.get(endpoint, DEFAULT_FUNDAMENTAL_CACHE_TTLS.get(endpoint))
+    if not ttl:
+        return call_akshare(endpoint, **kwargs)
+    now = datetime.datetime.now()
+    expires_at = now + datetime.timedelta(seconds=ttl)
+    if endpoint in DAILY_CLOSE_ENDPOINTS:
+        expires_at = min(expires_at, _next_market_close(now))
+    key = (endpoint, tuple(sorted(kwargs.items())))
+    return get_fundamental_cache().get_or_fetch(
+        key,
+        lambda: call_akshare(endpoint, **kwargs),
+        expires_at=expires_at.timestamp(),
+        should_cache=lambda df: df is not None and not df.empty,
+    )
+
+# 东财日线成交量单位为 "手" (100 股)，Sina 为 "股"，存入本地 K 线前统一换算为股
+EM_VOLUME_LOT_SIZE = 100
+# 东财全量历史的起始日期
+FULL_HISTORY_START = "19900101"
+
+def _em_daily_to_sina(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    将东财日线转换为 Sina 日线的列名与成交量单位
+    """
+    if df is None or df.empty:
+        return df
+    df = df.rename(columns={'日期': 'date', '开盘': 'open', '收盘': 'close', '最高': 'high', '最低': 'low', '成交量': 'volume'})
+    df['volume'] = pd.to_numeric(df['volume'], errors='coerce') * EM_VOLUME_LOT_SIZE
+    return df
+
+def _fetch_stock_range(symbol: str, sina_symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    按区间获取个股日线 (东财接口在服务端按日期过滤，只传输所需的几根 K 线)
+    失败时退回 Sina 接口
+    """
+    return first_available([
+        ("东财日线", lambda: _em_daily_to_sina(call_akshare(
+            "stock_zh_a_hist", symbol=symbol, period="daily", start_date=start_date, end_date=end_date, adjust=""))),
+        ("Sina 日线", lambda: call_akshare("stock_zh_a_daily", symbol=sina_symbol, start_date=start_date, end_date=end_date)),
+    ])
+
+def _fetch_stock_full(symbol: str, sina_symbol: str) -> pd.DataFrame:
+    """
+    获取个股全部历史日线 (Sina)，失败时退回东财
+    """
+    return first_available([
+        ("Sina 日线", lambda: call_akshare("stock_zh_a_daily", symbol=sina_symbol)),
+        ("东财日线", lambda: _em_daily_to_sina(call_akshare(
+            "stock_zh_a_hist", symbol=symbol, period="daily", start_date=FULL_HISTORY_START,
+            end_date=datetime.date.today().strftime("%Y%m%d"), adjust=""))),
+    ])
+
+def _fetch_stock_daily(symbol: str, sina_symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    获取个股日线：本地无数据时用全量历史初始化，之后只从网络补齐缺失的尾部交易日
+    """
+    return get_kline_store().get_daily(
+        sina_symbol, start_date, end_date,
+        fetch_range=lambda s, e: _fetch_stock_range(symbol, sina_symbol, s, e),
+        fetch_full=lambda: _fetch_stock_full(symbol, sina_symbol),
+    )
+
+def _fetch_index_range(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    按区间获取指数日线 (东财接口支持区间查询，失败时退回 Sina 全量历史)
+    """
+    return first_available([
+        ("东财指数日线", lambda: _em_daily_to_sina(call_akshare(
+            "stock_zh_index_daily_em", symbol=symbol, start_date=start_date, end_date=end_date))),
+        ("Sina 指数日线", lambda: call_akshare("stock_zh_index_daily", symbol=symbol)),
+    ])
+
+def _fetch_index_full(symbol: str) -> pd.DataFrame:
+    """
+    获取指数全部历史日线 (Sina)，失败时退回东财
+    """
+    return first_available([
+        ("Sina 指数日线", lambda: call_akshare("stock_zh_index_daily", symbol=symbol)),
+        ("东财指数日线", lambda: _em_daily_to_sina(call_akshare(
+            "stock_zh_index_daily_em", symbol=symbol, start_date=FULL_HISTORY_START,
+            end_date=datetime.date.today().strftime("%Y%m%d")))),
+    ])
+
+def _fetch_index_daily(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    获取指数日线：本地无数据时用全量历史初始化，之后只增量追加
+    """
+    return get_kline_store().get_daily(
+        symbol, start_date, end_date,
+        fetch_range=lambda s, e: _fetch_index_range(symbol, s, e),
+        fetch_full=lambda: _fetch_index_full(symbol),
+    )
+
+def _to_float(value) -> Optional[float]:
     try:
-        bk_flow = ak.stock_sector_spot(indicator="新浪行业")
-        if bk_flow is not None and not bk_flow.empty:
-            col_name = '涨跌幅' if '涨跌幅' in bk_flow.columns else None
-            if col_name:
-                for _, row in bk_flow.iterrows():
-                    sector_map[row['板块']] = float(row[col_name])
-    except:
-        pass
-        
-    # 尝试 2: 同花顺行业 (总是尝试获取，以补充新浪数据的不足)
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _history_range() -> Tuple[str, str]:
+    """
+    返回最近一年的日线区间，截止到最近一个交易日 (周末与节假日使用上一交易日，本地 K 线已覆盖时不再访问网络)
+    """
+    session = get_trade_calendar().last_session(datetime.date.today())
+    return (session - datetime.timedelta(days=365)).strftime("%Y%m%d"), session.strftime("%Y%m%d")
+
+def _parse_stock_info(info_df, symbol: str):
+    """
+    解析个股基本信息 (股票简称、行业、总市值 (元)，未知时为 None)
+    """
+    stock_name = symbol
+    industry = "未知"
+    total_mv = None
+    if info_df is not None and not info_df.empty:
+        # item, value
+        info_dict = dict(zip(info_df['item'], info_df['value']))
+        stock_name = info_dict.get('股票简称', symbol)
+        industry = info_dict.get('行业', '未知')
+        mv = info_dict.get('总市值', 0)
+        if isinstance(mv, (int, float)) and mv > 0:
+            total_mv = float(mv)
+    return stock_name, industry, total_mv
+
+def _parse_valuation(val_df) -> Optional[float]:
+    """
+    解析百度估值序列，取最新一期的值
+    """
+    if val_df is not None and not val_df.empty:
+        return _to_float(val_df.iloc[-1]['value'])
+    return None
+
+def _parse_roe(fin_df) -> Tuple[Optional[float], Optional[str]]:
+    """
+    从财务摘要中查找最近一期 ROE，返回 (ROE(%), 报告期)
+    """
+    if fin_df is None or fin_df.empty:
+        return None, None
+    # 尝试找到 "净资产收益率" 相关行
+    roe_row = fin_df[fin_df['指标'].str.contains('净资产收益率', na=False)]
+    if not roe_row.empty:
+        # 取最近一期的数据 (列名通常是日期，且降序排列或第一列之后)
+        # 列结构: 选项, 指标, date1, date2...
+        # 假设第3列开始是最近的日期
+        if len(roe_row.columns) > 2:
+            # 取第一个日期列的值
+            val = _to_float(roe_row.iloc[0, 2])
+            date_col = roe_row.columns[2]
+            if val is not None:
+                return val, str(date_col)
+    return None, None
+
+def _parse_result(future, parse, default, label: str):
+    """
+    获取子请求结果并解析，失败时打印原因并返回 default (基本面字段缺失不影响其余数据)
+    """
+    try:
+        return parse(future.result())
+    except Exception as e:
+        print(f"{label} 获取失败，按未知处理: {e}")
+        return default
+
+def _cancel_pending(futures: list):
+    """
+    取消尚未开始执行的子请求，避免无效代码/停牌股占用各 host 的并发额度
+    """
+    for future in futures:
+        future.cancel()
+
+def _fetch_single_stock(symbol: str, sector_matcher: SectorMatcher, start_date: str, end_date: str, io_pool: ThreadPoolExecutor) -> StockRecord:
+    """
+    获取单只股票的数据，返回 StockRecord (提示词文本在分析前由 render() 生成)
+    K 线、基本信息、估值、财务等子请求互相独立，统一提交到 io_pool 并发执行
+    K 线为空或获取失败时，尚未开始的基本面子请求会被取消 (已在执行的无法中断)
+    """
+    fundamental_futures = []
     try:
-        bk_ths = ak.stock_board_industry_summary_ths()
-        if bk_ths is not None and not bk_ths.empty:
-             for _, row in bk_ths.iterrows():
-                 # THS usually has '板块' and '涨跌幅'
-                 name = row['板块']
-                 val = float(row['涨跌幅'])
-                 # 如果新浪没覆盖该板块，则添加
-                 if name not in sector_map:
-                     sector_map[name] = val
-    except:
-        pass
+        sina_symbol = get_sina_symbol(symbol)
+        daily_future = io_pool.submit(_fetch_stock_daily, symbol, sina_symbol, start_date, end_date)
+        info_future = io_pool.submit(_cached_ak_call, "stock_individual_info_em", symbol=symbol)
+        # 注意：百度估值接口可能稍慢
+        pe_future = io_pool.submit(_cached_ak_call, "stock_zh_valuation_baidu", symbol=symbol, indicator="市盈率(TTM)")
+        pb_future = io_pool.submit(_cached_ak_call, "stock_zh_valuation_baidu", symbol=symbol, indicator="市净率")
+        fin_future = io_pool.submit(_cached_ak_call, "stock_financial_abstract", symbol=symbol)
+        fundamental_futures = [info_future, pe_future, pb_future, fin_future]
+
+        # --- 1. 获取历史 K 线数据 (Sina) ---
+        df = daily_future.result()
+
+        if df is not None and not df.empty:
+            # --- 2. 获取个股基本信息 (行业、市值) ---
+            stock_name, industry, total_mv = _parse_result(
+                info_future, lambda df: _parse_stock_info(df, symbol), (symbol, "未知", None), f"{symbol} 基本信息")
+
+            # --- 3. 获取估值数据 (PE-TTM, PB) ---
+            pe_ttm = _parse_result(pe_future, _parse_valuation, None, f"{symbol} PE(TTM)")
+            pb = _parse_result(pb_future, _parse_valuation, None, f"{symbol} PB")
+
+            # --- 4. 获取财务指标 (ROE) ---
+            roe, roe_period = _parse_result(fin_future, _parse_roe, (None, None), f"{symbol} 财务摘要")
+
+            # 数据处理: Sina 返回 columns: date, open, high, low, close, volume...
+            df.rename(columns={'date': '日期', 'close': '收盘', 'volume': '成交量'}, inplace=True)
+            df['收盘'] = pd.to_numeric(df['收盘'])
+            df['成交量'] = pd.to_numeric(df['成交量'])
+            
+            # 计算均线、涨跌幅、量比、均线形态 (批量指标引擎，单只股票即 1 行矩阵)
+            ind = compute_indicators(df['收盘'].to_numpy(dtype='f8'), df['成交量'].to_numpy(dtype='f8'))
+            for w in MA_WINDOWS:
+                df[f'MA{w}'] = ind[f'MA{w}'][0]
             
-    return sector_map
+            hist = df.tail(5)
+            latest = df.iloc[-1]
+            
+            # --- 5. 匹配同业板块 (相对强弱在渲染时计算) ---
+            matched = sector_matcher.match(industry)
+            sector, sector_change = matched if matched is not None else (None, None)
+
+            vol_ratio = float(ind['vol_ratio'][0])
+            return StockRecord(
+                symbol=symbol,
+                name=stock_name,
+                industry=industry,
+                total_mv=total_mv,
+                pe_ttm=pe_ttm,
+                pb=pb,
+                roe=roe,
+                roe_period=roe_period,
+                sector=sector,
+                sector_change=sector_change,
+                close=float(latest['收盘']),
+                change_pct=float(ind['change_pct'][0]),
+                ma5=float(latest['MA5']),
+                ma20=float(latest['MA20']),
+                ma60=float(latest['MA60']),
+                ma_state_label=MA_STATE_LABELS[int(ind['ma_state'][0])],
+                volume_label=volume_status(vol_ratio),
+                vol_ratio=vol_ratio,
+                history=tuple(
+                    Bar(str(row['日期']), float(row['收盘']), float(row['成交量']), float(row['MA5']), float(row['MA20']))
+                    for _, row in hist.iterrows()
+                ),
+            )
+        else:
+            _cancel_pending(fundamental_futures)
+            return StockRecord.failed(symbol, STATUS_NO_DATA)
 
-def fetch_stock_data(symbols: list) -> Dict[str, Any]:
+    except Exception as e:
+        _cancel_pending(fundamental_futures)
+        return StockRecord.failed(symbol, STATUS_ERROR, str(e))
+
+def fetch_stock_data(symbols: list, max_workers: Optional[int] = None, snapshot: Optional[MarketSnapshot] = None) -> Dict[str, StockRecord]:
     """
     获取股票数据 (使用 akshare 库获取数据，切换为 Sina 接口)
     增加：行业、估值(PE/PB)、基本面(ROE)、同业相对强弱
+    多只股票并发获取，单只股票的各子请求也并发获取，输出顺序与 symbols 一致
     
     Args:
         symbols: 股票代码列表 (如 "600519", "000001")
+        max_workers: 同时处理的股票数量，默认读取 config.FETCH_MAX_WORKERS
+        snapshot: 本次运行共享的市场快照，用于复用行业板块数据
         
     Returns:
-        Dict: 包含每个股票的数据字典
+        Dict: {symbol: StockRecord}，获取失败的股票 status 不为 ok
     """
     stock_data = {}
+    if not symbols:
+        return stock_data
+
+    if max_workers is None:
+        max_workers = getattr(config, 'FETCH_MAX_WORKERS', DEFAULT_FETCH_MAX_WORKERS)
+    max_workers = max(1, int(max_workers))
     
     # 提前获取行业板块数据，用于后续查找
-    sector_map = fetch_sector_map()
+    sector_matcher = (snapshot or MarketSnapshot()).sector_matcher()
     
-    now = datetime.datetime.now()
-    # 如果是周末，使用周五的日期
-    if now.weekday() == 5:  # 周六
-        now = now - datetime.timedelta(days=1)
-    elif now.weekday() == 6:  # 周日
-        now = now - datetime.timedelta(days=2)
+    start_date, end_date = _history_range()
 
-    start_date = (now - datetime.timedelta(days=365)).strftime("%Y%m%d")
-    end_date = now.strftime("%Y%m%d")
+    # 两级线程池：symbol_pool 负责按股票分发，io_pool 只执行单个 akshare 请求 (不会互相等待，避免死锁)
+    # 每个 host 的并发数由 call_akshare 内的信号量控制
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch-symbol") as symbol_pool, \
+         ThreadPoolExecutor(max_workers=max_workers * SUB_REQUESTS_PER_SYMBOL, thread_name_prefix="fetch-io") as io_pool:
+        futures = [
+            symbol_pool.submit(_fetch_single_stock, symbol, sector_matcher, start_date, end_date, io_pool)
+            for symbol in symbols
+        ]
+        # 按输入顺序收集结果，保证输出顺序确定
+        for symbol, future in zip(symbols, futures):
+            stock_data[symbol] = future.result()
 
-    for symbol in symbols:
-        try:
-            # --- 1. 获取历史 K 线数据 (Sina) ---
-            sina_symbol = get_sina_symbol(symbol)
-            df = ak.stock_zh_a_daily(symbol=sina_symbol, start_date=start_date, end_date=end_date)
-            
-            if df is not None and not df.empty:
-                # 基础信息变量
-                stock_name = symbol
-                industry = "未知"
-                total_mv = "未知"
-                pe_ttm = "未知"
-                pb = "未知"
-                roe = "未知"
-                relative_strength_msg = "无法计算 (行业数据缺失)"
-                
-                # --- 2. 获取个股基本信息 (行业、市值) ---
-                try:
-                    info_df = ak.stock_individual_info_em(symbol=symbol)
-                    if not info_df.empty:
-                        # item, value
-                        info_dict = dict(zip(info_df['item'], info_df['value']))
-                        stock_name = info_dict.get('股票简称', symbol)
-                        industry = info_dict.get('行业', '未知')
-                        mv = info_dict.get('总市值', 0)
-                        if isinstance(mv, (int, float)) and mv > 0:
-                            total_mv = f"{mv / 100000000:.2f}亿"
-                except:
-                    pass
-
-                # --- 3. 获取估值数据 (PE-TTM, PB) ---
-                try:
-                    # 使用百度估值接口 (返回历史序列，取最新)
-                    # 注意：该接口可能稍慢
-                    val_pe = ak.stock_zh_valuation_baidu(symbol=symbol, indicator="市盈率(TTM)")
-                    if not val_pe.empty:
-                        pe_ttm = val_pe.iloc[-1]['value']
-                    
-                    val_pb = ak.stock_zh_valuation_baidu(symbol=symbol, indicator="市净率")
-                    if not val_pb.empty:
-                        pb = val_pb.iloc[-1]['value']
-                except:
-                    pass
-                
-                # --- 4. 获取财务指标 (ROE) ---
-                try:
-                    fin_df = ak.stock_financial_abstract(symbol=symbol)
-                    # 查找 ROE
-                    if not fin_df.empty:
-                        # 尝试找到 "净资产收益率" 相关行
-                        roe_row = fin_df[fin_df['指标'].str.contains('净资产收益率', na=False)]
-                        if not roe_row.empty:
-                            # 取最近一期的数据 (列名通常是日期，且降序排列或第一列之后)
-                            # 列结构: 选项, 指标, date1, date2...
-                            # 假设第3列开始是最近的日期
-                            if len(roe_row.columns) > 2:
-                                # 取第一个日期列的值
-                                val = roe_row.iloc[0, 2]
-                                date_col = roe_row.columns[2]
-                                roe = f"{val}% ({date_col})"
-                except:
-                    pass
-
-                # 数据处理: Sina 返回 columns: date, open, high, low, close, volume...
-                df.rename(columns={'date': '日期', 'close': '收盘', 'volume': '成交量'}, inplace=True)
-                df['收盘'] = pd.to_numeric(df['收盘'])
-                df['成交量'] = pd.to_numeric(df['成交量'])
-                
-                # 计算均线
-                df['MA5'] = df['收盘'].rolling(window=5).mean()
-                df['MA10'] = df['收盘'].rolling(window=10).mean()
-                df['MA20'] = df['收盘'].rolling(window=20).mean()
-                df['MA60'] = df['收盘'].rolling(window=60).mean()
-                
-                hist = df.tail(5)
-                
-                # 关键指标分析
-                latest = df.iloc[-1]
-                prev = df.iloc[-2]
-                change_percent = (latest['收盘'] - prev['收盘']) / prev['收盘'] * 100
-                
-                # --- 5. 计算同业相对强弱 ---
-                matched_sector_name = None
-                matched_sector_change = 0.0
-                
-                # 1. 精确匹配
-                if industry in sector_map:
-                    matched_sector_name = industry
-                    matched_sector_change = sector_map[industry]
-                
-                # 2. 模糊匹配 (如果精确匹配失败)
-                if matched_sector_name is None:
-                    # 尝试去除 "行业" 后缀 (e.g., "酿酒行业" -> "酿酒")
-                    simple_name = industry.replace("行业", "")
-                    if simple_name in sector_map:
-                         matched_sector_name = simple_name
-                         matched_sector_change = sector_map[simple_name]
-                    else:
-                        # 尝试包含匹配
-                        for s_name in sector_map:
-                            # 避免过于宽泛的匹配 (如 "车" 匹配 "汽车")，要求至少2个字且包含
-                            if len(s_name) >= 2 and len(industry) >= 2:
-                                if industry in s_name or s_name in industry:
-                                    matched_sector_name = s_name
-                                    matched_sector_change = sector_map[s_name]
-                                    break
-                
-                if matched_sector_name:
-                    sector_change = matched_sector_change
-                    rel_strength = change_percent - sector_change
-                    status = "强于" if rel_strength > 0 else "弱于"
-                    # 如果匹配的板块名与原名不同，显示在括号里
-                    display_sector = industry
-                    if matched_sector_name != industry:
-                        display_sector = f"{industry}/{matched_sector_name}"
-                        
-                    relative_strength_msg = f"个股 {change_percent:.2f}% vs 行业({matched_sector_name}) {sector_change:.2f}% -> {status}板块 {abs(rel_strength):.2f}%"
-                else:
-                    relative_strength_msg = f"行业({industry}) 数据未找到，无法对比"
-
-                # --- 构造输出 ---
-                data_str = f"股票名称: {stock_name} ({symbol})\n"
-                data_str += f"【基本面概况】\n"
-                data_str += f"- 所属行业: {industry}\n"
-                data_str += f"- 总市值: {total_mv}\n"
-                data_str += f"- 估值水平: PE(TTM)={pe_ttm}, PB={pb}\n"
-                data_str += f"- 财务质量: 最近ROE={roe}\n"
-                data_str += f"- 同业相对强弱: {relative_strength_msg}\n\n"
-                
-                data_str += "【近期行情】 (Date, Open, High, Low, Close, Volume, MA5, MA20):\n"
-                
-                for _, row in hist.iterrows():
-                    date_str = row['日期']
-                    data_str += f"{date_str}: C={row['收盘']:.2f}, V={row['成交量']}, MA5={row['MA5']:.2f}, MA20={row['MA20']:.2f}\n"
-                
-                
-                # 均线位置
-                ma_status = ""
-                if not pd.isna(latest['MA5']) and not pd.isna(latest['MA10']) and not pd.isna(latest['MA20']):
-                    if latest['收盘'] > latest['MA5'] > latest['MA10'] > latest['MA20']:
-                        ma_status = "均线多头排列 (强势)"
-                    elif latest['收盘'] < latest['MA5'] < latest['MA10'] < latest['MA20']:
-                        ma_status = "均线空头排列 (弱势)"
-                    else:
-                        ma_status = "均线纠缠 (震荡)"
-                else:
-                    ma_status = "数据不足计算均线"
-                
-                # 量能分析
-                vol_status = "未知"
-                vol_ratio = 0.0
-                if not pd.isna(latest['成交量']):
-                    vol_ma5 = df['成交量'].rolling(window=5).mean().iloc[-1]
-                    if vol_ma5 > 0:
-                        vol_ratio = latest['成交量'] / vol_ma5
-                        vol_status = "放量" if vol_ratio > 1.2 else ("缩量" if vol_ratio < 0.8 else "平量")
-                
-                data_str += f"\n【当前状态】\n"
-                data_str += f"- 收盘价: {latest['收盘']:.2f} (涨跌: {change_percent:.2f}%)\n"
-                data_str += f"- 均线形态: {ma_status}\n"
-                data_str += f"- 量能状态: {vol_status} (量比: {vol_ratio:.2f})\n"
-                
-                # Handle potential NaN in MAs
-                ma5_val = f"{latest['MA5']:.2f}" if not pd.isna(latest['MA5']) else "N/A"
-                ma20_val = f"{latest['MA20']:.2f}" if not pd.isna(latest['MA20']) else "N/A"
-                ma60_val = f"{latest['MA60']:.2f}" if not pd.isna(latest['MA60']) else "N/A"
-                
-                data_str += f"- MA位置: MA5={ma5_val}, MA20={ma20_val}, MA60={ma60_val}\n"
-                
-                stock_data[symbol] = data_str
-            else:
-                stock_data[symbol] = f"无法获取 {symbol} 的数据 (可能代码错误或停牌)"
-                
-        except Exception as e:
-            stock_data[symbol] = f"获取 {symbol} 数据时出错: {str(e)}"
+    cache_stats = get_fundamental_cache().stats()
+    print(f"基本面缓存: 命中 {cache_stats['hits']} 次, 未命中 {cache_stats['misses']} 次, 条目 {cache_stats['size']}")
             
     return stock_data
 
-def fetch_market_index_data(indexes: list) -> Dict[str, Any]:
+def fetch_market_index_data(indexes: list) -> Dict[str, IndexRecord]:
     """
     获取大盘指数数据 (切换为 Sina 接口)
+
+    Returns:
+        Dict: {原指数代码: IndexRecord}
     """
     # 映射指数代码到 Sina 格式
     mapped_indexes = []
@@ -275,22 +589,14 @@ def fetch_market_index_data(indexes: list) -> Dict[str, Any]:
         
     stock_data = {}
     
-    now = datetime.datetime.now()
-    # 如果是周末，使用周五的日期
-    if now.weekday() == 5:  # 周六
-        now = now - datetime.timedelta(days=1)
-    elif now.weekday() == 6:  # 周日
-        now = now - datetime.timedelta(days=2)
-
-    start_date = (now - datetime.timedelta(days=365)).strftime("%Y%m%d")
-    end_date = now.strftime("%Y%m%d")
+    start_date, end_date = _history_range()
     print(f"获取大盘指数数据，时间范围：{start_date} 至 {end_date}")
     for symbol in mapped_indexes:
         original_symbol = index_map.get(symbol, symbol)
         try:
             # akshare 指数接口: stock_zh_index_daily (Sina)
-            # symbol like sh000001
-            df = ak.stock_zh_index_daily(symbol=symbol)
+            # symbol like sh000001，本地存储已是最新时不访问网络
+            df = _fetch_index_daily(symbol, start_date, end_date)
             
             if df is not None and not df.empty:
                 # Sina index returns: date, open, high, low, close, volume
@@ -300,37 +606,36 @@ def fetch_market_index_data(indexes: list) -> Dict[str, Any]:
                 df['成交量'] = pd.to_numeric(df['成交量'])
                 
                 hist = df.tail(5)
-                
-                data_str = f"指数代码: {original_symbol} ({symbol})\n"
-                data_str += "【近期走势】:\n"
-                
-                for _, row in hist.iterrows():
-                    data_str += f"{row['日期']}: C={row['收盘']:.2f}, V={row['成交量']}\n"
-                    
                 latest = df.iloc[-1]
                 prev = df.iloc[-2]
                 change_percent = (latest['收盘'] - prev['收盘']) / prev['收盘'] * 100
                 
-                data_str += f"今日涨跌: {change_percent:.2f}%\n"
-                
-                stock_data[original_symbol] = data_str
+                stock_data[original_symbol] = IndexRecord(
+                    symbol=original_symbol,
+                    sina_symbol=symbol,
+                    change_pct=float(change_percent),
+                    history=tuple(Bar(str(row['日期']), float(row['收盘']), float(row['成交量'])) for _, row in hist.iterrows()),
+                )
             else:
-                stock_data[original_symbol] = f"无法获取指数 {original_symbol} 数据"
+                stock_data[original_symbol] = IndexRecord(original_symbol, symbol, status=STATUS_NO_DATA)
         except Exception as e:
-            stock_data[original_symbol] = f"获取指数 {original_symbol} 出错: {str(e)}"
+            stock_data[original_symbol] = IndexRecord(original_symbol, symbol, status=STATUS_ERROR, error=str(e))
             
     return stock_data
 
-def fetch_financial_news() -> str:
+def fetch_financial_news(snapshot: Optional[MarketSnapshot] = None) -> str:
     """
     获取最近的财经新闻 / 行业板块表现 (切换为 Sina 接口，增加 THS 备选)
+    Args:
+        snapshot: 本次运行共享的市场快照，未传入时单独获取
     """
+    snapshot = (snapshot or MarketSnapshot()).load()
     news_str = ""
     found_data = False
     
     # 尝试 1: 新浪行业
     try:
-        bk_flow = ak.stock_sector_spot(indicator="新浪行业")
+        bk_flow = snapshot.sina_boards
         if bk_flow is not None and not bk_flow.empty:
             col_name = '涨跌幅' if '涨跌幅' in bk_flow.columns else None
             if col_name:
@@ -347,13 +652,15 @@ def fetch_financial_news() -> str:
                     val = row[col_name]
                     news_str += f"- {row['板块']}: {val}%\n"
                 found_data = True
-    except:
-        pass
+    except Exception as e:
+        print(f"解析新浪行业数据出错，尝试同花顺: {e}")
         
     # 尝试 2: 同花顺行业 (如果新浪失败)
-    if not found_data:
+    if not found_data and "ths" in snapshot.errors:
+        news_str += f"获取市场概况备选源出错: {str(snapshot.errors['ths'])}"
+    elif not found_data:
         try:
-            bk_ths = ak.stock_board_industry_summary_ths()
+            bk_ths = snapshot.ths_boards
             if bk_ths is not None and not bk_ths.empty:
                 # THS columns: 序号, 板块, 涨跌幅, ...
                 top_bk = bk_ths.sort_values(by='涨跌幅', ascending=False).head(5)
@@ -380,11 +687,12 @@ if __name__ == "__main__":
     indexes = ["000001", "399001"] 
     index_data = fetch_market_index_data(indexes)
     for symbol, info in index_data.items():
-        print(info)
+        print(info.render())
+    snapshot = MarketSnapshot()
     print("\n--- 测试个股 ---")
-    stock_data = fetch_stock_data(["600519"])
+    stock_data = fetch_stock_data(["600519"], snapshot=snapshot)
     for symbol, info in stock_data.items():
-        print(info)
+        print(info.render())
 
     print("\n--- 测试市场概况 ---")
-    print(fetch_financial_news())
+    print(fetch_financial_news(snapshot))
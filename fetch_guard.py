@@ -0,0 +1,213 @@
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from metrics import increment
+
+# 单次请求超时 (秒)，可在 config.py 中通过 FETCH_TIMEOUTS 按接口覆盖，未列出的接口使用 default
+DEFAULT_FETCH_TIMEOUTS = {
+    "default": 20,
+    "stock_zh_valuation_baidu": 10,      # 百度估值接口较慢，超时后直接放弃 (PE/PB 缺失不影响分析)
+    "stock_zh_a_daily": 60,              # 全量历史日线 (仅本地 K 线初始化时使用)
+    "stock_zh_index_daily": 60,
+    "stock_zh_a_spot_em": 60,            # 全市场快照
+}
+# 网络错误的重试次数与退避基础时间 (秒)，超时不重试 (慢接口重试只会成倍放大等待)
+DEFAULT_FETCH_MAX_RETRIES = 2
+DEFAULT_FETCH_RETRY_BASE_DELAY = 0.5
+# 熔断：同一接口连续失败达到阈值后，在冷却时间内直接失败，不再发起请求
+DEFAULT_FETCH_BREAKER_THRESHOLD = 3
+DEFAULT_FETCH_BREAKER_COOLDOWN = 300
+
+# 可重试的异常：网络错误 (requests 的异常均继承自 OSError) 与响应解析失败 (JSONDecodeError 继承自 ValueError)
+RETRYABLE_EXCEPTIONS = (OSError, ValueError)
+
+class FetchError(Exception):
+    """
+    数据接口调用失败
+    """
+
+    def __init__(self, endpoint: str, message: str):
+        super().__init__(f"{endpoint}: {message}")
+        self.endpoint = endpoint
+
+class FetchTimeout(FetchError):
+    pass
+
+class CircuitOpenError(FetchError):
+    pass
+
+class CircuitBreaker:
+    """
+    按接口统计连续失败次数，达到阈值后熔断 cooldown 秒
+    冷却结束后放行一次试探请求：成功则恢复，失败则再次熔断
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.cooldown:
+                return False
+            # 半开：只放行一次试探，其余请求继续等待下一个冷却周期
+            self.opened_at = now
+            self.failures = self.threshold - 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> bool:
+        """
+        记录一次失败，返回本次是否触发熔断
+        """
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                opened = self.opened_at is None
+                self.opened_at = time.monotonic()
+                return opened
+            return False
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                getattr(config, 'FETCH_BREAKER_THRESHOLD', DEFAULT_FETCH_BREAKER_THRESHOLD),
+                getattr(config, 'FETCH_BREAKER_COOLDOWN', DEFAULT_FETCH_BREAKER_COOLDOWN),
+            )
+            _breakers[endpoint] = breaker
+        return breaker
+
+def reset_breakers():
+    """
+    每次运行开始时清空熔断状态 (上一次运行中失败的接口重新尝试)
+    """
+    with _breakers_lock:
+        _breakers.clear()
+
+def open_breakers() -> List[str]:
+    """
+    返回当前处于熔断状态的接口
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.items())
+    return [endpoint for endpoint, breaker in breakers if breaker.is_open]
+
+def get_timeout(endpoint: str) -> float:
+    timeouts = {**DEFAULT_FETCH_TIMEOUTS, **getattr(config, 'FETCH_TIMEOUTS', {})}
+    return timeouts.get(endpoint, timeouts["default"])
+
+def _run_with_timeout(func: Callable[[], Any], timeout: float, release: Optional[Callable[[], None]] = None) -> Any:
+    """
+    在守护线程中执行 func，超过 timeout 秒后不再等待 (akshare 接口本身不支持设置超时)
+    release 在 func 真正结束后调用，超时放弃的请求仍占用 host 并发额度直到结束
+    """
+    future: Future = Future()
+
+    def run():
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            if release is not None:
+                release()
+
+    threading.Thread(target=run, daemon=True, name="fetch-call").start()
+    return future.result(timeout=timeout)
+
+def guarded_call(endpoint: str, func: Callable[[], Any], semaphore: Optional[threading.BoundedSemaphore] = None,
+                 timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                 base_delay: Optional[float] = None) -> Any:
+    """
+    带超时、重试与熔断的接口调用
+
+    Args:
+        endpoint: 接口名称，用于超时配置与熔断统计
+        func: 实际发起请求的函数
+        semaphore: 可选，请求期间占用的 host 并发额度
+
+    Raises:
+        CircuitOpenError: 接口处于熔断状态
+        FetchTimeout: 请求超时
+        其他异常: 重试后仍失败时抛出最后一次的异常
+    """
+    if timeout is None:
+        timeout = get_timeout(endpoint)
+    if max_retries is None:
+        max_retries = getattr(config, 'FETCH_MAX_RETRIES', DEFAULT_FETCH_MAX_RETRIES)
+    if base_delay is None:
+        base_delay = getattr(config, 'FETCH_RETRY_BASE_DELAY', DEFAULT_FETCH_RETRY_BASE_DELAY)
+    breaker = get_breaker(endpoint)
+
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            increment("fetch_rejected", endpoint=endpoint)
+            raise CircuitOpenError(endpoint, "连续失败，已熔断")
+        release = None
+        if semaphore is not None:
+            semaphore.acquire()
+            release = semaphore.release
+        try:
+            result = _run_with_timeout(func, timeout, release)
+        except FutureTimeoutError:
+            increment("fetch_timeouts", endpoint=endpoint)
+            error: Exception = FetchTimeout(endpoint, f"请求超时 ({timeout}s)")
+        except Exception as e:
+            error = e
+        else:
+            breaker.record_success()
+            return result
+
+        retryable = isinstance(error, RETRYABLE_EXCEPTIONS) and not isinstance(error, FetchError)
+        if retryable and attempt < max_retries:
+            attempt += 1
+            increment("fetch_retries", endpoint=endpoint)
+            time.sleep(base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+            continue
+        increment("fetch_failures", endpoint=endpoint)
+        if breaker.record_failure():
+            increment("fetch_breaker_opened", endpoint=endpoint)
+            print(f"数据接口 {endpoint} 连续失败，熔断 {breaker.cooldown:.0f} 秒: {error}")
+        raise error
+
+def first_available(attempts: List[Tuple[str, Callable[[], Any]]]) -> Any:
+    """
+    按顺序尝试多个数据源，返回第一个成功的结果，全部失败时抛出最后一个异常
+
+    Args:
+        attempts: [(数据源名称, 获取函数), ...]
+    """
+    last_error: Optional[Exception] = None
+    for index, (source, fetch) in enumerate(attempts):
+        try:
+            return fetch()
+        except Exception as e:
+            last_error = e
+            if index + 1 < len(attempts) and not isinstance(e, CircuitOpenError):
+                print(f"数据源 {source} 获取失败，切换备选源: {e}")
+    raise last_error
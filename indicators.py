@@ -0,0 +1,115 @@
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+
+# 均线周期
+MA_WINDOWS = (5, 10, 20, 60)
+VOLUME_MA_WINDOW = 5
+
+# 均线形态编码
+MA_STATE_UNKNOWN = -2   # 数据不足计算均线
+MA_STATE_BEAR = -1      # 空头排列
+MA_STATE_MIXED = 0      # 纠缠
+MA_STATE_BULL = 1       # 多头排列
+
+MA_STATE_LABELS = {
+    MA_STATE_BULL: "均线多头排列 (强势)",
+    MA_STATE_BEAR: "均线空头排列 (弱势)",
+    MA_STATE_MIXED: "均线纠缠 (震荡)",
+    MA_STATE_UNKNOWN: "数据不足计算均线",
+}
+
+def stack_right_aligned(series_list: Sequence[Sequence[float]], length: int = None) -> np.ndarray:
+    """
+    将多只股票各自的序列按最后一根 K 线右对齐，拼成 (股票数, 长度) 的二维数组，左侧不足部分填 NaN
+    每一行按各自的交易日排列 (停牌日不占位)，滚动窗口语义与逐只股票 rolling() 一致
+    """
+    if length is None:
+        length = max((len(s) for s in series_list), default=0)
+    matrix = np.full((len(series_list), length), np.nan)
+    for i, series in enumerate(series_list):
+        values = np.asarray(series, dtype='f8')[-length:] if length else np.empty(0)
+        if len(values):
+            matrix[i, length - len(values):] = values
+    return matrix
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    沿最后一维计算滚动均值，窗口内有 NaN 时结果为 NaN (与 pandas rolling(window).mean() 一致)
+    """
+    values = np.atleast_2d(np.asarray(values, dtype='f8'))
+    out = np.full(values.shape, np.nan)
+    n = values.shape[1]
+    if window <= 0 or n < window:
+        return out
+    missing = np.isnan(values)
+    zeros = np.zeros((values.shape[0], 1))
+    sums = np.concatenate([zeros, np.cumsum(np.where(missing, 0.0, values), axis=1)], axis=1)
+    counts = np.concatenate([zeros, np.cumsum(missing, axis=1)], axis=1)
+    window_sums = sums[:, window:] - sums[:, :-window]
+    window_missing = counts[:, window:] - counts[:, :-window]
+    out[:, window - 1:] = np.where(window_missing == 0, window_sums / window, np.nan)
+    return out
+
+def ma_state(close: np.ndarray, ma5: np.ndarray, ma10: np.ndarray, ma20: np.ndarray) -> np.ndarray:
+    """
+    根据收盘价与 MA5/MA10/MA20 判断均线形态 (逐元素)，返回 MA_STATE_* 编码
+    """
+    state = np.full(np.shape(close), MA_STATE_MIXED, dtype='i1')
+    with np.errstate(invalid='ignore'):
+        bull = (close > ma5) & (ma5 > ma10) & (ma10 > ma20)
+        bear = (close < ma5) & (ma5 < ma10) & (ma10 < ma20)
+    state[bull] = MA_STATE_BULL
+    state[bear] = MA_STATE_BEAR
+    state[np.isnan(ma5) | np.isnan(ma10) | np.isnan(ma20)] = MA_STATE_UNKNOWN
+    return state
+
+def compute_indicators(close: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    对 (股票数, 交易日) 的收盘价/成交量矩阵一次性计算全部技术指标
+
+    Returns:
+        Dict:
+            MA5/MA10/MA20/MA60, VOL_MA5: 与输入同形状的矩阵
+            change_pct: 每只股票最新一日涨跌幅 (%)
+            vol_ratio: 每只股票最新量比 (最新成交量 / 5 日均量)，无法计算时为 NaN
+            ma_state: 每只股票最新均线形态编码 (MA_STATE_*)
+    """
+    close = np.atleast_2d(np.asarray(close, dtype='f8'))
+    volume = np.atleast_2d(np.asarray(volume, dtype='f8'))
+    result = {f"MA{w}": rolling_mean(close, w) for w in MA_WINDOWS}
+    result["VOL_MA5"] = rolling_mean(volume, VOLUME_MA_WINDOW)
+
+    n = close.shape[1]
+    latest_close = close[:, -1] if n else np.full(close.shape[0], np.nan)
+    prev_close = close[:, -2] if n >= 2 else np.full(close.shape[0], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result["change_pct"] = (latest_close - prev_close) / prev_close * 100
+        latest_volume = volume[:, -1] if n else np.full(volume.shape[0], np.nan)
+        vol_ma5 = result["VOL_MA5"][:, -1] if n else np.full(volume.shape[0], np.nan)
+        result["vol_ratio"] = np.where(vol_ma5 > 0, latest_volume / vol_ma5, np.nan)
+
+    if n:
+        result["ma_state"] = ma_state(latest_close, result["MA5"][:, -1], result["MA10"][:, -1], result["MA20"][:, -1])
+    else:
+        result["ma_state"] = np.full(close.shape[0], MA_STATE_UNKNOWN, dtype='i1')
+    return result
+
+def volume_status(vol_ratio: float) -> str:
+    """
+    根据量比给出量能状态
+    """
+    if np.isnan(vol_ratio):
+        return "未知"
+    return "放量" if vol_ratio > 1.2 else ("缩量" if vol_ratio < 0.8 else "平量")
+
+def compute_board(frames: Dict[str, Tuple[Sequence[float], Sequence[float]]], length: int = None) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    对多只股票 {symbol: (收盘价序列, 成交量序列)} 一次性计算指标，用于整板块筛选
+
+    Returns:
+        (symbols, indicators)，indicators 中每行与 symbols 顺序一致
+    """
+    symbols = list(frames.keys())
+    close = stack_right_aligned([frames[s][0] for s in symbols], length)
+    volume = stack_right_aligned([frames[s][1] for s in symbols], close.shape[1])
+    return symbols, compute_indicators(close, volume)
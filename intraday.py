@@ -0,0 +1,215 @@
+import datetime
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from indicators import compute_indicators, ma_state, volume_status, MA_WINDOWS, VOLUME_MA_WINDOW
+from trade_calendar import TradeCalendar, get_trade_calendar
+
+# 盘中刷新配置的默认值 (可在 config.py 中覆盖)
+DEFAULT_INTRADAY_INTERVAL_MINUTES = 15
+DEFAULT_INTRADAY_SESSIONS = [("09:30", "11:30"), ("13:00", "15:00")]
+# 与上次分析时相比，信号变化超过阈值才重新调用 AI 分析
+DEFAULT_INTRADAY_THRESHOLDS = {
+    "change_pct": 1.0,   # 涨跌幅变化 (百分点)
+    "vol_ratio": 0.5,    # 量比变化
+}
+# 构建盘中状态时读取的历史日线天数 (自然日，需覆盖 MA60)
+HISTORY_DAYS = 120
+# 东财快照的成交量单位为手
+SPOT_VOLUME_UNIT = 100
+
+@dataclass(slots=True)
+class Signals:
+    """
+    某一时刻的技术信号
+    """
+    price: float
+    change_pct: float
+    vol_ratio: float
+    ma: Dict[int, float]
+    ma_state: int
+
+    @property
+    def volume_label(self) -> str:
+        return volume_status(self.vol_ratio)
+
+@dataclass(slots=True)
+class SymbolState:
+    """
+    单只股票的盘中增量计算状态：只保存 session 之前已完成的 K 线
+    每个均线周期 w 维护最近 w-1 根收盘价之和，盘中每次刷新只需加上最新价，计算量与历史长度无关
+    """
+    symbol: str
+    session: datetime.date
+    prev_close: float
+    closes: Deque[float] = field(default_factory=lambda: deque(maxlen=max(MA_WINDOWS) - 1))
+    volumes: Deque[float] = field(default_factory=lambda: deque(maxlen=VOLUME_MA_WINDOW - 1))
+    close_sums: Dict[int, float] = field(default_factory=dict)
+    volume_sum: float = 0.0
+
+    @classmethod
+    def from_history(cls, symbol: str, session: datetime.date, closes: Sequence[float], volumes: Sequence[float]) -> "SymbolState":
+        state = cls(symbol=symbol, session=session, prev_close=float(closes[-1]) if len(closes) else math.nan)
+        state.closes.extend(float(c) for c in closes)
+        state.volumes.extend(float(v) for v in volumes)
+        history = list(state.closes)
+        for w in MA_WINDOWS:
+            state.close_sums[w] = sum(history[-(w - 1):]) if w > 1 else 0.0
+        state.volume_sum = sum(state.volumes)
+        return state
+
+    def update(self, price: float, volume: float) -> Signals:
+        """
+        用最新价与当日累计成交量计算盘中信号 (O(1))
+        """
+        ma = {}
+        for w in MA_WINDOWS:
+            ma[w] = (self.close_sums[w] + price) / w if len(self.closes) >= w - 1 else math.nan
+        vol_ma = (self.volume_sum + volume) / VOLUME_MA_WINDOW if len(self.volumes) >= VOLUME_MA_WINDOW - 1 else math.nan
+        vol_ratio = volume / vol_ma if vol_ma > 0 else math.nan
+        change_pct = (price - self.prev_close) / self.prev_close * 100 if self.prev_close else math.nan
+        state = int(ma_state(np.float64(price), np.float64(ma[5]), np.float64(ma[10]), np.float64(ma[20])))
+        return Signals(price, change_pct, vol_ratio, ma, state)
+
+def baseline_signals(closes: Sequence[float], volumes: Sequence[float]) -> Optional[Signals]:
+    """
+    最后一根已完成 K 线的信号 (即收盘后日报分析时看到的信号)，作为当日首次比较的基准
+    """
+    if len(closes) == 0:
+        return None
+    ind = compute_indicators(np.asarray(closes, dtype='f8'), np.asarray(volumes, dtype='f8'))
+    return Signals(
+        float(closes[-1]),
+        float(ind['change_pct'][0]),
+        float(ind['vol_ratio'][0]),
+        {w: float(ind[f'MA{w}'][0, -1]) for w in MA_WINDOWS},
+        int(ind['ma_state'][0]),
+    )
+
+def _differs(old: float, new: float, threshold: float) -> bool:
+    if math.isnan(old) or math.isnan(new):
+        return math.isnan(old) != math.isnan(new)
+    return abs(new - old) >= threshold
+
+def signals_changed(old: Optional[Signals], new: Signals, thresholds: Optional[Dict[str, float]] = None) -> bool:
+    """
+    均线形态或量能状态改变，或涨跌幅/量比的变化超过阈值
+    """
+    if old is None:
+        return True
+    thresholds = {**DEFAULT_INTRADAY_THRESHOLDS, **(thresholds or {})}
+    return (
+        old.ma_state != new.ma_state
+        or old.volume_label != new.volume_label
+        or _differs(old.change_pct, new.change_pct, thresholds["change_pct"])
+        or _differs(old.vol_ratio, new.vol_ratio, thresholds["vol_ratio"])
+    )
+
+def load_daily_history(symbol: str, session: datetime.date) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    读取 session 之前已完成的日线 (本地 K 线存储，只增量拉取缺失的交易日)
+    """
+    from data_fetcher import _fetch_stock_daily, get_sina_symbol
+
+    end = get_trade_calendar().last_session(session - datetime.timedelta(days=1))
+    start = end - datetime.timedelta(days=HISTORY_DAYS)
+    df = _fetch_stock_daily(symbol, get_sina_symbol(symbol), start.strftime("%Y%m%d"), end.strftime("%Y%m%d"))
+    if df is None or df.empty:
+        return np.empty(0), np.empty(0)
+    df = df[pd.to_datetime(df['date']).dt.date < session]
+    return pd.to_numeric(df['close']).to_numpy(dtype='f8'), pd.to_numeric(df['volume']).to_numpy(dtype='f8')
+
+def spot_quotes(spot: pd.DataFrame) -> Dict[str, Tuple[float, float]]:
+    """
+    将 screener.load_spot_snapshot() 的全市场快照转换为 {代码: (最新价, 当日累计成交量(股))}
+    """
+    if spot is None or spot.empty or "price" not in spot.columns or "volume" not in spot.columns:
+        return {}
+    quotes = {}
+    for code, price, volume in zip(spot["code"], spot["price"], spot["volume"]):
+        if pd.notna(price) and pd.notna(volume) and price > 0:
+            quotes[str(code)] = (float(price), float(volume) * SPOT_VOLUME_UNIT)
+    return quotes
+
+def _parse_time(value: str) -> datetime.time:
+    return datetime.datetime.strptime(value, "%H:%M").time()
+
+def in_trading_session(now: datetime.datetime, sessions: Optional[List[Tuple[str, str]]] = None,
+                       calendar: Optional[TradeCalendar] = None) -> bool:
+    """
+    判断 now 是否处于交易时段 (交易日的连续竞价时间)
+    """
+    if not (calendar or get_trade_calendar()).is_trading_day(now.date()):
+        return False
+    if sessions is None:
+        sessions = getattr(config, 'INTRADAY_SESSIONS', DEFAULT_INTRADAY_SESSIONS)
+    current = now.time()
+    return any(_parse_time(start) <= current <= _parse_time(end) for start, end in sessions)
+
+class IntradayTracker:
+    """
+    盘中刷新状态：每只股票的增量指标状态，以及上次 AI 分析时的信号
+    每个交易日首次刷新时从本地日线构建状态，之后每次刷新只用最新报价做 O(1) 更新
+    """
+
+    def __init__(self, thresholds: Optional[Dict[str, float]] = None,
+                 load_history: Callable[[str, datetime.date], Tuple[Sequence[float], Sequence[float]]] = load_daily_history):
+        self.thresholds = thresholds
+        self.load_history = load_history
+        self._states: Dict[str, SymbolState] = {}
+        self._analyzed: Dict[str, Signals] = {}
+        self._latest: Dict[str, Signals] = {}
+
+    def _state(self, symbol: str, session: datetime.date) -> Optional[SymbolState]:
+        state = self._states.get(symbol)
+        if state is None or state.session != session:
+            closes, volumes = self.load_history(symbol, session)
+            if len(closes) == 0:
+                return None
+            state = self._states[symbol] = SymbolState.from_history(symbol, session, closes, volumes)
+            # 新交易日：以上一交易日收盘后的信号为比较基准
+            self._analyzed[symbol] = baseline_signals(closes, volumes)
+        return state
+
+    def refresh(self, symbols: List[str], quotes: Dict[str, Tuple[float, float]], session: datetime.date) -> List[str]:
+        """
+        用最新报价更新信号
+
+        Returns:
+            List: 信号变化超过阈值、需要重新分析的股票 (顺序与 symbols 一致)
+        """
+        thresholds = self.thresholds
+        if thresholds is None:
+            thresholds = getattr(config, 'INTRADAY_THRESHOLDS', DEFAULT_INTRADAY_THRESHOLDS)
+        changed = []
+        for symbol in symbols:
+            quote = quotes.get(symbol)
+            if quote is None:
+                continue
+            try:
+                state = self._state(symbol, session)
+            except Exception as e:
+                print(f"构建 {symbol} 盘中状态失败: {e}")
+                continue
+            if state is None:
+                continue
+            signals = self._latest[symbol] = state.update(*quote)
+            if signals_changed(self._analyzed.get(symbol), signals, thresholds):
+                changed.append(symbol)
+        return changed
+
+    def latest(self, symbol: str) -> Optional[Signals]:
+        return self._latest.get(symbol)
+
+    def mark_analyzed(self, symbol: str):
+        """
+        分析完成后以当前信号作为下次比较的基准
+        """
+        if symbol in self._latest:
+            self._analyzed[symbol] = self._latest[symbol]
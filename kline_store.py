@@ -0,0 +1,210 @@
+import datetime
+import json
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# 默认存储目录 (容器内通过 docker-compose 挂载 ./data:/app/data 持久化)
+DEFAULT_KLINE_STORE_DIR = "/app/data/kline"
+
+# 每根 K 线保存的字段，日期以 datetime64[D] 存储，便于 memory-map 读取
+KLINE_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'f8'),
+])
+KLINE_COLUMNS = [name for name in KLINE_DTYPE.names if name != 'date']
+
+# 收盘后多久认为当日 K 线已经落地 (Sina 日线在收盘后更新)
+MARKET_CLOSE_TIME = datetime.time(15, 30)
+
+def _to_day(value) -> np.datetime64:
+    """
+    将 "YYYYMMDD" / "YYYY-MM-DD" / date 等统一转换为 datetime64[D]
+    """
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+def frame_to_records(df: pd.DataFrame) -> np.ndarray:
+    """
+    将 akshare 返回的日线 DataFrame 转换为结构化数组 (按日期升序，同一日期保留最后一条)
+    """
+    if df is None or df.empty:
+        return np.empty(0, dtype=KLINE_DTYPE)
+    df = df.assign(date=pd.to_datetime(df['date'])).drop_duplicates('date', keep='last').sort_values('date')
+    records = np.empty(len(df), dtype=KLINE_DTYPE)
+    records['date'] = df['date'].values.astype('datetime64[D]')
+    for col in KLINE_COLUMNS:
+        if col in df.columns:
+            records[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='f8')
+        else:
+            records[col] = np.nan
+    return records
+
+def merge_records(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """
+    合并新旧 K 线，新数据覆盖同一日期的旧数据
+    """
+    if len(old) == 0:
+        return new
+    if len(new) == 0:
+        return old
+    keep_old = old[~np.isin(old['date'], new['date'])]
+    merged = np.concatenate([keep_old, new])
+    return merged[np.argsort(merged['date'], kind='stable')]
+
+def records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    """
+    将结构化数组还原为与 Sina 接口一致的 DataFrame (date, open, high, low, close, volume)
+    """
+    df = pd.DataFrame({col: np.asarray(records[col]) for col in KLINE_COLUMNS})
+    df.insert(0, 'date', pd.to_datetime(np.asarray(records['date'])).strftime('%Y-%m-%d'))
+    return df
+
+class KLineStore:
+    """
+    本地日线存储，按 Sina 代码 (如 sh600519) 每个标的一个 .npy 文件
+    只从网络拉取缺失的尾部交易日并追加，数据已是最新时完全不访问网络
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or getattr(config, 'KLINE_STORE_DIR', DEFAULT_KLINE_STORE_DIR)
+        self.enabled = getattr(config, 'KLINE_STORE_ENABLED', True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        if self.enabled:
+            try:
+                os.makedirs(self.root, exist_ok=True)
+            except:
+                # 无法创建目录 (例如非容器环境)，退化为每次都从网络获取
+                self.enabled = False
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_lock:
+            lock = self._locks.get(symbol)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[symbol] = lock
+            return lock
+
+    def _data_path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol}.npy")
+
+    def _meta_path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol}.json")
+
+    def load(self, symbol: str) -> np.ndarray:
+        """
+        读取本地已存储的 K 线 (memory-map 只读)，不存在时返回空数组
+        """
+        path = self._data_path(symbol)
+        if not self.enabled or not os.path.exists(path):
+            return np.empty(0, dtype=KLINE_DTYPE)
+        try:
+            return np.load(path, mmap_mode='r')
+        except Exception:
+            return np.empty(0, dtype=KLINE_DTYPE)
+
+    def _load_meta(self, symbol: str) -> dict:
+        try:
+            with open(self._meta_path(symbol), 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save(self, symbol: str, records: np.ndarray, meta: dict):
+        if not self.enabled:
+            return
+        try:
+            # 先写临时文件再原子替换，避免中途失败留下损坏的文件
+            tmp_path = self._data_path(symbol) + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, records)
+            os.replace(tmp_path, self._data_path(symbol))
+            meta = dict(meta, checked_at=datetime.datetime.now().isoformat(timespec='seconds'))
+            with open(self._meta_path(symbol) + ".tmp", 'w') as f:
+                json.dump(meta, f)
+            os.replace(self._meta_path(symbol) + ".tmp", self._meta_path(symbol))
+        except Exception as e:
+            print(f"写入本地 K 线存储失败 ({symbol}): {e}")
+
+    def is_current(self, symbol: str, records: np.ndarray, end: np.datetime64, meta: dict) -> bool:
+        """
+        判断本地数据是否已覆盖到 end：
+        1) 最后一根 K 线日期 > end (请求的是更早的区间)
+        2) 最后一根 K 线日期 == end，或已检查过 end 当日 (节假日/停牌没有新 K 线)，
+           且检查发生在 end 当日收盘之后 (盘中获取的是未收盘的 K 线，需要重新获取)
+        """
+        if len(records) > 0 and records['date'][-1] > end:
+            return True
+        reached_end = len(records) > 0 and records['date'][-1] == end
+        if not reached_end and meta.get("checked_end") != str(end):
+            return False
+        try:
+            checked_at = datetime.datetime.fromisoformat(meta["checked_at"])
+        except Exception:
+            return False
+        end_close = datetime.datetime.combine(end.astype(datetime.date), MARKET_CLOSE_TIME)
+        return checked_at >= end_close
+
+    def get_daily(self, symbol: str, start_date: str, end_date: str,
+                  fetch_range: Callable[[str, str], pd.DataFrame],
+                  fetch_full: Optional[Callable[[], pd.DataFrame]] = None) -> pd.DataFrame:
+        """
+        获取 [start_date, end_date] 区间的日线
+
+        Args:
+            symbol: Sina 代码，如 sh600519
+            start_date / end_date: "YYYYMMDD"
+            fetch_range: 按区间从网络获取日线的函数 (start, end) -> DataFrame
+            fetch_full: 可选，本地无数据时用于初始化全部历史的函数
+        """
+        start = _to_day(start_date)
+        end = _to_day(end_date)
+
+        if not self.enabled:
+            return records_to_frame(frame_to_records(fetch_range(start_date, end_date)))
+
+        with self._lock(symbol):
+            records = np.array(self.load(symbol))
+            meta = self._load_meta(symbol) if len(records) > 0 else {}
+
+            if not self.is_current(symbol, records, end, meta):
+                covered_from = meta.get("covered_from")
+                if covered_from is None or np.datetime64(covered_from, 'D') > start:
+                    # 本地无数据或历史覆盖不足，做一次完整初始化
+                    if fetch_full is not None:
+                        fetched = frame_to_records(fetch_full())
+                        covered_from = str(fetched['date'][0]) if len(fetched) > 0 else str(start)
+                    else:
+                        fetched = frame_to_records(fetch_range(start_date, end_date))
+                        covered_from = str(start)
+                    records = merge_records(records, fetched)
+                else:
+                    # 只拉取缺失的尾部交易日，从最后一根 K 线当日开始 (覆盖可能未收盘的 K 线)
+                    last_day = pd.Timestamp(records['date'][-1]).strftime("%Y%m%d")
+                    records = merge_records(records, frame_to_records(fetch_range(last_day, end_date)))
+                self._save(symbol, records, {"covered_from": covered_from, "checked_end": str(end)})
+
+        mask = (records['date'] >= start) & (records['date'] <= end)
+        return records_to_frame(records[mask])
+
+_default_store: Optional[KLineStore] = None
+_default_store_lock = threading.Lock()
+
+def get_kline_store() -> KLineStore:
+    """
+    获取进程内共享的 K 线存储实例
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = KLineStore()
+        return _default_store
@@ -0,0 +1,112 @@
+import re
+from typing import Callable, List, Optional
+
+import config
+
+# 每次调用的输入 token 预算 (只计算数据部分，不含静态的 system 提示词)，可在 config.py 中覆盖
+DEFAULT_LLM_INPUT_TOKEN_BUDGETS = {
+    "stock": 1500,     # 单只股票数据
+    "market": 2000,    # 大盘指数数据
+    "news": 2500,      # 市场概况/舆情
+}
+
+# 粗略估算系数 (参考 DeepSeek 文档：1 个中文字符约 0.6 token，1 个英文字符约 0.3 token)
+CJK_TOKENS_PER_CHAR = 0.6
+OTHER_TOKENS_PER_CHAR = 0.3
+
+# 低价值字段：预算不足时优先删除 (信息已在其他字段中体现或对结论影响较小)
+LOW_VALUE_PREFIXES = (
+    "- MA位置:",
+    "- 总市值:",
+)
+
+TRUNCATED_MARK = "...(数据过长，已截断)"
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uff00-\uffef]")
+_LONG_DECIMAL_PATTERN = re.compile(r"(\d+\.\d{2})\d+")
+_TRAILING_ZERO_PATTERN = re.compile(r"(?<=\d)\.0(?![\d.])")
+_HISTORY_ROW_PATTERN = re.compile(r"^\s*\d{4}-?\d{2}-?\d{2}")
+
+def estimate_tokens(text: str) -> int:
+    """
+    发送前估算文本的 token 数 (按中文/其他字符分别计数，误差约 10%~20%，只用于预算控制)
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return int(cjk * CJK_TOKENS_PER_CHAR + (len(text) - cjk) * OTHER_TOKENS_PER_CHAR) + 1
+
+def _round_numbers(text: str) -> str:
+    """
+    小数最多保留两位，去掉整数后多余的 ".0" (如成交量 V=1000.0)
+    """
+    return _TRAILING_ZERO_PATTERN.sub("", _LONG_DECIMAL_PATTERN.sub(r"\1", text))
+
+def _drop_history_rows(text: str, keep: int) -> str:
+    """
+    每段连续的历史行情行只保留最近 keep 行
+    """
+    lines = text.split("\n")
+    result: List[str] = []
+    block: List[str] = []
+    for line in lines + [""]:
+        if _HISTORY_ROW_PATTERN.match(line):
+            block.append(line)
+            continue
+        if block:
+            result.extend(block[-keep:])
+            block = []
+        result.append(line)
+    return "\n".join(result[:-1])
+
+def _history_row_count(text: str) -> int:
+    longest = current = 0
+    for line in text.split("\n"):
+        current = current + 1 if _HISTORY_ROW_PATTERN.match(line) else 0
+        longest = max(longest, current)
+    return longest
+
+def _drop_low_value_fields(text: str) -> str:
+    return "\n".join(line for line in text.split("\n") if not line.lstrip().startswith(LOW_VALUE_PREFIXES))
+
+def _truncate(text: str, budget: int) -> str:
+    """
+    最后手段：按比例截断到预算以内
+    """
+    keep = max(0, int(len(text) * budget / max(estimate_tokens(text), 1)) - len(TRUNCATED_MARK))
+    while keep > 0 and estimate_tokens(text[:keep] + TRUNCATED_MARK) > budget:
+        keep = int(keep * 0.9)
+    return text[:keep] + TRUNCATED_MARK
+
+def get_budget(kind: str) -> Optional[int]:
+    budgets = getattr(config, 'LLM_INPUT_TOKEN_BUDGETS', DEFAULT_LLM_INPUT_TOKEN_BUDGETS)
+    return budgets.get(kind, DEFAULT_LLM_INPUT_TOKEN_BUDGETS.get(kind))
+
+def fit_to_budget(text: str, kind: str, budget: Optional[int] = None,
+                  log: Optional[Callable[[str], None]] = None) -> str:
+    """
+    将输入压缩到 token 预算以内，按信息损失从小到大依次尝试：
+    1) 数字取整  2) 逐步减少历史行情行数  3) 删除低价值字段  4) 截断
+    已在预算内的文本原样返回 (保证相同输入的缓存键不变)
+    """
+    if budget is None:
+        budget = get_budget(kind)
+    if not text or not budget:
+        return text
+    original = estimate_tokens(text)
+    if original <= budget:
+        return text
+
+    compacted = _round_numbers(text)
+    rows = _history_row_count(compacted)
+    while estimate_tokens(compacted) > budget and rows > 1:
+        rows = max(1, rows // 2)
+        compacted = _drop_history_rows(compacted, rows)
+    if estimate_tokens(compacted) > budget:
+        compacted = _drop_low_value_fields(compacted)
+    if estimate_tokens(compacted) > budget:
+        compacted = _truncate(compacted, budget)
+
+    if log is not None:
+        log(f"{kind} 输入约 {original} tokens，超出预算 {budget}，压缩后约 {estimate_tokens(compacted)} tokens")
+    return compacted
@@ -0,0 +1,70 @@
+import functools
+import hashlib
+import threading
+from typing import Callable, Optional, Union
+
+import config
+from llm_runner import is_analysis_error
+from ttl_cache import TTLCache, DEFAULT_CACHE_DIR
+
+# LLM 响应缓存默认配置 (可在 config.py 中覆盖)
+DEFAULT_LLM_CACHE_TTL = 3 * 86400       # 3 天，覆盖周末沿用周五数据的重跑
+DEFAULT_LLM_CACHE_MAX_ENTRIES = 500
+
+_llm_cache: Optional[TTLCache] = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> TTLCache:
+    """
+    获取 LLM 响应缓存 (进程内共享，磁盘目录可在容器重启后保留)
+    """
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = TTLCache(
+                "llm",
+                root=getattr(config, 'CACHE_DIR', DEFAULT_CACHE_DIR),
+                max_entries=getattr(config, 'LLM_CACHE_MAX_ENTRIES', DEFAULT_LLM_CACHE_MAX_ENTRIES),
+                default_ttl=getattr(config, 'LLM_CACHE_TTL', DEFAULT_LLM_CACHE_TTL),
+            )
+        return _llm_cache
+
+def response_cache_key(provider: str, model: str, template_version: str, *inputs: str) -> str:
+    """
+    按 (provider, 模型, 提示词模板版本, 输入) 计算内容哈希，输入逐字节相同才会命中
+    """
+    digest = hashlib.sha256()
+    for part in (provider, model, template_version, *inputs):
+        data = str(part).encode('utf-8')
+        # 写入长度前缀，避免不同切分方式拼接出相同内容
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+def cached_analysis(provider: str, model: Union[str, Callable[[], str]], template_version: str):
+    """
+    为分析函数增加响应缓存的装饰器
+    - model 可以是字符串或返回模型名的函数 (调用时读取，便于修改配置)
+    - 修改提示词模板时需同步修改 template_version，使旧缓存失效
+    - 错误结果不写入缓存
+    - on_chunk (流式输出回调) 不参与缓存键，命中缓存时以完整结果回调一次
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*inputs: str, on_chunk: Optional[Callable[[str], None]] = None) -> str:
+            if not getattr(config, 'LLM_CACHE_ENABLED', True):
+                return func(*inputs, on_chunk=on_chunk)
+            model_name = model() if callable(model) else model
+            key = (func.__name__, response_cache_key(provider, model_name, template_version, *inputs))
+            cache = get_llm_cache()
+            hit, result = cache.get(key)
+            if hit:
+                if on_chunk is not None:
+                    on_chunk(result)
+                return result
+            result = func(*inputs, on_chunk=on_chunk)
+            if not is_analysis_error(result):
+                cache.set(key, result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+import threading
+from typing import Dict, Any, Tuple
+
+import httpx
+
+import config
+
+# LLM 客户端连接池默认配置 (可在 config.py 中覆盖)
+DEFAULT_LLM_POOL_SIZE = 10           # 每个 provider 的最大连接数 (含 keep-alive 连接)
+DEFAULT_LLM_TIMEOUT = 300            # 单次请求超时 (秒)，长文本分析可能需要数分钟
+DEFAULT_LLM_CONNECT_TIMEOUT = 10     # 建立连接超时 (秒)
+DEFAULT_LLM_KEEPALIVE_EXPIRY = 120   # 空闲连接保留时间 (秒)
+
+# (provider, api_key, base_url) -> client，每个进程只创建一次
+_clients: Dict[Tuple[str, str, str], Any] = {}
+_clients_lock = threading.Lock()
+
+def _pool_limits() -> httpx.Limits:
+    pool_size = int(getattr(config, 'LLM_POOL_SIZE', DEFAULT_LLM_POOL_SIZE))
+    return httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=getattr(config, 'LLM_KEEPALIVE_EXPIRY', DEFAULT_LLM_KEEPALIVE_EXPIRY),
+    )
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        getattr(config, 'LLM_TIMEOUT', DEFAULT_LLM_TIMEOUT),
+        connect=getattr(config, 'LLM_CONNECT_TIMEOUT', DEFAULT_LLM_CONNECT_TIMEOUT),
+    )
+
+def _get_or_create(key: Tuple[str, str, str], factory):
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+def get_deepseek_client():
+    """
+    获取 DeepSeek (OpenAI 兼容) 客户端，进程内复用同一个 HTTP 连接池
+    """
+    from openai import OpenAI, DefaultHttpxClient
+
+    key = ("deepseek", config.DEEPSEEK_API_KEY, config.DEEPSEEK_BASE_URL)
+    return _get_or_create(key, lambda: OpenAI(
+        api_key=config.DEEPSEEK_API_KEY,
+        base_url=config.DEEPSEEK_BASE_URL,
+        timeout=_timeout(),
+        http_client=DefaultHttpxClient(limits=_pool_limits(), timeout=_timeout()),
+    ))
+
+def get_gemini_client():
+    """
+    获取 Google Gemini 客户端，进程内复用同一个 HTTP 连接池
+    """
+    from google import genai
+    from google.genai import types
+
+    timeout = _timeout()
+    key = ("gemini", config.GEMINI_API_KEY, "")
+    return _get_or_create(key, lambda: genai.Client(
+        api_key=config.GEMINI_API_KEY,
+        http_options=types.HttpOptions(
+            # google-genai 的超时单位为毫秒
+            timeout=int(timeout.read * 1000),
+            client_args={"limits": _pool_limits()},
+        ),
+    ))
+
+def reset_clients():
+    """
+    关闭并清空已创建的客户端 (修改 API Key 或在测试中使用)
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception:
+            pass
@@ -0,0 +1,219 @@
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from metrics import increment
+from prompts import format_batch_input, split_batch_response
+
+# 并发分析默认配置 (可在 config.py 中覆盖)
+DEFAULT_LLM_MAX_IN_FLIGHT = 4
+DEFAULT_LLM_RATE_LIMITS = {
+    # provider -> (每秒请求数, 突发容量)
+    "DeepSeek": (1.0, 4),
+    "Gemini": (0.5, 2),
+}
+DEFAULT_LLM_MAX_RETRIES = 3
+DEFAULT_LLM_RETRY_BASE_DELAY = 2.0
+DEFAULT_LLM_BATCH_SIZE = 1     # 每次请求合并分析的股票数，1 表示不合并
+
+# 分析函数返回的错误文本中出现以下特征时认为可以重试 (限流 / 服务端错误 / 超时)
+RETRYABLE_PATTERN = re.compile(
+    r"\b(429|500|502|503|504)\b|rate.?limit|overloaded|timed? ?out|timeout|temporarily unavailable",
+    re.IGNORECASE,
+)
+
+def is_analysis_error(text: str) -> bool:
+    """
+    判断分析结果是否包含错误信息
+    """
+    if not text:
+        return True
+    error_indicators = [
+        "调用 DeepSeek API 分析时出错",
+        "调用 Gemini API 分析时出错",
+        "Google Gemini API 返回内容为空",
+        "错误:",
+        "分析失败:",
+        "无法获取"
+    ]
+    for indicator in error_indicators:
+        if indicator in text:
+            return True
+    return False
+
+class TokenBucket:
+    """
+    令牌桶限流：按 rate (个/秒) 补充令牌，最多积累 capacity 个
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(float(rate), 1e-6)
+        self.capacity = max(float(capacity), 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        取走一个令牌，令牌不足时阻塞等待
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    """
+    获取 provider 的令牌桶 (进程内共享，同一 provider 的所有调用共用限额)
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(provider)
+        if bucket is None:
+            limits = getattr(config, 'LLM_RATE_LIMITS', DEFAULT_LLM_RATE_LIMITS)
+            rate, capacity = limits.get(provider, DEFAULT_LLM_RATE_LIMITS.get(provider, (1.0, 1)))
+            bucket = TokenBucket(rate, capacity)
+            _buckets[provider] = bucket
+        return bucket
+
+def is_retryable_error(text: str) -> bool:
+    """
+    判断分析函数返回的错误文本是否属于可重试的错误 (429 / 5xx / 超时)
+    """
+    return bool(text) and bool(RETRYABLE_PATTERN.search(text))
+
+def call_with_retry(func: Callable[..., str], *args, provider: str,
+                    is_error: Callable[[str], bool],
+                    max_retries: Optional[int] = None,
+                    base_delay: Optional[float] = None,
+                    label: str = "",
+                    attempt_kwargs: Optional[Callable[[], Dict[str, Any]]] = None) -> str:
+    """
+    按 provider 限流调用分析函数，遇到 429/5xx 等可重试错误时指数退避重试
+    attempt_kwargs 在每次尝试前调用，返回本次调用的关键字参数 (如重新打开的流式输出回调)
+    返回最后一次调用的结果 (成功结果或错误文本)
+    """
+    if max_retries is None:
+        max_retries = getattr(config, 'LLM_MAX_RETRIES', DEFAULT_LLM_MAX_RETRIES)
+    if base_delay is None:
+        base_delay = getattr(config, 'LLM_RETRY_BASE_DELAY', DEFAULT_LLM_RETRY_BASE_DELAY)
+    limiter = get_rate_limiter(provider)
+    result = ""
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        result = func(*args, **(attempt_kwargs() if attempt_kwargs else {}))
+        if not (is_error(result) and is_retryable_error(result)) or attempt == max_retries:
+            if is_error(result):
+                increment("llm_failures", provider=provider)
+            return result
+        increment("llm_retries", provider=provider)
+        sleep_time = base_delay * (2 ** attempt) + random.uniform(0, 1)
+        print(f"{provider} API 繁忙 {label}, 正在进行第 {attempt + 1} 次重试... (等待 {sleep_time:.2f}s)")
+        time.sleep(sleep_time)
+    return result
+
+def analyze_concurrently(items: List[Tuple[str, str]], analyze_func: Callable[[str], str], provider: str,
+                         is_error: Callable[[str], bool],
+                         max_in_flight: Optional[int] = None,
+                         on_result: Optional[Callable[[str, str], None]] = None,
+                         open_stream: Optional[Callable[[str], Callable[[str], None]]] = None) -> Dict[str, str]:
+    """
+    并发分析多只股票
+
+    Args:
+        items: [(symbol, data_str), ...]
+        analyze_func: 单只股票的分析函数
+        provider: 用于限流的 provider 名称
+        is_error: 判断分析结果是否为错误
+        max_in_flight: 同时在途的请求数，默认读取 config.LLM_MAX_IN_FLIGHT
+        on_result: 每只股票完成时的回调 (symbol, result)
+        open_stream: 流式输出时每次尝试前调用 open_stream(symbol)，返回传给分析函数的 on_chunk 回调
+
+    Returns:
+        Dict: {symbol: result}，顺序与 items 一致
+    """
+    if max_in_flight is None:
+        max_in_flight = getattr(config, 'LLM_MAX_IN_FLIGHT', DEFAULT_LLM_MAX_IN_FLIGHT)
+    results: Dict[str, str] = {}
+    if not items:
+        return results
+
+    def run(symbol: str, data_str: str) -> str:
+        try:
+            attempt_kwargs = (lambda: {"on_chunk": open_stream(symbol)}) if open_stream else None
+            result = call_with_retry(analyze_func, data_str, provider=provider, is_error=is_error,
+                                     label=f"({symbol})", attempt_kwargs=attempt_kwargs)
+        except Exception as e:
+            result = f"分析失败: {e}"
+        if on_result is not None:
+            on_result(symbol, result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, int(max_in_flight)), thread_name_prefix="llm") as pool:
+        futures = [(symbol, pool.submit(run, symbol, data_str)) for symbol, data_str in items]
+        for symbol, future in futures:
+            results[symbol] = future.result()
+    return results
+
+def analyze_in_batches(items: List[Tuple[str, str]], batch_func: Callable[[str], str], single_func: Callable[[str], str],
+                       provider: str, is_error: Callable[[str], bool],
+                       batch_size: Optional[int] = None,
+                       max_in_flight: Optional[int] = None,
+                       on_result: Optional[Callable[[str, str], None]] = None,
+                       open_stream: Optional[Callable[[str], Callable[[str], None]]] = None) -> Dict[str, str]:
+    """
+    批量分析多只股票：每 batch_size 只股票合并为一次请求，静态的角色与分析框架只发送一次
+    批量结果按分隔标记拆分，未能解析出报告的股票回退为 analyze_concurrently 单只分析
+    参数含义与 analyze_concurrently 相同，返回顺序与 items 一致
+    """
+    if batch_size is None:
+        batch_size = getattr(config, 'LLM_BATCH_SIZE', DEFAULT_LLM_BATCH_SIZE)
+    batch_size = int(batch_size or 1)
+    if batch_size <= 1 or len(items) <= 1:
+        return analyze_concurrently(items, single_func, provider, is_error, max_in_flight, on_result, open_stream)
+    if max_in_flight is None:
+        max_in_flight = getattr(config, 'LLM_MAX_IN_FLIGHT', DEFAULT_LLM_MAX_IN_FLIGHT)
+
+    def run_batch(batch: List[Tuple[str, str]]) -> Dict[str, str]:
+        symbols = [symbol for symbol, _ in batch]
+        try:
+            text = call_with_retry(batch_func, format_batch_input(batch), provider=provider, is_error=is_error,
+                                   label=f"({','.join(symbols)})")
+        except Exception as e:
+            text = f"分析失败: {e}"
+        if is_error(text):
+            print(f"批量分析失败，回退为单只分析: {text[:100]}")
+            return {}
+        sections = split_batch_response(text, symbols)
+        missing = [symbol for symbol in symbols if symbol not in sections]
+        if missing:
+            print(f"批量分析结果中未解析到 {missing}，回退为单只分析")
+        return sections
+
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    parsed: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(int(max_in_flight), len(batches))), thread_name_prefix="llm-batch") as pool:
+        for sections in pool.map(run_batch, batches):
+            parsed.update(sections)
+
+    for symbol, result in parsed.items():
+        if open_stream is not None:
+            open_stream(symbol)(result)
+        if on_result is not None:
+            on_result(symbol, result)
+
+    fallback = [(symbol, data_str) for symbol, data_str in items if symbol not in parsed]
+    parsed.update(analyze_concurrently(fallback, single_func, provider, is_error, max_in_flight, on_result, open_stream))
+    return {symbol: parsed[symbol] for symbol, _ in items}
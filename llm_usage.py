@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# 保留最近的调用明细条数
+MAX_CALL_RECORDS = 1000
+
+# provider -> 累计用量
+_usage: Dict[str, Dict[str, float]] = {}
+# 每次调用的明细 (token 用量与耗时)
+_calls: Deque[Dict[str, Any]] = deque(maxlen=MAX_CALL_RECORDS)
+_usage_lock = threading.Lock()
+
+def record_usage(provider: str, prompt_tokens: Optional[int], completion_tokens: Optional[int], cached_tokens: Optional[int] = None,
+                 latency: Optional[float] = None, first_token_latency: Optional[float] = None):
+    """
+    记录一次 API 调用的 token 用量 (来自响应中的 usage 字段) 与耗时
+    cached_tokens 为命中服务端前缀缓存的输入 token 数
+    latency 为整个请求耗时 (秒)，first_token_latency 为流式输出时收到首个数据块的耗时 (秒)
+    """
+    with _usage_lock:
+        totals = _usage.setdefault(provider, {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "latency": 0.0,
+        })
+        totals["calls"] += 1
+        totals["prompt_tokens"] += int(prompt_tokens or 0)
+        totals["cached_tokens"] += int(cached_tokens or 0)
+        totals["completion_tokens"] += int(completion_tokens or 0)
+        totals["latency"] += float(latency or 0.0)
+        _calls.append({
+            "provider": provider,
+            "time": time.time(),
+            "prompt_tokens": int(prompt_tokens or 0),
+            "cached_tokens": int(cached_tokens or 0),
+            "completion_tokens": int(completion_tokens or 0),
+            "latency": latency,
+            "first_token_latency": first_token_latency,
+        })
+
+def usage_summary() -> Dict[str, Dict[str, float]]:
+    with _usage_lock:
+        return {provider: dict(totals) for provider, totals in _usage.items()}
+
+def call_records() -> List[Dict[str, Any]]:
+    """
+    返回最近的调用明细
+    """
+    with _usage_lock:
+        return list(_calls)
+
+def format_usage_summary() -> str:
+    """
+    生成用量摘要文本，包含前缀缓存命中率与平均耗时
+    """
+    lines = []
+    for provider, totals in usage_summary().items():
+        prompt_tokens = totals["prompt_tokens"]
+        hit_rate = totals["cached_tokens"] / prompt_tokens * 100 if prompt_tokens else 0.0
+        avg_latency = totals["latency"] / totals["calls"] if totals["calls"] else 0.0
+        lines.append(
+            f"{provider}: 调用 {totals['calls']} 次, 输入 {prompt_tokens} tokens "
+            f"(缓存命中 {totals['cached_tokens']}, {hit_rate:.1f}%), 输出 {totals['completion_tokens']} tokens, "
+            f"平均耗时 {avg_latency:.1f}s"
+        )
+    return "\n".join(lines)
+
+def reset_usage():
+    with _usage_lock:
+        _usage.clear()
+        _calls.clear()
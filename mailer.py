@@ -1,39 +1,160 @@
 import smtplib
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
 from email.utils import formataddr
+from typing import List, Optional, Tuple
 import config
 import datetime
+from metrics import increment, timed
 
-def send_email(subject: str, content: str):
+# SMTP 连接池配置的默认值 (可在 config.py 中覆盖)
+DEFAULT_SMTP_MAX_CONNECTIONS = 3     # 同时使用的连接数上限 (并行发送)
+DEFAULT_SMTP_TIMEOUT = 30            # 连接/命令超时 (秒)
+DEFAULT_SMTP_IDLE_TIMEOUT = 60       # 空闲连接保留时间 (秒)，超过后关闭 (服务器通常会断开长时间空闲的连接)
+DEFAULT_SMTP_MAX_RETRIES = 2
+DEFAULT_SMTP_RETRY_BASE_DELAY = 1.0
+
+SENDER_NICKNAME = "股票分析助手"
+
+# (主题, 正文, 收件人列表)
+Email = Tuple[str, str, List[str]]
+
+class SMTPPool:
     """
-    发送邮件
-    
-    Args:
-        subject: 邮件主题
-        content: 邮件正文
+    SMTP 连接池：登录后的连接在发送完成后放回池中复用，省去每封邮件的 TLS 握手与登录
+    复用前发送 NOOP 确认连接仍然可用，空闲超过 idle_timeout 的连接直接关闭
     """
-    if config.SMTP_USER == "your_email@example.com":
-        print("错误: 未配置邮箱。请在 config.py 中设置。")
-        return
 
-    # 获取接收者列表，兼容旧配置
-    to_emails = getattr(config, 'TO_EMAILS', [config.TO_EMAIL])
-    
-    # 创建邮件对象
+    def __init__(self, host: str, port: int, user: Optional[str], password: Optional[str],
+                 size: int = DEFAULT_SMTP_MAX_CONNECTIONS, timeout: float = DEFAULT_SMTP_TIMEOUT,
+                 idle_timeout: float = DEFAULT_SMTP_IDLE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        # [(连接, 放回时间)]，末尾为最近使用
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+
+    def _connect(self) -> smtplib.SMTP:
+        # 根据端口选择连接方式
+        if self.port == 465:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            server.ehlo()
+            if server.has_extn("starttls"):
+                server.starttls()  # 启用 TLS
+                server.ehlo()
+        try:
+            if self.user and self.password and server.has_extn("auth"):
+                server.login(self.user, self.password)
+        except Exception:
+            _close_quietly(server)
+            raise
+        return server
+
+    def acquire(self) -> smtplib.SMTP:
+        """
+        获取一个可用连接 (超过 size 个连接同时使用时等待)，用完后调用 release 或 discard
+        """
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    server, released_at = self._idle.pop()
+                if time.monotonic() - released_at <= self.idle_timeout and _is_alive(server):
+                    return server
+                _close_quietly(server)
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, server: smtplib.SMTP):
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+        self._slots.release()
+
+    def discard(self, server: smtplib.SMTP):
+        """
+        出错的连接不再复用
+        """
+        _close_quietly(server)
+        self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            _close_quietly(server)
+
+def _is_alive(server: smtplib.SMTP) -> bool:
+    try:
+        return server.noop()[0] == 250
+    except Exception:
+        return False
+
+def _close_quietly(server: smtplib.SMTP):
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+_pool: Optional[SMTPPool] = None
+_pool_lock = threading.Lock()
+
+def get_smtp_pool() -> SMTPPool:
+    """
+    获取进程内共享的连接池，SMTP 配置变化时重建
+    """
+    global _pool
+    key = (config.SMTP_SERVER, config.SMTP_PORT, config.SMTP_USER, config.SMTP_PASSWORD)
+    with _pool_lock:
+        if _pool is None or (_pool.host, _pool.port, _pool.user, _pool.password) != key:
+            if _pool is not None:
+                _pool.close()
+            _pool = SMTPPool(
+                *key,
+                size=getattr(config, 'SMTP_MAX_CONNECTIONS', DEFAULT_SMTP_MAX_CONNECTIONS),
+                timeout=getattr(config, 'SMTP_TIMEOUT', DEFAULT_SMTP_TIMEOUT),
+                idle_timeout=getattr(config, 'SMTP_IDLE_TIMEOUT', DEFAULT_SMTP_IDLE_TIMEOUT),
+            )
+        return _pool
+
+def close_smtp_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def build_message(subject: str, content: str, to_emails: List[str]) -> MIMEMultipart:
+    """
+    构造邮件对象
+    """
     message = MIMEMultipart()
     # 修正 From 头，使用 formataddr 并正确编码昵称
-    nickname = "股票分析助手"
-    message['From'] = formataddr((str(Header(nickname, 'utf-8')), config.SMTP_USER))
-    
+    message['From'] = formataddr((str(Header(SENDER_NICKNAME, 'utf-8')), config.SMTP_USER))
+
     # 设置 To 头 (多个收件人时，显示为逗号分隔的字符串)
     # 注意：直接使用 join，不要用 Header 包装整个列表，否则逗号可能被编码导致发送失败
-    if len(to_emails) > 1:
-        message['To'] = ",".join(to_emails)
-    else:
-        message['To'] = to_emails[0]
-        
+    message['To'] = ",".join(to_emails)
     message['Subject'] = Header(subject, 'utf-8')
 
     # 邮件正文
@@ -42,27 +163,115 @@ def send_email(subject: str, content: str):
         message.attach(MIMEText(content, 'html', 'utf-8'))
     else:
         message.attach(MIMEText(content, 'plain', 'utf-8'))
+    return message
 
-    try:
-        # 根据端口选择连接方式
-        if config.SMTP_PORT == 465:
-            server = smtplib.SMTP_SSL(config.SMTP_SERVER, config.SMTP_PORT)
-        else:
-            server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT)
-            server.starttls()  # 启用 TLS
-
-        server.login(config.SMTP_USER, config.SMTP_PASSWORD)
-        
-        # 批量发送
-        # 注意：sendmail 的第二个参数接受一个列表，表示所有接收者
-        server.sendmail(config.SMTP_USER, to_emails, message.as_string())
-        
-        server.quit()
-        print(f"[{datetime.datetime.now()}] 邮件已发送给: {to_emails}")
-        
-    except Exception as e:
-        print(f"[{datetime.datetime.now()}] 邮件发送失败: {str(e)}")
+def _retryable(error: Exception) -> bool:
+    # 认证失败、收件人被拒、5xx 等永久错误不重试；断开连接、网络错误与 4xx 临时错误重试
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+def _deliver(pool: SMTPPool, server: Optional[smtplib.SMTP], email: Email,
+             max_retries: int, base_delay: float) -> Tuple[Optional[smtplib.SMTP], bool]:
+    """
+    通过 server (为 None 时从连接池获取) 发送一封邮件，失败时换新连接重试
+
+    Returns:
+        (可继续复用的连接, 是否发送成功)
+    """
+    subject, content, to_emails = email
+    payload = build_message(subject, content, to_emails).as_string()
+    attempt = 0
+    while True:
+        try:
+            if server is None:
+                server = pool.acquire()
+            # 注意：sendmail 的第二个参数接受一个列表，表示所有接收者
+            server.sendmail(config.SMTP_USER, to_emails, payload)
+            print(f"[{datetime.datetime.now()}] 邮件已发送给: {to_emails}")
+            return server, True
+        except Exception as e:
+            if server is not None:
+                pool.discard(server)
+                server = None
+            if _retryable(e) and attempt < max_retries:
+                attempt += 1
+                increment("email_retries")
+                time.sleep(base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+                continue
+            increment("email_failures")
+            print(f"[{datetime.datetime.now()}] 邮件发送失败 ({to_emails}): {str(e)}")
+            return None, False
+
+def send_messages(emails: List[Email], pool: Optional[SMTPPool] = None) -> List[bool]:
+    """
+    批量发送多封邮件：最多 pool.size 个连接并行，每个连接依次发送多封邮件
+
+    Returns:
+        List: 每封邮件是否发送成功 (顺序与 emails 一致)
+    """
+    if not emails:
+        return []
+    pool = pool or get_smtp_pool()
+    max_retries = getattr(config, 'SMTP_MAX_RETRIES', DEFAULT_SMTP_MAX_RETRIES)
+    base_delay = getattr(config, 'SMTP_RETRY_BASE_DELAY', DEFAULT_SMTP_RETRY_BASE_DELAY)
+    results = [False] * len(emails)
+    pending: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+    for index in range(len(emails)):
+        pending.put(index)
+
+    def worker():
+        server = None
+        try:
+            while True:
+                try:
+                    index = pending.get_nowait()
+                except queue.Empty:
+                    return
+                server, results[index] = _deliver(pool, server, emails[index], max_retries, base_delay)
+        finally:
+            if server is not None:
+                pool.release(server)
+
+    workers = min(pool.size, len(emails))
+    if workers == 1:
+        worker()
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp") as executor:
+            for future in [executor.submit(worker) for _ in range(workers)]:
+                future.result()
+    return results
+
+@timed("send_email")
+def send_email(subject: str, content: str, to_emails: Optional[List[str]] = None) -> bool:
+    """
+    发送邮件
+
+    Args:
+        subject: 邮件主题
+        content: 邮件正文
+        to_emails: 收件人列表，默认读取 config.TO_EMAILS
+            config.MAIL_PER_RECIPIENT 为 True 时每个收件人单独发送一封 (收件人互不可见)
+
+    Returns:
+        bool: 是否全部发送成功
+    """
+    if config.SMTP_USER == "your_email@example.com":
+        print("错误: 未配置邮箱。请在 config.py 中设置。")
+        return False
+
+    # 获取接收者列表，兼容旧配置
+    if to_emails is None:
+        to_emails = getattr(config, 'TO_EMAILS', [config.TO_EMAIL])
+    if getattr(config, 'MAIL_PER_RECIPIENT', False):
+        emails = [(subject, content, [to]) for to in to_emails]
+    else:
+        emails = [(subject, content, list(to_emails))]
+    return all(send_messages(emails))
 
 if __name__ == "__main__":
     # 测试代码
     send_email("测试邮件", "这是一封来自股票分析助手的测试邮件。")
+    close_smtp_pool()
@@ -4,129 +4,287 @@ import datetime
 import argparse
 import sys
 import markdown
-import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
 
 import config
-from data_fetcher import fetch_stock_data, fetch_market_index_data, fetch_financial_news
-from analyzer import analyze_stock, analyze_market, extract_stock_codes
-from analyzer_gemini import analyze_stock as analyze_stock_gemini, analyze_market as analyze_market_gemini, extract_stock_codes as extract_stock_codes_gemini
+from data_fetcher import fetch_stock_data, fetch_market_index_data, fetch_financial_news, MarketSnapshot
+from providers import get_providers
 from mailer import send_email
+from screener import run_screener, load_spot_snapshot
+from intraday import IntradayTracker, in_trading_session, spot_quotes, DEFAULT_INTRADAY_INTERVAL_MINUTES
+from llm_runner import analyze_concurrently, analyze_in_batches, is_analysis_error
+from report_stream import StreamingReport, RecommendedStocksWatcher, report_exists
+from trade_calendar import get_trade_calendar
+from fetch_guard import reset_breakers, open_breakers
+from metrics import span, timed, reset_metrics, export_run_metrics, format_metrics_summary
+from llm_usage import format_usage_summary, reset_usage
+from llm_budget import fit_to_budget
+from app_log import log, run_context
+from outbox import get_outbox, start_deliverer, notify_deliverer
 
-# 确保日志目录存在
-LOG_DIR = "/app/logs"
-if not os.path.exists(LOG_DIR):
-    try:
-        os.makedirs(LOG_DIR)
-    except:
-        pass # 如果无法创建（例如非容器环境），则忽略
-
-def log(message):
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    formatted_message = f"[{timestamp}] {message}"
-    print(formatted_message)
-    # 简单的文件日志记录
-    try:
-        with open(f"{LOG_DIR}/app.log", "a") as f:
-            f.write(formatted_message + "\n")
-    except:
-        pass
-
-def is_analysis_error(text):
-    """判断分析结果是否包含错误信息"""
-    if not text:
-        return True
-    error_indicators = [
-        "调用 DeepSeek API 分析时出错",
-        "调用 Gemini API 分析时出错",
-        "Google Gemini API 返回内容为空",
-        "错误:",
-        "分析失败:",
-        "无法获取"
-    ]
-    for indicator in error_indicators:
-        if indicator in text:
-            return True
-    return False
-
-def run_analysis_job(analyze_market_func, extract_stock_codes_func, analyze_stock_func, model_name):
-    log(f"开始执行定时任务 ({model_name})...")
-    
-    # 初始化 Markdown 报告
-    md_report = f"# 宏观市场与股票分析日报 ({datetime.date.today()})\n\n"
-    md_report += "---\n\n"
-    
-    valid_content_count = 0
+# 多个模型的报告：per_model 每个模型单独发送一份 / combined 合并为一份
+DEFAULT_REPORT_MODE = "per_model"
 
-    # --- 1. 宏观大盘分析 ---
-    log("正在获取大盘数据和市场概况...")
-    try:
+# 多个模型并行时保护 config.STOCK_SYMBOLS 的追加
+_symbols_lock = threading.Lock()
+
+class SharedInputs:
+    """
+    本次运行共享的输入数据：多个模型共用一次大盘与个股数据获取
+    同一只股票只获取一次，多个模型同时请求时等待正在进行的获取
+    个股数据以 StockRecord 保存，分析前才渲染为文本并按 config.LLM_INPUT_TOKEN_BUDGETS 压缩，发送给各模型的输入一致
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._lock = threading.Lock()
+        self._market: Optional[Future] = None
+        self._stocks: Dict[str, Future] = {}
+        self._prompts: Dict[str, str] = {}
+
+    def market_inputs(self):
+        """
+        返回 (大盘指数数据, 市场概况)，只获取一次
+        """
+        with self._lock:
+            future = self._market
+            owner = future is None
+            if owner:
+                future = self._market = Future()
+        if owner:
+            try:
+                future.set_result(self._fetch_market())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    @timed("stage", stage="fetch_market")
+    def _fetch_market(self):
+        log("正在获取大盘数据和市场概况...")
         # 获取大盘指数数据
         market_data_map = fetch_market_index_data(config.MARKET_INDEXES)
         market_data_str = ""
-        for symbol, data in market_data_map.items():
-            market_data_str += f"{data}\n"
-            
+        for symbol, record in market_data_map.items():
+            market_data_str += f"{record.render()}\n"
         # 获取市场概况/新闻
-        news_str = fetch_financial_news()
+        news_str = fetch_financial_news(self.snapshot)
+        # 超出 token 预算时压缩输入 (所有模型共用压缩后的结果)
+        return fit_to_budget(market_data_str, "market", log=log), fit_to_budget(news_str, "news", log=log)
+
+    def stock_data(self, symbols):
+        """
+        返回 {symbol: StockRecord}，只获取尚未获取过的股票，顺序与 symbols 一致
+        """
+        with self._lock:
+            missing = [symbol for symbol in symbols if symbol not in self._stocks]
+            for symbol in missing:
+                self._stocks[symbol] = Future()
+        if missing:
+            log(f"正在获取个股数据: {missing}")
+            try:
+                with span("stage", stage="fetch_stocks"):
+                    fetched = fetch_stock_data(missing, snapshot=self.snapshot)
+            except Exception as e:
+                log(f"获取个股数据异常: {e}")
+                fetched = {}
+            for symbol in missing:
+                self._stocks[symbol].set_result(fetched.get(symbol))
+        stock_data_map = {}
+        for symbol in symbols:
+            record = self._stocks[symbol].result()
+            if record is not None:
+                stock_data_map[symbol] = record
+        return stock_data_map
+
+    def stock_prompt(self, record):
+        """
+        渲染个股数据文本并压缩到 token 预算以内，每只股票只渲染一次 (所有模型共用)
+        """
+        with self._lock:
+            data_str = self._prompts.get(record.symbol)
+        if data_str is None:
+            data_str = fit_to_budget(record.render(), "stock", log=log)
+            with self._lock:
+                data_str = self._prompts.setdefault(record.symbol, data_str)
+        return data_str
+
+def run_macro_stage(provider, shared, report=None, on_recommended=None):
+    """
+    宏观大盘分析：获取 (共享的) 指数与市场概况并调用 AI 分析
+    流式输出时内容边接收边写入报告目录，<recommended_stocks> 一出现即回调 on_recommended
+
+    Returns:
+        (宏观分析结果 或 None, AI 推荐的股票代码列表)
+    """
+    try:
+        market_data_str, news_str = shared.market_inputs()
         
         # 调用 AI 分析宏观
-        log("正在进行宏观大盘分析...")
-        macro_analysis = analyze_market_func(market_data_str, news_str)
+        log(f"正在进行宏观大盘分析 ({provider.name})...")
+        section = report.open_section("macro") if report else None
+        watcher = RecommendedStocksWatcher(provider.extract_stock_codes, on_recommended) if on_recommended else None
+
+        def on_chunk(chunk):
+            if section is not None:
+                section.write(chunk)
+            if watcher is not None:
+                watcher.feed(chunk)
+
+        with span("stage", stage="macro_analysis", provider=provider.name):
+            macro_analysis = provider.analyze_market(market_data_str, news_str, on_chunk=on_chunk)
         
         if is_analysis_error(macro_analysis):
-            log(f"宏观分析返回错误，跳过报告生成: {macro_analysis[:100]}...")
-        else:
-            # 提取 AI 推荐的股票代码并添加到待分析列表
-            recommended_stocks = extract_stock_codes_func(macro_analysis)
-            if recommended_stocks:
-                log(f"AI 推荐关注股票: {recommended_stocks}")
-                for code in recommended_stocks:
-                    if code not in config.STOCK_SYMBOLS:
-                        config.STOCK_SYMBOLS.append(code)
-                log(f"当前待分析股票列表: {config.STOCK_SYMBOLS}")        
-            md_report += "## 🌏 宏观策略报告\n\n"
-            md_report += macro_analysis + "\n\n"
-            md_report += "---\n\n"
-            valid_content_count += 1
+            if report:
+                report.close_section("macro", keep=False)
+            log(f"宏观分析返回错误 ({provider.name})，跳过报告生成: {macro_analysis[:100]}...")
+            return None, []
+        if report:
+            report.close_section("macro")
+
+        # 提取 AI 推荐的股票代码 (流式输出时已提前检测到则直接复用)
+        recommended_stocks = watcher.codes if watcher is not None and watcher.fired else provider.extract_stock_codes(macro_analysis)
+        return macro_analysis, recommended_stocks or []
         
     except Exception as e:
-        log(f"宏观分析执行异常: {e}")
+        log(f"宏观分析执行异常 ({provider.name}): {e}")
         # 异常情况下不添加到报告
+        return None, []
 
-    # --- 2. 个股分析 ---
-    log("正在获取个股数据...")
-    stock_data_map = fetch_stock_data(config.STOCK_SYMBOLS)
+@timed("stage", stage="collect_symbols")
+def collect_symbols():
+    """
+    待分析股票：配置的股票 + 全市场筛选候选 (可选)
+    """
+    symbols = list(config.STOCK_SYMBOLS)
+    if getattr(config, 'SCREENER_ENABLED', False):
+        log("正在进行全市场筛选...")
+        try:
+            screened = run_screener()
+            log(f"筛选候选股票: {screened}")
+            symbols += [code for code in screened if code not in symbols]
+        except Exception as e:
+            log(f"全市场筛选执行异常: {e}")
+    return symbols
+
+def run_stock_stage(symbols, provider, shared, report=None):
+    """
+    个股分析：获取 (共享的) 数据后并发调用 AI 分析，流式输出时每只股票的分析边接收边写入报告目录
+    provider 提供 analyze_stocks_batch 且 config.LLM_BATCH_SIZE > 1 时多只股票合并为一次请求
+
+    Returns:
+        Dict: {symbol: 分析结果}，数据获取失败的股票不在其中
+    """
+    if not symbols:
+        return {}
+    stock_data_map = shared.stock_data(symbols)
     
-    if stock_data_map:
-        log("正在分析个股数据...")
-        for symbol, data_str in stock_data_map.items():
-            log(f"正在分析 {symbol} ...")
-            
-            # 如果数据获取出错
-            if "错误" in data_str or "无法获取" in data_str:
-                 log(f"{symbol} 数据获取失败，跳过分析")
-                 continue
-            
-            analysis_result = analyze_stock_func(data_str)
-            
+    pending = []
+    for symbol, record in stock_data_map.items():
+        # 如果数据获取出错
+        if not record.ok:
+             log(f"{symbol} 数据获取失败，跳过分析: {record.render()}", symbol=symbol)
+             continue
+        pending.append((symbol, shared.stock_prompt(record)))
+
+    # 并发调用 AI 分析 (限制在途请求数并按 provider 限流)
+    log(f"正在并发分析 {len(pending)} 只股票 ({provider.name}) ...")
+
+    def on_result(symbol, result):
+        if report:
+            report.close_section(symbol, keep=not is_analysis_error(result))
+        log(f"{symbol} 分析完成 ({provider.name})", symbol=symbol)
+
+    open_stream = (lambda symbol: report.open_section(symbol).write) if report else None
+    with span("stage", stage="stock_analysis", provider=provider.name):
+        if provider.analyze_stocks_batch is not None:
+            return analyze_in_batches(
+                pending, provider.analyze_stocks_batch, provider.analyze_stock, provider.name, is_analysis_error,
+                on_result=on_result, open_stream=open_stream,
+            )
+        return analyze_concurrently(
+            pending, provider.analyze_stock, provider.name, is_analysis_error,
+            on_result=on_result, open_stream=open_stream,
+        )
+
+def analyze_with_provider(provider, shared, configured, symbols_future, report=None):
+    """
+    使用一个模型完成宏观与个股分析
+
+    Returns:
+        (宏观分析结果 或 None, [(symbol, 分析结果), ...] 按报告顺序排列)
+    """
+    # 个股分析只依赖宏观结果中的推荐代码：配置的股票立即开始获取与分析，
+    # 宏观结果中出现推荐代码后立即追加处理 AI 推荐的股票，宏观分析的耗时被个股分析覆盖
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix=f"pipeline-{provider.name}") as pipeline:
+        extra = {"symbols": [], "future": None}
+        extra_lock = threading.Lock()
+
+        def start_extra(recommended_stocks):
+            # 流式检测与完整结果都可能触发，只启动一次
+            symbols = symbols_future.result()
+            with extra_lock:
+                if extra["future"] is not None:
+                    return
+                if recommended_stocks:
+                    log(f"AI 推荐关注股票 ({provider.name}): {recommended_stocks}")
+                extra["symbols"] = [code for code in recommended_stocks if code not in symbols]
+                with _symbols_lock:
+                    for code in recommended_stocks:
+                        if code not in config.STOCK_SYMBOLS:
+                            config.STOCK_SYMBOLS.append(code)
+                if extra["symbols"]:
+                    log(f"追加分析 AI 推荐股票 ({provider.name}): {extra['symbols']}")
+                extra["future"] = pipeline.submit(run_stock_stage, extra["symbols"], provider, shared, report)
+
+        macro_future = pipeline.submit(run_macro_stage, provider, shared, report, start_extra)
+        symbols = symbols_future.result()
+        base_future = pipeline.submit(run_stock_stage, symbols, provider, shared, report)
+
+        macro_analysis, recommended_stocks = macro_future.result()
+        start_extra(recommended_stocks)
+        extra_symbols = extra["symbols"]
+        analysis_map = {**base_future.result(), **extra["future"].result()}
+
+    # 报告按 配置股票 -> AI 推荐 -> 筛选候选 的顺序拼接 (与串行执行时一致)
+    ordered = configured + extra_symbols + [code for code in symbols if code not in configured]
+    return macro_analysis, [(symbol, analysis_map[symbol]) for symbol in ordered if symbol in analysis_map]
+
+def render_sections(macro_analysis, stock_results, heading="##"):
+    """
+    将一个模型的分析结果拼接为 Markdown 章节
+
+    Returns:
+        (Markdown 文本, 有效章节数)
+    """
+    md_report = ""
+    valid_content_count = 0
+
+    if macro_analysis:
+        md_report += f"{heading} 🌏 宏观策略报告\n\n"
+        md_report += macro_analysis + "\n\n"
+        md_report += "---\n\n"
+        valid_content_count += 1
+
+    if stock_results:
+        for symbol, analysis_result in stock_results:
             if is_analysis_error(analysis_result):
-                log(f"{symbol} 分析返回错误，跳过报告生成: {analysis_result[:100]}...")
+                log(f"{symbol} 分析返回错误，跳过报告生成: {analysis_result[:100]}...", symbol=symbol)
                 continue
                 
-            md_report += f"## 📊 {symbol} 个股分析\n\n"
+            md_report += f"{heading} 📊 {symbol} 个股分析\n\n"
             md_report += analysis_result + "\n\n"
             md_report += "---\n\n"
             valid_content_count += 1
     else:
         log("未配置个股或获取失败，跳过个股分析。")
+    return md_report, valid_content_count
 
-    # 检查是否有有效内容
-    if valid_content_count == 0:
-        log("本次任务未生成任何有效分析内容，取消发送邮件。")
-        return
-
-    # 3. 转换为 HTML
-    html_report = markdown.markdown(md_report, extensions=['tables', 'fenced_code'])
+def send_report(md_report, model_name, title="每日股票分析报告"):
+    # 4. 转换为 HTML
+    with span("stage", stage="render"):
+        html_report = markdown.markdown(md_report, extensions=['tables', 'fenced_code'])
     
     # 添加简单的 CSS 样式，让邮件更好看
     html_style = """
@@ -142,35 +300,217 @@ def run_analysis_job(analyze_market_func, extract_stock_codes_func, analyze_stoc
     """
     final_html = f"<html><head>{html_style}</head><body>{html_report}</body></html>"
 
-    # 4. 发送邮件
-    log("正在发送邮件...")
-    subject = f"每日股票分析报告（{model_name}） - {datetime.date.today()}"
-    send_email(subject, final_html)
-    
+    # 5. 发送邮件
+    subject = f"{title}（{model_name}） - {datetime.date.today()}"
+    outbox = get_outbox()
+    if outbox is None:
+        log("正在发送邮件...")
+        send_email(subject, final_html)
+        return
+    # 先写入待发送队列，发送失败时由后台线程 (或下次运行) 重发，不需要重新分析
+    outbox.enqueue(subject, final_html)
+    if not notify_deliverer():
+        log("正在发送邮件...")
+        outbox.deliver_due(send_email)
+
+def _export_metrics(run_name):
+    """
+    输出本次运行各阶段耗时与计数器摘要，并写入 JSON / Prometheus 文件
+    """
+    summary_text = format_metrics_summary()
+    if summary_text:
+        log(f"运行指标 (耗时最多的阶段与接口):\n{summary_text}")
+    path = export_run_metrics(run_name)
+    if path:
+        log(f"运行指标已写入: {path}")
+
+def _run_providers(providers, session, report_mode):
+    """
+    各模型并行分析并生成、发送报告
+    """
+    model_names = [provider.name for provider in providers]
+    # 本次运行共享的市场快照与行情数据，行业板块与个股数据只下载一次
+    shared = SharedInputs(MarketSnapshot())
+    configured = list(config.STOCK_SYMBOLS)
+
+    # --- 1~3. 各模型并行执行宏观分析与个股分析，全市场筛选与宏观分析同时进行 ---
+    with ThreadPoolExecutor(max_workers=len(providers) + 1, thread_name_prefix="job") as job_pool:
+        symbols_future = job_pool.submit(collect_symbols)
+        # 分析内容边接收边写入磁盘 (每个模型一个目录、每个章节一个文件)
+        reports = {provider.name: StreamingReport(f"{session}_{provider.name}") for provider in providers}
+        futures = [
+            (provider, job_pool.submit(analyze_with_provider, provider, shared, configured, symbols_future, reports[provider.name]))
+            for provider in providers
+        ]
+        results = [(provider, future.result()) for provider, future in futures]
+
+    # 输出本次 token 用量 (含服务端前缀缓存命中情况)
+    usage_text = format_usage_summary()
+    if usage_text:
+        log(f"LLM 用量统计:\n{usage_text}")
+    broken = open_breakers()
+    if broken:
+        log(f"本次运行中熔断的数据接口: {broken}")
+
+    header = f"# 宏观市场与股票分析日报 ({session})\n\n---\n\n"
+    if report_mode == "combined" and len(results) > 1:
+        md_report = header
+        valid_content_count = 0
+        for provider, (macro_analysis, stock_results) in results:
+            sections, count = render_sections(macro_analysis, stock_results, heading="###")
+            if count:
+                md_report += f"## 🤖 {provider.name}\n\n" + sections
+                valid_content_count += count
+        # 检查是否有有效内容
+        if valid_content_count == 0:
+            log("本次任务未生成任何有效分析内容，取消发送邮件。")
+            return
+        StreamingReport(f"{session}_combined").save(md_report)
+        send_report(md_report, " + ".join(model_names))
+    else:
+        for provider, (macro_analysis, stock_results) in results:
+            sections, valid_content_count = render_sections(macro_analysis, stock_results)
+            # 检查是否有有效内容
+            if valid_content_count == 0:
+                log(f"本次任务未生成任何有效分析内容 ({provider.name})，取消发送邮件。")
+                continue
+            md_report = header + sections
+            reports[provider.name].save(md_report)
+            send_report(md_report, provider.name)
+
+def run_analysis_job(providers, report_mode=None):
+    """
+    执行一次分析任务：多个模型并行分析，共用一次大盘与个股数据获取
+
+    Args:
+        providers: Provider 列表
+        report_mode: "per_model" 每个模型单独一份报告 / "combined" 合并为一份报告，默认读取 config.REPORT_MODE
+    """
+    if report_mode is None:
+        report_mode = getattr(config, 'REPORT_MODE', DEFAULT_REPORT_MODE)
+    model_names = [provider.name for provider in providers]
+
+    # 报告日期为最近一个交易日；非交易日 (周末/节假日) 若该交易日的报告已生成，则跳过全部数据获取与 AI 分析
+    calendar = get_trade_calendar()
+    today = datetime.date.today()
+    session = calendar.last_session(today)
+    if not calendar.is_trading_day(today):
+        if report_mode == "combined" and len(providers) > 1:
+            report_names = [f"{session}_combined"]
+        else:
+            report_names = [f"{session}_{name}" for name in model_names]
+        if all(report_exists(name) for name in report_names):
+            log(f"今天不是交易日，最近交易日 {session} 的报告已生成，跳过本次任务。")
+            return
+        log(f"今天不是交易日，补充生成最近交易日 {session} 的报告。")
+
+    run_id = f"{session}_{datetime.datetime.now().strftime('%H%M%S')}"
+    with run_context(run_id):
+        log(f"开始执行定时任务 ({', '.join(model_names)})...")
+        reset_usage()
+        reset_breakers()
+        reset_metrics()
+        try:
+            with span("stage", stage="job"):
+                _run_providers(providers, session, report_mode)
+        finally:
+            # 各阶段耗时、akshare 接口耗时、重试/缓存/失败计数
+            _export_metrics(run_id)
+        log("任务执行完毕！")
+
     log("任务执行完毕！")
 
-def job():
-    run_analysis_job(analyze_market, extract_stock_codes, analyze_stock, "DeepSeek")
+def run_intraday_job(providers, tracker, now=None):
+    """
+    盘中刷新：获取一次全市场快照，增量更新各股票的均线与量比，
+    只对信号变化超过 config.INTRADAY_THRESHOLDS 的股票重新调用 AI 分析并发送更新
+    """
+    now = now or datetime.datetime.now()
+    if not in_trading_session(now):
+        return
+    with run_context(f"{now.date()}_{now.strftime('%H%M')}_intraday"):
+        _refresh_intraday(providers, tracker, now)
+
+def _refresh_intraday(providers, tracker, now):
+    symbols = list(config.STOCK_SYMBOLS)
+    log(f"开始盘中刷新 ({len(symbols)} 只股票)...")
+    try:
+        quotes = spot_quotes(load_spot_snapshot())
+    except Exception as e:
+        log(f"获取实时行情异常，跳过本次盘中刷新: {e}")
+        return
+    changed = tracker.refresh(symbols, quotes, now.date())
+    if not changed:
+        log("盘中信号无明显变化，跳过分析。")
+        return
+    log(f"信号变化的股票: {changed}")
+
+    shared = SharedInputs(MarketSnapshot())
+    stamp = now.strftime("%H%M")
+    with ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="intraday") as pool:
+        reports = {provider.name: StreamingReport(f"{now.date()}_{stamp}_intraday_{provider.name}") for provider in providers}
+        futures = [
+            (provider, pool.submit(run_stock_stage, changed, provider, shared, reports[provider.name]))
+            for provider in providers
+        ]
+        results = [(provider, future.result()) for provider, future in futures]
+
+    header = f"# 盘中信号更新 ({now.strftime('%Y-%m-%d %H:%M')})\n\n"
+    for symbol in changed:
+        signals = tracker.latest(symbol)
+        header += f"- {symbol}: 最新价 {signals.price:.2f}, 涨跌 {signals.change_pct:.2f}%, 量比 {signals.vol_ratio:.2f} ({signals.volume_label})\n"
+    header += "\n---\n\n"
+
+    analyzed = set()
+    for provider, analysis_map in results:
+        stock_results = [(symbol, analysis_map[symbol]) for symbol in changed if symbol in analysis_map]
+        analyzed.update(symbol for symbol, result in stock_results if not is_analysis_error(result))
+        sections, valid_content_count = render_sections(None, stock_results)
+        if valid_content_count == 0:
+            log(f"本次盘中刷新未生成任何有效分析内容 ({provider.name})，取消发送邮件。")
+            continue
+        md_report = header + sections
+        reports[provider.name].save(md_report)
+        send_report(md_report, provider.name, title="盘中信号更新")
+    # 分析成功的股票以当前信号作为下次比较的基准，失败的下次刷新时重试
+    for symbol in analyzed:
+        tracker.mark_analyzed(symbol)
+
+def job(model_names=None):
+    run_analysis_job(get_providers(model_names))
 
 def job_gemini():
-    run_analysis_job(analyze_market_gemini, extract_stock_codes_gemini, analyze_stock_gemini, "Gemini")
+    run_analysis_job(get_providers(["Gemini"]))
 
 def main():
     parser = argparse.ArgumentParser(description="股票分析助手")
     parser.add_argument("--now", action="store_true", help="立即运行一次任务")
+    parser.add_argument("--models", help="逗号分隔的模型列表 (如 DeepSeek,Gemini)，默认读取 config.LLM_PROVIDERS")
+    parser.add_argument("--intraday", action="store_true", help="立即执行一次盘中刷新 (仅在交易时段内生效)")
     args = parser.parse_args()
+    model_names = [name.strip() for name in args.models.split(",") if name.strip()] if args.models else None
 
     if args.now:
-        job()
-        # job_gemini()
+        job(model_names)
+        return
+    tracker = IntradayTracker()
+    if args.intraday:
+        run_intraday_job(get_providers(model_names), tracker)
         return
 
     # 设置定时任务
     log(f"股票分析助手已启动。将在每天 {config.SCHEDULE_TIME} 运行。")
+    # 后台发送待发送队列中的邮件 (包括上次运行发送失败的报告)
+    start_deliverer(send_email)
     print("按 Ctrl+C 退出程序。")
     
-    # 使用 DeepSeek 作为默认任务
-    schedule.every().day.at(config.SCHEDULE_TIME).do(job)
+    # 运行 config.LLM_PROVIDERS 中的全部模型 (默认 DeepSeek)
+    schedule.every().day.at(config.SCHEDULE_TIME).do(job, model_names)
+    # 盘中刷新：交易时段内按固定间隔运行，非交易时段的触发直接返回
+    if getattr(config, 'INTRADAY_ENABLED', False):
+        interval = getattr(config, 'INTRADAY_INTERVAL_MINUTES', DEFAULT_INTRADAY_INTERVAL_MINUTES)
+        log(f"盘中刷新已开启，交易时段内每 {interval} 分钟运行一次。")
+        schedule.every(interval).minutes.do(lambda: run_intraday_job(get_providers(model_names), tracker))
 
     while True:
         try:
@@ -0,0 +1,175 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import config
+
+# 指标输出目录 (容器内通过 docker-compose 挂载 ./data:/app/data 持久化)
+DEFAULT_METRICS_DIR = "/app/data/metrics"
+# Prometheus 指标名前缀
+PROMETHEUS_PREFIX = "stock_assistant"
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# (名称, 标签) -> {"count", "total", "max"}
+_timers: Dict[LabelKey, Dict[str, float]] = {}
+# (名称, 标签) -> 累计值
+_counters: Dict[LabelKey, float] = {}
+_metrics_lock = threading.Lock()
+
+def _key(name: str, labels: Dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def observe(name: str, seconds: float, **labels):
+    """
+    记录一次耗时 (秒)
+    """
+    key = _key(name, labels)
+    with _metrics_lock:
+        timer = _timers.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0})
+        timer["count"] += 1
+        timer["total"] += seconds
+        timer["max"] = max(timer["max"], seconds)
+
+def increment(name: str, value: float = 1, **labels):
+    """
+    计数器加 value
+    """
+    key = _key(name, labels)
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+@contextmanager
+def span(name: str, **labels):
+    """
+    记录 with 代码块的耗时 (抛出异常时同样记录)
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+def timed(name: str, **labels):
+    """
+    记录函数耗时的装饰器
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def reset_metrics():
+    with _metrics_lock:
+        _timers.clear()
+        _counters.clear()
+
+def metrics_summary() -> Dict[str, list]:
+    """
+    返回当前的全部指标，耗时按累计时间降序排列
+    """
+    with _metrics_lock:
+        timers = [
+            {"name": name, "labels": dict(labels), "count": int(t["count"]), "total": round(t["total"], 4),
+             "avg": round(t["total"] / t["count"], 4) if t["count"] else 0.0, "max": round(t["max"], 4)}
+            for (name, labels), t in _timers.items()
+        ]
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in _counters.items()
+        ]
+    timers.sort(key=lambda t: t["total"], reverse=True)
+    counters.sort(key=lambda c: (c["name"], sorted(c["labels"].items())))
+    return {"timers": timers, "counters": counters}
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    return ",".join(f"{k}={v}" for k, v in labels.items())
+
+def format_metrics_summary(top: int = 10) -> str:
+    """
+    生成耗时最多的 top 个阶段/接口与全部计数器的摘要文本
+    """
+    summary = metrics_summary()
+    lines = []
+    for t in summary["timers"][:top]:
+        lines.append(f"{t['name']}[{_format_labels(t['labels'])}]: {t['count']} 次, 累计 {t['total']:.2f}s, "
+                     f"平均 {t['avg']:.2f}s, 最长 {t['max']:.2f}s")
+    for c in summary["counters"]:
+        lines.append(f"{c['name']}[{_format_labels(c['labels'])}]: {c['value']:g}")
+    return "\n".join(lines)
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _prometheus_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in sorted(labels.items())) + "}"
+
+def prometheus_text() -> str:
+    """
+    以 Prometheus 文本格式导出 (可供 node_exporter 的 textfile collector 读取)
+    耗时导出为 <name>_seconds_sum / _count / _max，计数器导出为 <name>_total
+    """
+    summary = metrics_summary()
+    lines = []
+    typed = set()
+    for t in sorted(summary["timers"], key=lambda t: (t["name"], sorted(t["labels"].items()))):
+        base = f"{PROMETHEUS_PREFIX}_{t['name']}_seconds"
+        if base not in typed:
+            typed.add(base)
+            lines.append(f"# TYPE {base}_sum counter")
+            lines.append(f"# TYPE {base}_count counter")
+            lines.append(f"# TYPE {base}_max gauge")
+        labels = _prometheus_labels(t["labels"])
+        lines.append(f"{base}_sum{labels} {t['total']}")
+        lines.append(f"{base}_count{labels} {t['count']}")
+        lines.append(f"{base}_max{labels} {t['max']}")
+    for c in summary["counters"]:
+        name = f"{PROMETHEUS_PREFIX}_{c['name']}_total"
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_prometheus_labels(c['labels'])} {c['value']:g}")
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def export_run_metrics(run_name: str, extra: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    将本次运行的指标写入 METRICS_DIR/<run_name>.json，配置了 METRICS_PROMETHEUS_FILE 时同时写出 Prometheus 文本
+    写入失败 (例如非容器环境) 时只打印错误
+
+    Returns:
+        JSON 文件路径，写入失败时为 None
+    """
+    json_path = None
+    directory = getattr(config, 'METRICS_DIR', DEFAULT_METRICS_DIR)
+    if directory:
+        try:
+            json_path = os.path.join(directory, f"{run_name}.json")
+            _write_atomic(json_path, json.dumps({"run": run_name, **(extra or {}), **metrics_summary()}, ensure_ascii=False, indent=2))
+        except Exception as e:
+            print(f"写入运行指标失败: {e}")
+            json_path = None
+    prometheus_file = getattr(config, 'METRICS_PROMETHEUS_FILE', None)
+    if prometheus_file:
+        try:
+            _write_atomic(prometheus_file, prometheus_text())
+        except Exception as e:
+            print(f"写入 Prometheus 指标失败: {e}")
+    return json_path
@@ -0,0 +1,226 @@
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import config
+from metrics import increment
+
+# 待发送邮件目录 (容器内通过 docker-compose 挂载 ./data:/app/data 持久化)，设为 None 时直接发送
+DEFAULT_OUTBOX_DIR = "/app/data/outbox"
+# 超过最大尝试次数的邮件移入该子目录，不再自动重发
+FAILED_SUBDIR = "failed"
+DEFAULT_OUTBOX_MAX_ATTEMPTS = 10
+# 第 n 次失败后等待 base * 2^(n-1) 秒再重试，最长 max 秒
+DEFAULT_OUTBOX_RETRY_BASE_DELAY = 60
+DEFAULT_OUTBOX_RETRY_MAX_DELAY = 3600
+# 后台发送线程检查待发送邮件的间隔 (秒)
+DEFAULT_OUTBOX_POLL_INTERVAL = 60
+
+SendFunc = Callable[..., bool]
+
+class Outbox:
+    """
+    持久化的待发送邮件队列：每封邮件一个 JSON 文件，发送成功后删除
+    发送失败时记录尝试次数与下次重试时间，进程重启后继续重发，不需要重新获取数据与调用 AI 分析
+    """
+
+    def __init__(self, directory: str, max_attempts: int = DEFAULT_OUTBOX_MAX_ATTEMPTS,
+                 base_delay: float = DEFAULT_OUTBOX_RETRY_BASE_DELAY, max_delay: float = DEFAULT_OUTBOX_RETRY_MAX_DELAY):
+        self.directory = directory
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # 后台线程与进程退出前的发送互斥，避免同一封邮件重复发送
+        self._deliver_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, message_id: str) -> str:
+        return os.path.join(self.directory, f"{message_id}.json")
+
+    def _write(self, entry: Dict):
+        path = self._path(entry["id"])
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def enqueue(self, subject: str, content: str, to_emails: Optional[List[str]] = None) -> str:
+        """
+        写入一封待发送邮件 (to_emails 为 None 时发送时读取 config.TO_EMAILS)
+
+        Returns:
+            邮件 ID
+        """
+        now = time.time()
+        message_id = f"{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self._write({
+            "id": message_id,
+            "subject": subject,
+            "content": content,
+            "to_emails": to_emails,
+            "created_at": now,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "last_error": None,
+        })
+        increment("outbox_enqueued")
+        return message_id
+
+    def _move_to_failed(self, name: str):
+        failed_dir = os.path.join(self.directory, FAILED_SUBDIR)
+        os.makedirs(failed_dir, exist_ok=True)
+        os.replace(os.path.join(self.directory, name), os.path.join(failed_dir, name))
+
+    def pending(self) -> List[Dict]:
+        """
+        返回全部待发送邮件，按写入顺序排列
+        """
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    entries.append(json.load(f))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                print(f"待发送邮件 {name} 无法读取，移入 {FAILED_SUBDIR}/: {e}")
+                self._move_to_failed(name)
+        return entries
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(self.base_delay * (2 ** (attempts - 1)), self.max_delay)
+
+    def deliver_due(self, send: SendFunc, include_deferred: bool = False) -> int:
+        """
+        发送到期的邮件 (include_deferred 为 True 时忽略重试等待时间，发送全部待发送邮件)
+
+        Returns:
+            本次发送成功的数量
+        """
+        delivered = 0
+        with self._deliver_lock:
+            now = time.time()
+            for entry in self.pending():
+                if not include_deferred and entry["next_attempt_at"] > now:
+                    continue
+                try:
+                    ok = send(entry["subject"], entry["content"], entry["to_emails"])
+                    error = None if ok else "发送失败"
+                except Exception as e:
+                    ok, error = False, str(e)
+                if ok:
+                    os.remove(self._path(entry["id"]))
+                    increment("outbox_delivered")
+                    delivered += 1
+                    continue
+                entry["attempts"] += 1
+                entry["last_error"] = error
+                if entry["attempts"] >= self.max_attempts:
+                    increment("outbox_failed")
+                    print(f"邮件「{entry['subject']}」已尝试 {entry['attempts']} 次仍发送失败，移入 {FAILED_SUBDIR}/: {error}")
+                    self._write(entry)
+                    self._move_to_failed(f"{entry['id']}.json")
+                    continue
+                entry["next_attempt_at"] = time.time() + self.retry_delay(entry["attempts"])
+                self._write(entry)
+                print(f"邮件「{entry['subject']}」发送失败 (第 {entry['attempts']} 次)，"
+                      f"{self.retry_delay(entry['attempts']):.0f} 秒后重试: {error}")
+        return delivered
+
+class OutboxDeliverer:
+    """
+    后台发送线程：每隔 poll_interval 秒发送到期的邮件，notify() 可立即唤醒
+    """
+
+    def __init__(self, outbox: Outbox, send: SendFunc, poll_interval: float = DEFAULT_OUTBOX_POLL_INTERVAL):
+        self.outbox = outbox
+        self.send = send
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="outbox")
+
+    def start(self):
+        self._thread.start()
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self, timeout: float = 30):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.outbox.deliver_due(self.send)
+            except Exception as e:
+                print(f"发送待发送邮件异常: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+_outbox: Optional[Outbox] = None
+_deliverer: Optional[OutboxDeliverer] = None
+_outbox_lock = threading.Lock()
+
+def get_outbox() -> Optional[Outbox]:
+    """
+    获取进程内共享的待发送队列，config.OUTBOX_DIR 为空或目录无法创建时返回 None (直接发送)
+    """
+    global _outbox
+    directory = getattr(config, 'OUTBOX_DIR', DEFAULT_OUTBOX_DIR)
+    with _outbox_lock:
+        if _outbox is not None and _outbox.directory == directory:
+            return _outbox
+        _outbox = None
+        if directory:
+            try:
+                _outbox = Outbox(
+                    directory,
+                    max_attempts=getattr(config, 'OUTBOX_MAX_ATTEMPTS', DEFAULT_OUTBOX_MAX_ATTEMPTS),
+                    base_delay=getattr(config, 'OUTBOX_RETRY_BASE_DELAY', DEFAULT_OUTBOX_RETRY_BASE_DELAY),
+                    max_delay=getattr(config, 'OUTBOX_RETRY_MAX_DELAY', DEFAULT_OUTBOX_RETRY_MAX_DELAY),
+                )
+            except OSError as e:
+                print(f"无法创建待发送邮件目录 {directory}，邮件将直接发送: {e}")
+        return _outbox
+
+def start_deliverer(send: SendFunc) -> Optional[OutboxDeliverer]:
+    """
+    启动后台发送线程 (常驻进程使用)，启动时立即重发上次运行遗留的邮件
+    """
+    global _deliverer
+    outbox = get_outbox()
+    if outbox is None:
+        return None
+    with _outbox_lock:
+        if _deliverer is None:
+            _deliverer = OutboxDeliverer(outbox, send, getattr(config, 'OUTBOX_POLL_INTERVAL', DEFAULT_OUTBOX_POLL_INTERVAL))
+            _deliverer.start()
+        return _deliverer
+
+def notify_deliverer() -> bool:
+    """
+    唤醒后台发送线程，未启动时返回 False
+    """
+    with _outbox_lock:
+        deliverer = _deliverer
+    if deliverer is None:
+        return False
+    deliverer.notify()
+    return True
+
+def stop_deliverer():
+    global _deliverer
+    with _outbox_lock:
+        deliverer, _deliverer = _deliverer, None
+    if deliverer is not None:
+        deliverer.stop()
@@ -0,0 +1,68 @@
+import importlib
+import threading
+from typing import Callable, Dict, List, Optional
+
+import config
+
+# provider 名称 -> 实现模块，模块需提供 analyze_market / analyze_stock / analyze_stocks_batch / extract_stock_codes
+PROVIDER_MODULES = {
+    "DeepSeek": "analyzer",
+    "Gemini": "analyzer_gemini",
+}
+DEFAULT_LLM_PROVIDERS = ["DeepSeek"]
+
+class Provider:
+    """
+    分析模型接口
+    - analyze_market(market_data_str, news_str, on_chunk=None) -> str
+    - analyze_stock(stock_data_str, on_chunk=None) -> str
+    - analyze_stocks_batch(batch_input, on_chunk=None) -> str (可选，不提供时不使用批量模式)
+    - extract_stock_codes(text) -> list
+    name 同时用作限流、用量统计与报告标题中的模型名称
+    """
+
+    def __init__(self, name: str, analyze_market: Callable[..., str], analyze_stock: Callable[..., str],
+                 extract_stock_codes: Callable[[str], List[str]],
+                 analyze_stocks_batch: Optional[Callable[..., str]] = None):
+        self.name = name
+        self.analyze_market = analyze_market
+        self.analyze_stock = analyze_stock
+        self.extract_stock_codes = extract_stock_codes
+        self.analyze_stocks_batch = analyze_stocks_batch
+
+    @classmethod
+    def from_module(cls, name: str, module) -> "Provider":
+        return cls(
+            name,
+            module.analyze_market,
+            module.analyze_stock,
+            module.extract_stock_codes,
+            getattr(module, 'analyze_stocks_batch', None),
+        )
+
+    def __repr__(self):
+        return f"Provider({self.name})"
+
+_providers: Dict[str, Provider] = {}
+_providers_lock = threading.Lock()
+
+def get_provider(name: str) -> Provider:
+    """
+    按名称获取 provider，实现模块在首次使用时才导入 (未使用的模型不需要安装对应 SDK)
+    """
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            if name not in PROVIDER_MODULES:
+                raise ValueError(f"未知的模型: {name}，可选: {', '.join(PROVIDER_MODULES)}")
+            provider = Provider.from_module(name, importlib.import_module(PROVIDER_MODULES[name]))
+            _providers[name] = provider
+        return provider
+
+def get_providers(names: Optional[List[str]] = None) -> List[Provider]:
+    """
+    获取要运行的 provider 列表，默认读取 config.LLM_PROVIDERS
+    """
+    if names is None:
+        names = getattr(config, 'LLM_PROVIDERS', DEFAULT_LLM_PROVIDERS)
+    return [get_provider(name) for name in names]
@@ -0,0 +1,134 @@
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# 数据状态
+STATUS_OK = "ok"            # 获取成功
+STATUS_NO_DATA = "no_data"  # 接口无数据 (代码错误/停牌)
+STATUS_ERROR = "error"      # 获取过程中出错
+
+def _fmt(value: Optional[float], spec: str = ".2f", missing: str = "N/A") -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return missing
+    return format(value, spec)
+
+def _fmt_raw(value, missing: str = "未知") -> str:
+    """
+    估值等字段按接口原值输出 (与原先直接拼接字符串一致)
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return missing
+    return f"{value}"
+
+@dataclass(slots=True)
+class Bar:
+    """
+    单根日 K 线 (仅保留提示词中用到的字段)
+    """
+    date: str
+    close: float
+    volume: float
+    ma5: float = math.nan
+    ma20: float = math.nan
+
+@dataclass(slots=True)
+class StockRecord:
+    """
+    单只股票的数据：数值字段 + 明确的状态，渲染成提示词文本推迟到调用 AI 前 (render)
+    """
+    symbol: str
+    status: str = STATUS_OK
+    error: Optional[str] = None
+    name: Optional[str] = None
+    industry: str = "未知"
+    total_mv: Optional[float] = None       # 总市值 (元)
+    pe_ttm: Optional[float] = None
+    pb: Optional[float] = None
+    roe: Optional[float] = None            # 最近一期 ROE (%)
+    roe_period: Optional[str] = None
+    sector: Optional[str] = None           # 匹配到的行业板块
+    sector_change: Optional[float] = None  # 行业板块涨跌幅 (%)
+    close: float = math.nan
+    change_pct: float = math.nan
+    ma5: float = math.nan
+    ma20: float = math.nan
+    ma60: float = math.nan
+    ma_state_label: str = ""
+    volume_label: str = ""
+    vol_ratio: float = math.nan
+    history: Tuple[Bar, ...] = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    @classmethod
+    def failed(cls, symbol: str, status: str, error: Optional[str] = None) -> "StockRecord":
+        return cls(symbol=symbol, status=status, error=error)
+
+    def relative_strength(self) -> str:
+        if not self.sector:
+            return f"行业({self.industry}) 数据未找到，无法对比"
+        rel_strength = self.change_pct - self.sector_change
+        status = "强于" if rel_strength > 0 else "弱于"
+        return f"个股 {self.change_pct:.2f}% vs 行业({self.sector}) {self.sector_change:.2f}% -> {status}板块 {abs(rel_strength):.2f}%"
+
+    def render(self) -> str:
+        """
+        渲染为发送给 AI 的数据文本
+        """
+        if self.status == STATUS_NO_DATA:
+            return f"无法获取 {self.symbol} 的数据 (可能代码错误或停牌)"
+        if self.status == STATUS_ERROR:
+            return f"获取 {self.symbol} 数据时出错: {self.error}"
+
+        total_mv = f"{self.total_mv / 100000000:.2f}亿" if self.total_mv else "未知"
+        roe = f"{_fmt_raw(self.roe)}% ({self.roe_period})" if self.roe is not None else "未知"
+        data_str = f"股票名称: {self.name or self.symbol} ({self.symbol})\n"
+        data_str += f"【基本面概况】\n"
+        data_str += f"- 所属行业: {self.industry}\n"
+        data_str += f"- 总市值: {total_mv}\n"
+        data_str += f"- 估值水平: PE(TTM)={_fmt_raw(self.pe_ttm)}, PB={_fmt_raw(self.pb)}\n"
+        data_str += f"- 财务质量: 最近ROE={roe}\n"
+        data_str += f"- 同业相对强弱: {self.relative_strength()}\n\n"
+
+        data_str += "【近期行情】 (Date, Open, High, Low, Close, Volume, MA5, MA20):\n"
+        for bar in self.history:
+            data_str += f"{bar.date}: C={bar.close:.2f}, V={bar.volume:.0f}, MA5={bar.ma5:.2f}, MA20={bar.ma20:.2f}\n"
+
+        vol_ratio = 0.0 if math.isnan(self.vol_ratio) else self.vol_ratio
+        data_str += f"\n【当前状态】\n"
+        data_str += f"- 收盘价: {self.close:.2f} (涨跌: {self.change_pct:.2f}%)\n"
+        data_str += f"- 均线形态: {self.ma_state_label}\n"
+        data_str += f"- 量能状态: {self.volume_label} (量比: {vol_ratio:.2f})\n"
+        data_str += f"- MA位置: MA5={_fmt(self.ma5)}, MA20={_fmt(self.ma20)}, MA60={_fmt(self.ma60)}\n"
+        return data_str
+
+@dataclass(slots=True)
+class IndexRecord:
+    """
+    大盘指数数据
+    """
+    symbol: str
+    sina_symbol: str = ""
+    status: str = STATUS_OK
+    error: Optional[str] = None
+    change_pct: float = math.nan
+    history: Tuple[Bar, ...] = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    def render(self) -> str:
+        if self.status == STATUS_NO_DATA:
+            return f"无法获取指数 {self.symbol} 数据"
+        if self.status == STATUS_ERROR:
+            return f"获取指数 {self.symbol} 出错: {self.error}"
+
+        data_str = f"指数代码: {self.symbol} ({self.sina_symbol})\n"
+        data_str += "【近期走势】:\n"
+        for bar in self.history:
+            data_str += f"{bar.date}: C={bar.close:.2f}, V={bar.volume:.0f}\n"
+        data_str += f"今日涨跌: {self.change_pct:.2f}%\n"
+        return data_str
@@ -0,0 +1,139 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import config
+
+# 报告目录 (容器内通过 docker-compose 挂载 ./data:/app/data 持久化)
+DEFAULT_REPORT_DIR = "/app/data/reports"
+
+RECOMMENDED_END_TAG = "</recommended_stocks>"
+
+class ReportSection:
+    """
+    报告中的一个章节，流式输出的内容逐块追加写入 <key>.md.part，完成后重命名为 <key>.md
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._file = None
+        if path:
+            try:
+                self._file = open(path + ".part", "w", encoding="utf-8")
+            except OSError:
+                self._file = None
+
+    def write(self, chunk: str):
+        if self._file is not None and chunk:
+            self._file.write(chunk)
+            self._file.flush()
+
+    def close(self, keep: bool = True):
+        """
+        结束章节：keep=True 时保留为正式章节文件，否则删除 (分析出错或准备重试)
+        """
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            if keep:
+                os.replace(self.path + ".part", self.path)
+            else:
+                os.remove(self.path + ".part")
+        except OSError:
+            pass
+
+def report_exists(name: str, root: Optional[str] = None) -> bool:
+    """
+    判断名为 name 的报告是否已经生成过完整的 report.md
+    """
+    if root is None:
+        root = getattr(config, 'REPORT_DIR', DEFAULT_REPORT_DIR)
+    return bool(root) and os.path.exists(os.path.join(root, name, "report.md"))
+
+class StreamingReport:
+    """
+    增量写入磁盘的分析报告
+    - 每个章节单独一个文件，流式输出时边接收边写入，运行中即可查看进度
+    - save() 按最终顺序写出完整报告 report.md
+    无法创建目录时 (例如非容器环境) 不写磁盘，只在内存中拼接报告
+    """
+
+    def __init__(self, name: str, root: Optional[str] = None):
+        if root is None:
+            root = getattr(config, 'REPORT_DIR', DEFAULT_REPORT_DIR)
+        self.directory = None
+        self._lock = threading.Lock()
+        self._sections: Dict[str, ReportSection] = {}
+        if root:
+            directory = os.path.join(root, name)
+            try:
+                os.makedirs(directory, exist_ok=True)
+                self.directory = directory
+            except:
+                self.directory = None
+
+    def open_section(self, key: str) -> ReportSection:
+        """
+        打开 (或重新打开) 章节，重新打开时丢弃之前写入的内容 (例如重试)
+        """
+        path = os.path.join(self.directory, f"{key}.md") if self.directory else None
+        with self._lock:
+            previous = self._sections.pop(key, None)
+        if previous is not None:
+            previous.close(keep=False)
+        section = ReportSection(path)
+        with self._lock:
+            self._sections[key] = section
+        return section
+
+    def close_section(self, key: str, keep: bool = True):
+        with self._lock:
+            section = self._sections.pop(key, None)
+        if section is not None:
+            section.close(keep)
+
+    def save(self, markdown_text: str) -> Optional[str]:
+        """
+        写出完整报告，返回文件路径
+        """
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, "report.md")
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(markdown_text)
+            os.replace(path + ".tmp", path)
+            return path
+        except OSError as e:
+            print(f"写入报告失败: {e}")
+            return None
+
+class RecommendedStocksWatcher:
+    """
+    在流式输出中检测 <recommended_stocks> 标签，标签完整后立即回调，无需等待整段回复结束
+    """
+
+    def __init__(self, extract_func: Callable[[str], List[str]], callback: Callable[[List[str]], None]):
+        self.extract_func = extract_func
+        self.callback = callback
+        self.fired = False
+        self.codes: List[str] = []
+        self._parts: List[str] = []
+        self._tail = ""
+
+    def feed(self, chunk: str):
+        if self.fired or not chunk:
+            return
+        self._parts.append(chunk)
+        # 只在新收到的内容 (含上一块末尾，防止标签被切开) 中查找结束标签
+        window = self._tail + chunk
+        self._tail = window[-len(RECOMMENDED_END_TAG):]
+        if RECOMMENDED_END_TAG not in window:
+            return
+        codes = self.extract_func("".join(self._parts))
+        if codes:
+            self.fired = True
+            self.codes = codes
+            self.callback(codes)
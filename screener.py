@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Set
+
+import config
+from data_fetcher import call_akshare
+
+# 默认筛选条件 (可在 config.py 中通过 SCREENER_FILTERS 覆盖)，区间为 (下限, 上限)，None 表示不限
+DEFAULT_SCREENER_FILTERS = {
+    "change_pct": (-3.0, 7.0),     # 涨跌幅 (%)，排除大跌与接近涨停的个股
+    "vol_ratio": (1.2, None),      # 量比，要求放量
+    "pe": (0.0, 60.0),             # 市盈率-动态，排除亏损与高估值
+    "pb": (0.0, 10.0),             # 市净率
+    "min_amount": 1e8,             # 最低成交额 (元)，排除流动性差的个股
+    "sector_top_n": 0,             # 只保留当日涨幅前 N 的行业板块成分股，0 表示不限制
+    "limit": 10,                   # 输出候选数量
+}
+
+# 东财全市场快照的列名 -> 筛选使用的字段名
+SPOT_COLUMNS = {
+    "代码": "code",
+    "名称": "name",
+    "最新价": "price",
+    "涨跌幅": "change_pct",
+    "成交量": "volume",
+    "成交额": "amount",
+    "量比": "vol_ratio",
+    "换手率": "turnover",
+    "市盈率-动态": "pe",
+    "市净率": "pb",
+    "总市值": "total_mv",
+}
+
+def load_spot_snapshot() -> pd.DataFrame:
+    """
+    一次请求获取全部 A 股实时快照 (约 5000 只)，并整理为数值列
+    """
+    spot = call_akshare("stock_zh_a_spot_em")
+    if spot is None or spot.empty:
+        return pd.DataFrame(columns=list(SPOT_COLUMNS.values()))
+    df = spot[[c for c in SPOT_COLUMNS if c in spot.columns]].rename(columns=SPOT_COLUMNS)
+    for col in df.columns:
+        if col not in ("code", "name"):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    df["code"] = df["code"].astype(str)
+    return df
+
+def fetch_strong_sector_members(top_n: int) -> Set[str]:
+    """
+    获取当日涨幅前 top_n 的行业板块 (东财) 的成分股代码
+    """
+    members: Set[str] = set()
+    if top_n <= 0:
+        return members
+    boards = call_akshare("stock_board_industry_name_em")
+    if boards is None or boards.empty:
+        return members
+    top_boards = boards.sort_values(by="涨跌幅", ascending=False).head(top_n)["板块名称"].tolist()
+    with ThreadPoolExecutor(max_workers=min(len(top_boards), 4) or 1, thread_name_prefix="screener") as pool:
+        futures = [pool.submit(call_akshare, "stock_board_industry_cons_em", symbol=name) for name in top_boards]
+        for future in futures:
+            try:
+                cons = future.result()
+                if cons is not None and not cons.empty:
+                    members.update(cons["代码"].astype(str))
+            except Exception as e:
+                print(f"获取板块成分股出错: {e}")
+    return members
+
+def _between(values: pd.Series, bounds) -> np.ndarray:
+    low, high = bounds if bounds is not None else (None, None)
+    mask = values.notna().to_numpy()
+    if low is not None:
+        mask = mask & (values > low).to_numpy()
+    if high is not None:
+        mask = mask & (values < high).to_numpy()
+    return mask
+
+def screen(spot: pd.DataFrame, filters: Optional[Dict[str, Any]] = None, sector_members: Optional[Set[str]] = None) -> pd.DataFrame:
+    """
+    对全市场快照做向量化筛选并排序
+
+    Args:
+        spot: load_spot_snapshot() 的结果
+        filters: 筛选条件，缺省字段使用 DEFAULT_SCREENER_FILTERS
+        sector_members: 强势板块成分股代码，传入时只保留其中的个股
+
+    Returns:
+        DataFrame: 按综合得分降序排列的候选股 (含 score 列)
+    """
+    filters = {**DEFAULT_SCREENER_FILTERS, **(filters or {})}
+    if spot.empty:
+        return spot.assign(score=pd.Series(dtype='float64'))
+
+    mask = np.ones(len(spot), dtype=bool)
+    for field in ("change_pct", "vol_ratio", "pe", "pb"):
+        if filters.get(field) is not None and field in spot.columns:
+            mask = mask & _between(spot[field], filters[field])
+    if filters.get("min_amount") and "amount" in spot.columns:
+        mask = mask & (spot["amount"] >= filters["min_amount"]).to_numpy()
+    # 排除 ST 个股
+    if "name" in spot.columns:
+        mask = mask & ~spot["name"].astype(str).str.contains("ST", na=False).to_numpy()
+    if sector_members is not None:
+        mask = mask & spot["code"].isin(sector_members).to_numpy()
+
+    candidates = spot[mask].copy()
+    # 综合得分：涨跌幅与量比的百分位排名之和
+    candidates["score"] = candidates["change_pct"].rank(pct=True) + candidates["vol_ratio"].rank(pct=True)
+    candidates = candidates.sort_values(by=["score", "code"], ascending=[False, True])
+    return candidates.head(int(filters["limit"]))
+
+def run_screener(filters: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    全市场筛选：一次下载全市场快照，向量化过滤后返回排序后的候选股票代码
+    """
+    filters = {**DEFAULT_SCREENER_FILTERS, **getattr(config, 'SCREENER_FILTERS', {}), **(filters or {})}
+    spot = load_spot_snapshot()
+    sector_members = None
+    if filters.get("sector_top_n"):
+        sector_members = fetch_strong_sector_members(int(filters["sector_top_n"]))
+    return screen(spot, filters, sector_members)["code"].tolist()
+
+if __name__ == "__main__":
+    print(run_screener())
@@ -0,0 +1,27 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# 测试不依赖用户本地的 config.py (其中包含 API Key 与邮箱授权码)，
+# 统一使用 config.example.py 中的默认配置作为 config 模块
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+_spec = importlib.util.spec_from_file_location("config", os.path.join(ROOT_DIR, "config.example.py"))
+_config = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_config)
+sys.modules["config"] = _config
+
+
+@pytest.fixture(autouse=True)
+def _offline_trade_calendar(monkeypatch):
+    """
+    测试不访问网络获取交易日历，使用只排除周末的日历
+    """
+    import datetime
+    import trade_calendar
+
+    monkeypatch.setattr(trade_calendar, "_calendar", trade_calendar.TradeCalendar())
+    monkeypatch.setattr(trade_calendar, "_calendar_day", datetime.date.today())
@@ -0,0 +1,68 @@
+import datetime
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app_log
+
+
+def _record(message, symbol=None):
+    return {"time": "2024-03-05 18:00:00", "level": "INFO", "run_id": "2024-03-05_180000", "symbol": symbol, "message": message}
+
+
+def test_log_writes_json_lines_with_run_and_symbol(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(app_log.config, "LOG_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(app_log.config, "LOG_FORMAT", "json", raising=False)
+    try:
+        with app_log.run_context("2024-03-05_180000"):
+            app_log.log("600519 分析完成", symbol="600519")
+        app_log.log("任务执行完毕！")
+        assert app_log.get_log_writer().flush()
+    finally:
+        app_log.close_log_writer()
+
+    lines = [json.loads(line) for line in (tmp_path / "app.log").read_text(encoding="utf-8").splitlines()]
+    assert [(r["run_id"], r["symbol"], r["message"]) for r in lines] == [
+        ("2024-03-05_180000", "600519", "600519 分析完成"),
+        (None, None, "任务执行完毕！"),
+    ]
+    assert "600519 分析完成" in capsys.readouterr().out
+
+
+def test_writer_rotates_by_size_and_date(tmp_path):
+    writer = app_log.AsyncLogWriter(str(tmp_path), max_bytes=100, backup_count=2)
+    try:
+        writer.submit(_record("a" * 60))
+        assert writer.flush()
+        writer.submit(_record("b" * 60))
+        assert writer.flush()
+        today = datetime.date.today()
+        assert (tmp_path / f"app.log.{today}").exists()
+        assert "b" * 60 in (tmp_path / "app.log").read_text(encoding="utf-8")
+
+        # 跨天：前一天的文件归档为 app.log.<前一天>
+        yesterday = today - datetime.timedelta(days=1)
+        writer._day = yesterday
+        writer.submit(_record("c"))
+        assert writer.flush()
+        assert "b" * 60 in (tmp_path / f"app.log.{yesterday}").read_text(encoding="utf-8")
+        assert (tmp_path / "app.log").read_text(encoding="utf-8").strip().endswith("c")
+
+        # 超出 backup_count 的旧归档被删除
+        for _ in range(3):
+            writer.submit(_record("d" * 90))
+            assert writer.flush()
+        assert len([name for name in os.listdir(tmp_path) if name.startswith("app.log.")]) == 2
+    finally:
+        writer.close()
+
+
+def test_full_queue_drops_without_blocking(tmp_path):
+    writer = app_log.AsyncLogWriter(str(tmp_path), queue_size=1)
+    writer.close()
+    writer.submit(_record("x"))
+    writer.submit(_record("y"))
+
+    assert writer.dropped == 1
@@ -0,0 +1,25 @@
+import benchmark
+
+
+def test_benchmark_replays_fixtures_offline(tmp_path):
+    result = benchmark.run_benchmark(3, akshare_latency=0, llm_latency=0, measure_memory=False, fixture_dir=str(tmp_path))
+
+    stages = result["stages"]
+    for stage in ("fetch_stock_data", "fetch_market_index_data", "fetch_financial_news", "run_analysis_job"):
+        assert stages[stage]["count"] == 1
+    # 数据获取阶段与完整任务各自冷启动，每只股票各获取一次
+    assert stages["symbol_fetch"]["count"] == 6
+    # 1 次大盘分析 + 3 次个股分析
+    assert stages["llm_call"]["count"] == 4
+    assert result["throughput"] > 0
+    assert "run_analysis_job" in benchmark.format_result(result)
+
+
+def test_fixture_akshare_returns_copies():
+    ak = benchmark.FixtureAkshare(benchmark.synthetic_fixtures())
+
+    df = ak.stock_zh_a_daily(symbol="sh600000")
+    df["close"] = 0
+
+    assert (ak.stock_zh_a_daily(symbol="sh600000")["close"] > 0).all()
+    assert "市净率" in benchmark._fixture_key("stock_zh_valuation_baidu", {"indicator": "市净率"})
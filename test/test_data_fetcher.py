@@ -0,0 +1,287 @@
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_fetcher
+import fetch_guard
+from kline_store import KLineStore
+from records import STATUS_NO_DATA
+from ttl_cache import TTLCache
+
+
+class FakeAkshare:
+    """
+    离线替身：返回固定的 DataFrame，并记录每个 host 的最大并发数
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.max_in_flight = {}
+
+    def _enter(self, endpoint):
+        host = data_fetcher.ENDPOINT_HOSTS.get(endpoint, endpoint)
+        with self.lock:
+            self.calls.append(endpoint)
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            self.max_in_flight[host] = max(self.max_in_flight.get(host, 0), self.in_flight[host])
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight[host] -= 1
+
+    def stock_zh_a_daily(self, symbol, start_date=None, end_date=None):
+        self._enter("stock_zh_a_daily")
+        dates = pd.date_range(end=pd.Timestamp(end_date or "today").normalize(), periods=70, freq="D")
+        base = int(symbol[-3:])
+        return pd.DataFrame({
+            "date": dates.strftime("%Y-%m-%d"),
+            "open": [base + i for i in range(70)],
+            "high": [base + i + 1 for i in range(70)],
+            "low": [base + i - 1 for i in range(70)],
+            "close": [base + i for i in range(70)],
+            "volume": [1000 + i for i in range(70)],
+        })
+
+    def stock_zh_index_daily(self, symbol):
+        self._enter("stock_zh_index_daily")
+        return self.stock_zh_a_daily("sh000100")
+
+    def stock_individual_info_em(self, symbol):
+        self._enter("stock_individual_info_em")
+        return pd.DataFrame({"item": ["股票简称", "行业", "总市值"], "value": [f"股票{symbol}", "酿酒行业", 2e11]})
+
+    def stock_zh_valuation_baidu(self, symbol, indicator):
+        self._enter("stock_zh_valuation_baidu")
+        return pd.DataFrame({"date": ["2024-01-01"], "value": [25.0 if "市盈率" in indicator else 8.0]})
+
+    def stock_financial_abstract(self, symbol):
+        self._enter("stock_financial_abstract")
+        return pd.DataFrame({"选项": ["常用指标"], "指标": ["净资产收益率(ROE)"], "20240930": [24.5]})
+
+    def stock_sector_spot(self, indicator):
+        self._enter("stock_sector_spot")
+        return pd.DataFrame({"板块": ["酿酒", "银行"], "涨跌幅": [1.0, -0.5]})
+
+    def stock_board_industry_summary_ths(self):
+        self._enter("stock_board_industry_summary_ths")
+        return pd.DataFrame({"板块": ["白酒", "银行"], "涨跌幅": [0.8, -0.4]})
+
+
+def _install_fake(monkeypatch, fake, tmp_path):
+    monkeypatch.setattr(data_fetcher, "ak", fake)
+    monkeypatch.setattr(data_fetcher, "_host_semaphores", {})
+    monkeypatch.setattr(fetch_guard, "_breakers", {})
+    store = KLineStore(root=str(tmp_path / "kline"))
+    monkeypatch.setattr(data_fetcher, "get_kline_store", lambda: store)
+    cache = TTLCache("fundamentals", root=str(tmp_path / "cache"))
+    monkeypatch.setattr(data_fetcher, "get_fundamental_cache", lambda: cache)
+    return cache
+
+
+def test_fetch_stock_data_keeps_input_order(monkeypatch, tmp_path):
+    fake = FakeAkshare(delay=0.01)
+    _install_fake(monkeypatch, fake, tmp_path)
+    symbols = ["600519", "000001", "300750", "600036"]
+
+    result = data_fetcher.fetch_stock_data(symbols, max_workers=4)
+
+    assert list(result.keys()) == symbols
+    text = result["600519"].render()
+    assert "股票名称: 股票600519 (600519)" in text
+    assert "PE(TTM)=25.0, PB=8.0" in text
+    assert "最近ROE=24.5% (20240930)" in text
+    assert "行业(酿酒)" in text
+    record = result["600519"]
+    assert record.ok and record.pe_ttm == 25.0 and record.roe == 24.5
+    assert len(record.history) == 5
+
+
+def test_fetch_stock_data_respects_host_limits(monkeypatch, tmp_path):
+    fake = FakeAkshare(delay=0.02)
+    _install_fake(monkeypatch, fake, tmp_path)
+    monkeypatch.setattr(data_fetcher.config, "FETCH_HOST_LIMITS", {"sina": 2, "eastmoney": 1, "baidu": 1, "ths": 1}, raising=False)
+
+    data_fetcher.fetch_stock_data([f"600{i:03d}" for i in range(8)], max_workers=8)
+
+    assert fake.max_in_flight["sina"] <= 2
+    assert fake.max_in_flight["eastmoney"] <= 1
+    assert fake.max_in_flight["baidu"] <= 1
+
+
+def test_fetch_stock_data_reuses_cached_fundamentals(monkeypatch, tmp_path):
+    fake = FakeAkshare()
+    cache = _install_fake(monkeypatch, fake, tmp_path)
+
+    data_fetcher.fetch_stock_data(["600519"])
+    first_calls = len(fake.calls)
+    data_fetcher.fetch_stock_data(["600519"])
+    second_calls = fake.calls[first_calls:]
+
+    assert "stock_individual_info_em" not in second_calls
+    assert "stock_zh_valuation_baidu" not in second_calls
+    assert "stock_financial_abstract" not in second_calls
+    assert cache.stats()["hits"] == 4
+
+
+def test_market_snapshot_downloads_boards_once(monkeypatch, tmp_path):
+    fake = FakeAkshare()
+    _install_fake(monkeypatch, fake, tmp_path)
+    snapshot = data_fetcher.MarketSnapshot()
+
+    data_fetcher.fetch_stock_data(["600519"], snapshot=snapshot)
+    news = data_fetcher.fetch_financial_news(snapshot)
+
+    assert "- 酿酒: 1.0%" in news
+    assert fake.calls.count("stock_sector_spot") == 1
+    assert fake.calls.count("stock_board_industry_summary_ths") == 1
+
+
+def _linear_scan_match(industry, sector_map):
+    """原先 fetch_stock_data 中的线性扫描匹配，用作对照"""
+    if industry in sector_map:
+        return industry
+    simple_name = industry.replace("行业", "")
+    if simple_name in sector_map:
+        return simple_name
+    for s_name in sector_map:
+        if len(s_name) >= 2 and len(industry) >= 2:
+            if industry in s_name or s_name in industry:
+                return s_name
+    return None
+
+
+SECTOR_MAP = {
+    "酿酒": 1.0,
+    "银行": -0.5,
+    "汽车整车": 0.3,
+    "半导体及元件": 2.1,
+    "元件": 1.5,
+    "电力行业": 0.2,
+    "车": 9.9,
+}
+
+
+def test_sector_matcher_matches_linear_scan():
+    matcher = data_fetcher.SectorMatcher(SECTOR_MAP)
+    industries = ["银行", "酿酒行业", "电力行业", "电力", "汽车", "半导体", "电子元件", "半导体及元件设备", "车", "货车", "未知", "房地产"]
+    for industry in industries:
+        assert matcher.match_name(industry) == _linear_scan_match(industry, SECTOR_MAP), industry
+
+
+def test_sector_matcher_cases():
+    matcher = data_fetcher.SectorMatcher(SECTOR_MAP)
+    # 精确匹配
+    assert matcher.match("银行") == ("银行", -0.5)
+    # 去除 "行业" 后缀
+    assert matcher.match("酿酒行业") == ("酿酒", 1.0)
+    # 包含匹配：多个候选时取板块列表中最靠前的一个
+    assert matcher.match("半导体及元件设备") == ("半导体及元件", 2.1)
+    assert matcher.match("电子元件") == ("元件", 1.5)
+    assert matcher.match("汽车") == ("汽车整车", 0.3)
+    # 单字板块不参与包含匹配
+    assert matcher.match("货车") is None
+
+
+def test_sector_matcher_memoizes_results():
+    matcher = data_fetcher.SectorMatcher(SECTOR_MAP)
+    assert matcher.match_name("汽车") == "汽车整车"
+    matcher.sector_map = {}
+    matcher._position = {}
+    matcher._bigrams = {}
+    assert matcher.match_name("汽车") == "汽车整车"
+    assert "汽车" in matcher._memo
+
+
+def test_fetch_sector_map_merges_sources():
+    snapshot = data_fetcher.MarketSnapshot()
+    snapshot.sina_boards = pd.DataFrame({"板块": ["酿酒", "银行", "酿酒"], "涨跌幅": [1.0, -0.5, 1.2]})
+    snapshot.ths_boards = pd.DataFrame({"板块": ["白酒", "银行", "白酒"], "涨跌幅": [0.8, -0.4, 0.9]})
+    snapshot._loaded = True
+
+    assert data_fetcher.fetch_sector_map(snapshot) == {"酿酒": 1.2, "银行": -0.5, "白酒": 0.8}
+
+
+def test_fetch_stock_data_cancels_fundamentals_for_empty_kline(monkeypatch, tmp_path):
+    fake = FakeAkshare()
+    _install_fake(monkeypatch, fake, tmp_path)
+    monkeypatch.setattr(fake, "stock_zh_a_daily", lambda symbol, start_date=None, end_date=None: pd.DataFrame())
+
+    class PendingFuture:
+        def __init__(self):
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+            return True
+
+    class IOPool:
+        def __init__(self):
+            self.pending = []
+
+        def submit(self, func, *args, **kwargs):
+            if func is data_fetcher._fetch_stock_daily:
+                from concurrent.futures import Future
+                future = Future()
+                future.set_result(func(*args, **kwargs))
+                return future
+            future = PendingFuture()
+            self.pending.append(future)
+            return future
+
+    pool = IOPool()
+    matcher = data_fetcher.SectorMatcher({})
+    result = data_fetcher._fetch_single_stock("600519", matcher, "20240101", "20240301", pool)
+
+    assert result.status == STATUS_NO_DATA and not result.ok
+    assert "无法获取 600519" in result.render()
+    assert len(pool.pending) == 4
+    assert all(f.cancelled for f in pool.pending)
+
+
+def test_em_daily_volume_converted_to_shares():
+    em = pd.DataFrame({"日期": ["2024-03-05"], "开盘": [10.0], "收盘": [10.5], "最高": [11.0], "最低": [9.5], "成交量": [1234]})
+    df = data_fetcher._em_daily_to_sina(em)
+    assert list(df[["date", "close", "volume"]].iloc[0]) == ["2024-03-05", 10.5, 123400]
+
+
+def test_daily_fundamentals_expire_at_next_close(monkeypatch, tmp_path):
+    fake = FakeAkshare()
+    cache = _install_fake(monkeypatch, fake, tmp_path)
+    captured = {}
+    original_set = cache.set
+
+    def record_set(key, value, ttl=None, expires_at=None):
+        captured[key[0]] = expires_at
+        original_set(key, value, ttl, expires_at=expires_at)
+
+    monkeypatch.setattr(cache, "set", record_set)
+    data_fetcher._cached_ak_call("stock_individual_info_em", symbol="600519")
+    data_fetcher._cached_ak_call("stock_financial_abstract", symbol="600519")
+
+    import datetime
+    next_close = data_fetcher._next_market_close(datetime.datetime.now()).timestamp()
+    assert captured["stock_individual_info_em"] <= next_close
+    assert captured["stock_financial_abstract"] > next_close
+
+
+def test_next_market_close():
+    import datetime
+    morning = datetime.datetime(2024, 3, 5, 10, 0)
+    evening = datetime.datetime(2024, 3, 5, 18, 0)
+    assert data_fetcher._next_market_close(morning) == datetime.datetime(2024, 3, 5, 15, 30)
+    assert data_fetcher._next_market_close(evening) == datetime.datetime(2024, 3, 6, 15, 30)
+
+
+def test_financial_news_reports_failed_ths_source():
+    snapshot = data_fetcher.MarketSnapshot()
+    snapshot.errors["ths"] = RuntimeError("timeout")
+    snapshot._loaded = True
+
+    assert data_fetcher.fetch_financial_news(snapshot) == "获取市场概况备选源出错: timeout"
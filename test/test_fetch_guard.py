@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetch_guard
+
+
+@pytest.fixture(autouse=True)
+def _fresh_breakers(monkeypatch):
+    monkeypatch.setattr(fetch_guard, "_breakers", {})
+    monkeypatch.setattr(fetch_guard.random, "uniform", lambda a, b: 0.0)
+
+
+def test_retries_network_errors_but_not_timeouts():
+    calls = {"flaky": 0, "slow": 0}
+
+    def flaky():
+        calls["flaky"] += 1
+        if calls["flaky"] < 3:
+            raise ConnectionError("reset by peer")
+        return "ok"
+
+    def slow():
+        calls["slow"] += 1
+        time.sleep(0.5)
+
+    assert fetch_guard.guarded_call("flaky", flaky, max_retries=2) == "ok"
+    started = time.monotonic()
+    with pytest.raises(fetch_guard.FetchTimeout):
+        fetch_guard.guarded_call("slow", slow, timeout=0.05, max_retries=2)
+    assert time.monotonic() - started < 0.4
+    assert calls == {"flaky": 3, "slow": 1}
+
+
+def test_breaker_fails_fast_after_repeated_failures(monkeypatch):
+    monkeypatch.setattr(fetch_guard.config, "FETCH_BREAKER_THRESHOLD", 2, raising=False)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise KeyError("data")
+
+    for _ in range(2):
+        with pytest.raises(KeyError):
+            fetch_guard.guarded_call("broken", broken)
+    with pytest.raises(fetch_guard.CircuitOpenError):
+        fetch_guard.guarded_call("broken", broken)
+
+    assert len(calls) == 2
+    assert fetch_guard.open_breakers() == ["broken"]
+
+
+def test_timed_out_call_keeps_host_slot_until_it_finishes():
+    semaphore = threading.BoundedSemaphore(1)
+    finished = threading.Event()
+
+    def slow():
+        time.sleep(0.2)
+        finished.set()
+
+    with pytest.raises(fetch_guard.FetchTimeout):
+        fetch_guard.guarded_call("slow", slow, semaphore=semaphore, timeout=0.02)
+    assert not semaphore.acquire(blocking=False)
+    assert finished.wait(timeout=2)
+    time.sleep(0.01)
+    assert semaphore.acquire(blocking=False)
+
+
+def test_first_available_falls_back_to_next_source():
+    def dead():
+        raise fetch_guard.CircuitOpenError("sina", "连续失败，已熔断")
+
+    assert fetch_guard.first_available([("sina", dead), ("em", lambda: "em 数据")]) == "em 数据"
+    with pytest.raises(fetch_guard.CircuitOpenError):
+        fetch_guard.first_available([("sina", dead)])
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators
+
+
+def test_rolling_mean_matches_pandas_with_padding():
+    rng = np.random.default_rng(0)
+    a = rng.uniform(10, 20, size=80)
+    b = rng.uniform(5, 6, size=30)
+    matrix = indicators.stack_right_aligned([a, b])
+
+    for window in indicators.MA_WINDOWS:
+        result = indicators.rolling_mean(matrix, window)
+        expected_a = pd.Series(a).rolling(window).mean().to_numpy()
+        expected_b = pd.Series(b).rolling(window).mean().to_numpy()
+        np.testing.assert_allclose(result[0], expected_a, equal_nan=True)
+        np.testing.assert_allclose(result[1, -30:], expected_b, equal_nan=True)
+
+
+def test_compute_board_latest_signals():
+    up = np.arange(1, 31, dtype=float)
+    down = up[::-1].copy()
+    flat = np.full(30, 10.0)
+    volume = np.array([100.0] * 29 + [200.0])
+    symbols, ind = indicators.compute_board({
+        "up": (up, volume),
+        "down": (down, volume),
+        "flat": (flat, volume),
+        "short": (up[:8], volume[:8]),
+    })
+
+    assert symbols == ["up", "down", "flat", "short"]
+    assert list(ind["ma_state"]) == [
+        indicators.MA_STATE_BULL,
+        indicators.MA_STATE_BEAR,
+        indicators.MA_STATE_MIXED,
+        indicators.MA_STATE_UNKNOWN,
+    ]
+    np.testing.assert_allclose(ind["change_pct"][:3], [(30 - 29) / 29 * 100, (1 - 2) / 2 * 100, 0.0])
+    np.testing.assert_allclose(ind["vol_ratio"][0], 200 / 120)
+    assert indicators.volume_status(ind["vol_ratio"][0]) == "放量"
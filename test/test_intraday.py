@@ -0,0 +1,60 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import intraday
+from indicators import compute_indicators, MA_WINDOWS
+
+SESSION = datetime.date(2024, 3, 5)
+
+
+def _history(n=80):
+    rng = np.random.default_rng(0)
+    closes = 10 + np.cumsum(rng.normal(0, 0.2, n))
+    volumes = rng.uniform(1e6, 2e6, n)
+    return closes, volumes
+
+
+def test_incremental_update_matches_full_recompute():
+    closes, volumes = _history()
+    state = intraday.SymbolState.from_history("600001", SESSION, closes, volumes)
+
+    for price, volume in [(closes[-1] * 1.01, 5e5), (closes[-1] * 0.97, 1.8e6)]:
+        signals = state.update(price, volume)
+        full = compute_indicators(np.append(closes, price), np.append(volumes, volume))
+        for w in MA_WINDOWS:
+            assert np.isclose(signals.ma[w], full[f"MA{w}"][0, -1])
+        assert np.isclose(signals.change_pct, full["change_pct"][0])
+        assert np.isclose(signals.vol_ratio, full["vol_ratio"][0])
+        assert signals.ma_state == int(full["ma_state"][0])
+
+
+def test_tracker_reports_only_changed_symbols():
+    closes, volumes = _history()
+    loads = []
+
+    def load_history(symbol, session):
+        loads.append(symbol)
+        return closes, volumes
+
+    tracker = intraday.IntradayTracker(thresholds={"change_pct": 1.0, "vol_ratio": 10.0}, load_history=load_history)
+    baseline = intraday.baseline_signals(closes, volumes)
+    # 以昨日涨跌幅为基准：600001 基本不变，600002 大涨
+    flat = closes[-1] * (1 + baseline.change_pct / 100)
+    quotes = {"600001": (flat, volumes[-1]), "600002": (closes[-1] * 1.05, volumes[-1])}
+
+    assert tracker.refresh(["600001", "600002", "600003"], quotes, SESSION) == ["600002"]
+    tracker.mark_analyzed("600002")
+    assert tracker.refresh(["600001", "600002"], quotes, SESSION) == []
+    # 同一交易日内只构建一次状态
+    assert loads == ["600001", "600002"]
+
+
+def test_in_trading_session():
+    assert intraday.in_trading_session(datetime.datetime(2024, 3, 5, 10, 0))
+    assert not intraday.in_trading_session(datetime.datetime(2024, 3, 5, 12, 0))
+    assert not intraday.in_trading_session(datetime.datetime(2024, 3, 9, 10, 0))
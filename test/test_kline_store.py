@@ -0,0 +1,103 @@
+import json
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kline_store import KLineStore
+
+
+def _bars(start, end):
+    dates = pd.bdate_range(start, end)
+    return pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%d"),
+        "open": range(len(dates)),
+        "high": range(len(dates)),
+        "low": range(len(dates)),
+        "close": [10.0 + i for i in range(len(dates))],
+        "volume": [1000.0] * len(dates),
+    })
+
+
+class RangeSource:
+    def __init__(self, last_day):
+        self.last_day = last_day
+        self.requests = []
+
+    def __call__(self, start, end):
+        self.requests.append((start, end))
+        upper = min(pd.Timestamp(end), pd.Timestamp(self.last_day))
+        if pd.Timestamp(start) > upper:
+            return pd.DataFrame()
+        return _bars(start, upper)
+
+
+def test_get_daily_appends_only_missing_tail(tmp_path):
+    store = KLineStore(root=str(tmp_path))
+    source = RangeSource("2024-03-01")
+    first = store.get_daily("sh600519", "20240101", "20240301", source)
+    assert source.requests == [("20240101", "20240301")]
+
+    source.last_day = "2024-03-05"
+    second = store.get_daily("sh600519", "20240101", "20240305", source)
+
+    assert source.requests[-1] == ("20240301", "20240305")
+    assert len(second) == len(first) + 2
+    assert second["date"].iloc[-1] == "2024-03-05"
+    assert second["date"].is_unique
+
+
+def test_get_daily_serves_current_data_without_network(tmp_path):
+    store = KLineStore(root=str(tmp_path))
+    source = RangeSource("2024-03-05")
+    store.get_daily("sh600519", "20240101", "20240305", source)
+
+    def offline(start, end):
+        raise AssertionError("不应访问网络")
+
+    df = KLineStore(root=str(tmp_path)).get_daily("sh600519", "20240105", "20240305", offline)
+    assert df["date"].iloc[0] == "2024-01-05"
+    assert df["date"].iloc[-1] == "2024-03-05"
+
+
+def test_get_daily_seeds_from_full_history(tmp_path):
+    store = KLineStore(root=str(tmp_path))
+    full_calls = []
+
+    def full():
+        full_calls.append(1)
+        return _bars("2020-01-01", "2024-03-01")
+
+    source = RangeSource("2024-03-04")
+    store.get_daily("sh000001", "20230301", "20240301", source, fetch_full=full)
+    df = store.get_daily("sh000001", "20230304", "20240304", source, fetch_full=full)
+
+    assert len(full_calls) == 1
+    assert source.requests == [("20240301", "20240304")]
+    assert df["date"].iloc[-1] == "2024-03-04"
+
+
+def test_get_daily_refetches_bar_stored_before_close(tmp_path):
+    store = KLineStore(root=str(tmp_path))
+    source = RangeSource("2024-03-05")
+    store.get_daily("sh600519", "20240101", "20240305", source)
+
+    # 模拟盘中 (10:00) 运行时存入了未收盘的 K 线
+    meta_path = tmp_path / "sh600519.json"
+    meta = json.loads(meta_path.read_text())
+    meta["checked_at"] = "2024-03-05T10:00:00"
+    meta_path.write_text(json.dumps(meta))
+
+    def closing_bar(start, end):
+        source.requests.append((start, end))
+        bars = _bars(start, end)
+        bars["close"] = 99.0
+        return bars
+
+    df = store.get_daily("sh600519", "20240101", "20240305", closing_bar)
+
+    assert source.requests[-1] == ("20240305", "20240305")
+    assert df["close"].iloc[-1] == 99.0
+    assert df["date"].is_unique
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_budget
+
+
+def _stock_text(rows):
+    text = "股票名称: 测试 (600000)\n【基本面概况】\n- 总市值: 1000亿\n\n【近期行情】:\n"
+    for i in range(rows):
+        text += f"2024-01-{i + 1:02d}: C=10.123456, V=123456.0, MA5=10.004567, MA20=9.876543\n"
+    text += "\n【当前状态】\n- 收盘价: 10.12\n- MA位置: MA5=10.00, MA20=9.88, MA60=9.50\n"
+    return text
+
+
+def test_within_budget_is_unchanged():
+    text = _stock_text(5)
+    assert llm_budget.fit_to_budget(text, "stock", budget=10000) is text
+
+
+def test_compaction_rounds_then_drops_oldest_rows():
+    text = _stock_text(20)
+    budget = llm_budget.estimate_tokens(_stock_text(4)) - 40
+    compacted = llm_budget.fit_to_budget(text, "stock", budget=budget)
+
+    assert llm_budget.estimate_tokens(compacted) <= budget
+    assert "C=10.12, V=123456, MA5=10.00" in compacted
+    # 保留最近的行情，删除较早的行情
+    assert "2024-01-20" in compacted and "2024-01-01" not in compacted
+    assert "【当前状态】" in compacted
+
+
+def test_truncates_as_last_resort():
+    compacted = llm_budget.fit_to_budget("新闻" * 5000, "news", budget=100)
+    assert compacted.endswith(llm_budget.TRUNCATED_MARK)
+    assert llm_budget.estimate_tokens(compacted) <= 100
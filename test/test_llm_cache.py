@@ -0,0 +1,63 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_cache
+from ttl_cache import TTLCache
+
+
+def _install_cache(monkeypatch, tmp_path):
+    cache = TTLCache("llm", root=str(tmp_path))
+    monkeypatch.setattr(llm_cache, "_llm_cache", cache)
+    monkeypatch.setattr(llm_cache.config, "LLM_CACHE_ENABLED", True, raising=False)
+    return cache
+
+
+def test_identical_input_is_served_from_cache(monkeypatch, tmp_path):
+    _install_cache(monkeypatch, tmp_path)
+    calls = []
+
+    @llm_cache.cached_analysis("deepseek", "model-a", "1")
+    def analyze(data, on_chunk=None):
+        calls.append(data)
+        return f"分析{len(calls)}"
+
+    assert analyze("数据A") == "分析1"
+    assert analyze("数据A") == "分析1"
+    assert analyze("数据B") == "分析2"
+    assert calls == ["数据A", "数据B"]
+
+
+def test_key_covers_model_and_template_version(monkeypatch, tmp_path):
+    _install_cache(monkeypatch, tmp_path)
+    model = {"name": "model-a"}
+    calls = []
+
+    def make(version):
+        @llm_cache.cached_analysis("gemini", lambda: model["name"], version)
+        def analyze(data, on_chunk=None):
+            calls.append((model["name"], version))
+            return "分析"
+        return analyze
+
+    make("1")("数据")
+    make("2")("数据")
+    model["name"] = "model-b"
+    make("2")("数据")
+    make("2")("数据")
+    assert calls == [("model-a", "1"), ("model-a", "2"), ("model-b", "2")]
+    assert llm_cache.response_cache_key("p", "m", "1", "ab", "c") != llm_cache.response_cache_key("p", "m", "1", "a", "bc")
+
+
+def test_errors_are_not_cached(monkeypatch, tmp_path):
+    _install_cache(monkeypatch, tmp_path)
+    results = ["调用 DeepSeek API 分析时出错: 503", "分析"]
+
+    @llm_cache.cached_analysis("deepseek", "model-a", "1")
+    def analyze(data, on_chunk=None):
+        return results.pop(0)
+
+    assert analyze("数据").startswith("调用 DeepSeek API")
+    assert analyze("数据") == "分析"
+    assert analyze("数据") == "分析"
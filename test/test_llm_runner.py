@@ -0,0 +1,91 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_runner
+
+
+def _is_error(text):
+    return not text or text.startswith("错误:")
+
+
+def _no_limit(monkeypatch):
+    monkeypatch.setattr(llm_runner, "_buckets", {})
+    monkeypatch.setattr(llm_runner.config, "LLM_RATE_LIMITS", {"test": (1000.0, 1000)}, raising=False)
+    monkeypatch.setattr(llm_runner.config, "LLM_RETRY_BASE_DELAY", 0.0, raising=False)
+    monkeypatch.setattr(llm_runner.random, "uniform", lambda a, b: 0.0)
+
+
+def test_results_keep_input_order_and_limit_in_flight(monkeypatch):
+    _no_limit(monkeypatch)
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def analyze(data):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        # 越靠前的股票越慢，完成顺序与输入顺序相反
+        time.sleep(0.05 * (5 - int(data)))
+        with lock:
+            state["active"] -= 1
+        return f"结果{data}"
+
+    items = [(f"s{i}", str(i)) for i in range(5)]
+    results = llm_runner.analyze_concurrently(items, analyze, "test", _is_error, max_in_flight=2)
+
+    assert list(results) == [s for s, _ in items]
+    assert results["s3"] == "结果3"
+    assert state["peak"] == 2
+
+
+def test_retries_only_retryable_errors(monkeypatch):
+    _no_limit(monkeypatch)
+    calls = {"busy": 0, "bad": 0}
+
+    def busy(data):
+        calls["busy"] += 1
+        return "错误: Error code: 429 rate limit" if calls["busy"] < 3 else "ok"
+
+    def bad(data):
+        calls["bad"] += 1
+        return "错误: invalid api key"
+
+    assert llm_runner.call_with_retry(busy, "x", provider="test", is_error=_is_error) == "ok"
+    assert calls["busy"] == 3
+    assert llm_runner.call_with_retry(bad, "x", provider="test", is_error=_is_error).startswith("错误")
+    assert calls["bad"] == 1
+
+
+def test_token_bucket_throttles_after_burst():
+    bucket = llm_runner.TokenBucket(rate=20.0, capacity=2)
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    # 突发 2 个后，剩余 2 个按 20 个/秒补充，约需 0.1 秒
+    assert time.monotonic() - started >= 0.08
+
+
+def test_batches_split_results_and_fall_back_for_unparsed(monkeypatch):
+    _no_limit(monkeypatch)
+    batch_inputs, singles = [], []
+
+    def analyze_batch(batch_input):
+        batch_inputs.append(batch_input)
+        # 模型漏掉了 s1 的报告
+        return "<<<REPORT s0>>>\n报告0\n<<<END REPORT s0>>>\n<<<REPORT s2>>>\n报告2\n<<<END REPORT s2>>>"
+
+    def analyze_single(data):
+        singles.append(data)
+        return f"单独{data}"
+
+    items = [("s0", "d0"), ("s1", "d1"), ("s2", "d2")]
+    results = llm_runner.analyze_in_batches(items, analyze_batch, analyze_single, "test", _is_error, batch_size=3)
+
+    assert results == {"s0": "报告0", "s1": "单独d1", "s2": "报告2"}
+    assert list(results) == ["s0", "s1", "s2"]
+    assert len(batch_inputs) == 1 and "<<<DATA s1>>>\nd1\n<<<END DATA s1>>>" in batch_inputs[0]
+    assert singles == ["d1"]
@@ -0,0 +1,112 @@
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+import mailer
+
+
+class _Handler:
+    def __init__(self, transient_failures=0):
+        self.transient_failures = transient_failures
+        self.messages = []
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            if self.transient_failures:
+                self.transient_failures -= 1
+                return "451 Temporary failure"
+            self.messages.append((session.peer, list(envelope.rcpt_tos)))
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    def start(handler):
+        controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+        controller.start()
+        servers.append(controller)
+        monkeypatch.setattr(mailer.config, "SMTP_SERVER", "127.0.0.1")
+        monkeypatch.setattr(mailer.config, "SMTP_PORT", controller.port)
+        monkeypatch.setattr(mailer.config, "SMTP_USER", "bot@example.com")
+        monkeypatch.setattr(mailer.config, "SMTP_RETRY_BASE_DELAY", 0, raising=False)
+        return handler
+
+    servers = []
+    mailer.close_smtp_pool()
+    yield start
+    mailer.close_smtp_pool()
+    for controller in servers:
+        controller.stop()
+
+
+def _count_connections(monkeypatch):
+    connects = []
+    original = mailer.SMTPPool._connect
+
+    def connect(self):
+        connects.append(1)
+        return original(self)
+    monkeypatch.setattr(mailer.SMTPPool, "_connect", connect)
+    return connects
+
+
+def test_batch_reuses_pooled_connections(monkeypatch, smtp_server):
+    handler = smtp_server(_Handler())
+    monkeypatch.setattr(mailer.config, "SMTP_MAX_CONNECTIONS", 2, raising=False)
+    connects = _count_connections(monkeypatch)
+
+    emails = [(f"报告{i}", f"<p>内容{i}</p>", [f"user{i}@example.com"]) for i in range(6)]
+    assert mailer.send_messages(emails) == [True] * 6
+    # 后续发送复用池中已登录的连接
+    assert mailer.send_email("盘中信号更新", "正文", ["a@example.com"])
+
+    assert sorted(rcpts[0] for _, rcpts in handler.messages) == sorted([f"user{i}@example.com" for i in range(6)] + ["a@example.com"])
+    assert len(connects) <= 2
+    assert len({peer for peer, _ in handler.messages}) <= 2
+
+
+def test_transient_failure_is_retried_on_new_connection(monkeypatch, smtp_server):
+    handler = smtp_server(_Handler(transient_failures=1))
+    connects = _count_connections(monkeypatch)
+
+    assert mailer.send_email("每日股票分析报告", "正文", ["a@example.com"])
+
+    assert handler.messages[0][1] == ["a@example.com"]
+    assert len(connects) == 2
+
+
+def test_per_recipient_delivery(monkeypatch, smtp_server):
+    handler = smtp_server(_Handler())
+    monkeypatch.setattr(mailer.config, "MAIL_PER_RECIPIENT", True, raising=False)
+    monkeypatch.setattr(mailer.config, "TO_EMAILS", ["a@example.com", "b@example.com"])
+
+    assert mailer.send_email("每日股票分析报告", "正文")
+
+    assert sorted(rcpts for _, rcpts in handler.messages) == [["a@example.com"], ["b@example.com"]]
+
+
+def test_permanent_failure_is_not_retried(monkeypatch, smtp_server):
+    class _Reject(_Handler):
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(1)
+            return "554 Rejected"
+
+    handler = smtp_server(_Reject())
+
+    assert mailer.send_email("每日股票分析报告", "正文", ["a@example.com"]) is False
+    assert len(handler.messages) == 1
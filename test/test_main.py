@@ -0,0 +1,179 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from analyzer import extract_stock_codes
+from providers import Provider
+
+
+class _Record:
+    def __init__(self, symbol, text):
+        self.symbol = symbol
+        self.ok = True
+        self._text = text
+
+    def render(self):
+        return self._text
+
+
+def _install(monkeypatch, sent, tmp_path):
+    monkeypatch.setattr(main.config, "LOG_DIR", None, raising=False)
+    monkeypatch.setattr(main.config, "REPORT_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(main.config, "STOCK_SYMBOLS", ["600001", "600002"])
+    monkeypatch.setattr(main.config, "SCREENER_ENABLED", False, raising=False)
+    monkeypatch.setattr(main, "MarketSnapshot", lambda: object())
+    monkeypatch.setattr(main, "fetch_market_index_data", lambda indexes: {"sh000001": _Record("sh000001", "上证指数")})
+    monkeypatch.setattr(main, "fetch_financial_news", lambda snapshot: "市场概况")
+    monkeypatch.setattr(main, "fetch_stock_data", lambda symbols, snapshot=None: {s: _Record(s, f"数据{s}") for s in symbols})
+    monkeypatch.setattr(main, "send_email", lambda subject, html: sent.append(html))
+    monkeypatch.setattr(main.config, "LLM_BATCH_SIZE", 1, raising=False)
+    monkeypatch.setattr(main.config, "METRICS_DIR", None, raising=False)
+    monkeypatch.setattr(main.config, "OUTBOX_DIR", None, raising=False)
+
+
+def test_stock_analysis_overlaps_macro_and_appends_recommended(monkeypatch, tmp_path):
+    sent = []
+    _install(monkeypatch, sent, tmp_path)
+    stock_started = threading.Event()
+
+    def analyze_market(market_data, news, on_chunk=None):
+        # 串行执行时个股分析不会在宏观分析返回前开始，这里会超时
+        assert stock_started.wait(timeout=5)
+        return "宏观结论"
+
+    def analyze_stock(data_str, on_chunk=None):
+        stock_started.set()
+        return f"分析{data_str}"
+
+    main.run_analysis_job([Provider("test", analyze_market, analyze_stock, lambda text: ["600003", "600001"])])
+
+    html = sent[0]
+    assert "宏观结论" in html
+    positions = [html.index(f"分析数据{code}") for code in ("600001", "600002", "600003")]
+    assert positions == sorted(positions)
+    assert html.index("宏观结论") < positions[0]
+    assert main.config.STOCK_SYMBOLS == ["600001", "600002", "600003"]
+
+
+def test_recommended_stocks_start_before_macro_stream_ends(monkeypatch, tmp_path):
+    sent = []
+    _install(monkeypatch, sent, tmp_path)
+    extra_started = threading.Event()
+
+    def analyze_market(market_data, news, on_chunk=None):
+        on_chunk("宏观结论\n<recommended_")
+        on_chunk('stocks>["600003"]</recommended_stocks>')
+        # 推荐代码已出现在流中，AI 推荐股票的分析应在宏观回复结束前开始
+        assert extra_started.wait(timeout=5)
+        on_chunk("\n结束")
+        return '宏观结论\n<recommended_stocks>["600003"]</recommended_stocks>\n结束'
+
+    def analyze_stock(data_str, on_chunk=None):
+        if data_str == "数据600003":
+            extra_started.set()
+        on_chunk("分析")
+        on_chunk(data_str)
+        return f"分析{data_str}"
+
+    main.run_analysis_job([Provider("test", analyze_market, analyze_stock, extract_stock_codes)])
+
+    report_dir = next(tmp_path.iterdir())
+    assert (report_dir / "macro.md").read_text(encoding="utf-8").startswith("宏观结论")
+    assert (report_dir / "600003.md").read_text(encoding="utf-8") == "分析数据600003"
+    assert "分析数据600003" in (report_dir / "report.md").read_text(encoding="utf-8")
+    assert not list(report_dir.glob("*.part"))
+
+
+def test_multiple_providers_share_one_fetch(monkeypatch, tmp_path):
+    sent = []
+    _install(monkeypatch, sent, tmp_path)
+    fetched = []
+    monkeypatch.setattr(main, "fetch_stock_data", lambda symbols, snapshot=None: fetched.extend(symbols) or {s: _Record(s, f"数据{s}") for s in symbols})
+    market_fetches = []
+    monkeypatch.setattr(main, "fetch_market_index_data", lambda indexes: market_fetches.append(1) or {"sh000001": _Record("sh000001", "上证指数")})
+
+    def make(name, recommended):
+        return Provider(
+            name,
+            lambda market_data, news, on_chunk=None: f"{name} 宏观",
+            lambda data_str, on_chunk=None: f"{name} 分析{data_str}",
+            lambda text: recommended,
+        )
+
+    main.run_analysis_job([make("A", ["600003"]), make("B", ["600003"])], report_mode="combined")
+
+    assert sorted(fetched) == ["600001", "600002", "600003"]
+    assert market_fetches == [1]
+    assert len(sent) == 1
+    html = sent[0]
+    assert "A 分析数据600003" in html and "B 分析数据600001" in html
+    assert html.index("A 宏观") < html.index("B 宏观")
+
+
+def test_intraday_refresh_analyzes_only_changed_symbols(monkeypatch, tmp_path):
+    import datetime
+    import numpy as np
+    import pandas as pd
+    from intraday import IntradayTracker
+
+    sent = []
+    _install(monkeypatch, sent, tmp_path)
+    closes = np.linspace(10, 11, 80)
+    volumes = np.full(80, 1e6)
+    spot = pd.DataFrame({"code": ["600001", "600002"], "price": [11.0, 11.6], "volume": [1e4, 1e4]})
+    monkeypatch.setattr(main, "load_spot_snapshot", lambda: spot)
+    tracker = IntradayTracker(thresholds={"change_pct": 1.0, "vol_ratio": 10.0}, load_history=lambda symbol, session: (closes, volumes))
+    analyzed = []
+
+    def analyze_stock(data_str, on_chunk=None):
+        analyzed.append(data_str)
+        return f"分析{data_str}"
+
+    provider = Provider("test", None, analyze_stock, lambda text: [])
+    now = datetime.datetime(2024, 3, 5, 10, 0)
+    main.run_intraday_job([provider], tracker, now=now)
+    main.run_intraday_job([provider], tracker, now=now)
+
+    assert analyzed == ["数据600002"]
+    assert len(sent) == 1 and "600002" in sent[0]
+
+
+def test_non_trading_day_skips_when_session_report_exists(monkeypatch, tmp_path):
+    import datetime
+    import numpy as np
+    import trade_calendar
+
+    sent = []
+    _install(monkeypatch, sent, tmp_path)
+    today = datetime.date.today()
+    session = today - datetime.timedelta(days=3)
+    dates = np.array([session, today + datetime.timedelta(days=3)], dtype="datetime64[D]")
+    monkeypatch.setattr(trade_calendar, "_calendar", trade_calendar.TradeCalendar(dates))
+    (tmp_path / f"{session}_test").mkdir()
+    (tmp_path / f"{session}_test" / "report.md").write_text("已生成", encoding="utf-8")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("非交易日不应重新获取数据或调用 AI")
+
+    monkeypatch.setattr(main, "fetch_stock_data", fail)
+    main.run_analysis_job([Provider("test", fail, fail, lambda text: [])])
+
+    assert sent == []
+
+
+def test_send_report_keeps_failed_report_in_outbox(monkeypatch, tmp_path):
+    import outbox
+
+    monkeypatch.setattr(main.config, "LOG_DIR", None, raising=False)
+    monkeypatch.setattr(main.config, "OUTBOX_DIR", str(tmp_path), raising=False)
+    monkeypatch.setattr(outbox, "_outbox", None)
+    monkeypatch.setattr(main, "send_email", lambda subject, html, to_emails=None: False)
+
+    main.send_report("# 报告", "DeepSeek")
+
+    [entry] = outbox.get_outbox().pending()
+    assert entry["subject"].startswith("每日股票分析报告（DeepSeek）")
+    assert entry["attempts"] == 1
@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics():
+    metrics.reset_metrics()
+    yield
+    metrics.reset_metrics()
+
+
+def test_spans_and_counters_are_aggregated_by_labels():
+    for _ in range(2):
+        with metrics.span("akshare", endpoint="stock_zh_a_daily"):
+            pass
+    with pytest.raises(RuntimeError):
+        with metrics.span("akshare", endpoint="stock_zh_valuation_baidu"):
+            raise RuntimeError("超时")
+    metrics.increment("cache_hits", cache="llm")
+    metrics.increment("cache_hits", 2, cache="llm")
+
+    summary = metrics.metrics_summary()
+    counts = {t["labels"]["endpoint"]: t["count"] for t in summary["timers"]}
+    assert counts == {"stock_zh_a_daily": 2, "stock_zh_valuation_baidu": 1}
+    assert summary["counters"] == [{"name": "cache_hits", "labels": {"cache": "llm"}, "value": 3}]
+
+
+def test_export_writes_json_and_prometheus(monkeypatch, tmp_path):
+    prom_path = tmp_path / "prom" / "stock.prom"
+    monkeypatch.setattr(metrics.config, "METRICS_DIR", str(tmp_path / "metrics"), raising=False)
+    monkeypatch.setattr(metrics.config, "METRICS_PROMETHEUS_FILE", str(prom_path), raising=False)
+    metrics.observe("stage", 1.5, stage="macro_analysis", provider="DeepSeek")
+    metrics.increment("fetch_retries", endpoint="stock_zh_a_hist")
+
+    path = metrics.export_run_metrics("2024-03-05_180000")
+
+    data = json.loads(open(path, encoding="utf-8").read())
+    assert data["run"] == "2024-03-05_180000"
+    assert data["timers"][0]["total"] == 1.5
+    text = prom_path.read_text(encoding="utf-8")
+    assert 'stock_assistant_stage_seconds_sum{provider="DeepSeek",stage="macro_analysis"} 1.5' in text
+    assert 'stock_assistant_fetch_retries_total{endpoint="stock_zh_a_hist"} 1' in text
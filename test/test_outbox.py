@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import outbox
+
+
+def test_failed_delivery_survives_restart_and_is_resent(tmp_path):
+    box = outbox.Outbox(str(tmp_path), base_delay=60)
+    box.enqueue("每日股票分析报告（DeepSeek）", "<html>报告</html>")
+
+    assert box.deliver_due(lambda subject, content, to_emails: False) == 0
+    [entry] = box.pending()
+    assert entry["attempts"] == 1 and entry["last_error"] == "发送失败"
+    # 未到重试时间时不发送
+    assert box.deliver_due(lambda *args: True) == 0
+
+    # 进程重启：新的 Outbox 从磁盘读取遗留的邮件
+    sent = []
+    restarted = outbox.Outbox(str(tmp_path))
+    assert restarted.deliver_due(lambda subject, content, to_emails: sent.append((subject, content)) or True, include_deferred=True) == 1
+    assert sent == [("每日股票分析报告（DeepSeek）", "<html>报告</html>")]
+    assert restarted.pending() == []
+
+
+def test_exhausted_attempts_move_to_failed(tmp_path):
+    box = outbox.Outbox(str(tmp_path), max_attempts=2, base_delay=0)
+
+    def boom(*args):
+        raise OSError("连接被拒绝")
+
+    box.enqueue("报告", "正文")
+    box.deliver_due(boom)
+    box.deliver_due(boom)
+
+    assert box.pending() == []
+    [name] = os.listdir(tmp_path / outbox.FAILED_SUBDIR)
+    assert name.endswith(".json")
+
+
+def test_background_deliverer_drains_on_notify(tmp_path):
+    box = outbox.Outbox(str(tmp_path))
+    delivered = threading.Event()
+    deliverer = outbox.OutboxDeliverer(box, lambda *args: delivered.set() or True, poll_interval=3600)
+    deliverer.start()
+    try:
+        box.enqueue("盘中信号更新", "正文")
+        deliverer.notify()
+        assert delivered.wait(5)
+    finally:
+        deliverer.stop()
+    assert box.pending() == []
@@ -0,0 +1,47 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyzer
+import llm_usage
+import prompts
+
+
+def test_static_prefix_is_shared_and_data_goes_last():
+    first = prompts.build_stock_user_prompt("数据A")
+    second = prompts.build_stock_user_prompt("数据B")
+    assert first.endswith("数据A") and second.endswith("数据B")
+    assert "数据A" not in prompts.STOCK_SYSTEM_PROMPT
+    assert "{" not in prompts.STOCK_SYSTEM_PROMPT and "{" not in prompts.MARKET_SYSTEM_PROMPT
+    assert prompts.STOCK_BATCH_SYSTEM_PROMPT.startswith(prompts.STOCK_SYSTEM_PROMPT)
+    market = prompts.build_market_user_prompt("指数", "新闻")
+    assert market.index("指数") < market.index("新闻")
+
+
+def test_deepseek_stream_records_cached_tokens(monkeypatch):
+    requests = []
+
+    def chunk(content=None, usage=None):
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=20, prompt_cache_hit_tokens=900)
+        return iter([chunk("你"), chunk("好"), chunk(usage=usage)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(analyzer, "get_deepseek_client", lambda: client)
+    monkeypatch.setattr(analyzer.config, "LLM_STREAM", True, raising=False)
+    llm_usage.reset_usage()
+
+    assert analyzer._complete(prompts.STOCK_SYSTEM_PROMPT, "数据") == "你好"
+    messages = requests[0]["messages"]
+    assert messages[0] == {"role": "system", "content": prompts.STOCK_SYSTEM_PROMPT}
+    assert messages[-1]["content"] == "数据"
+    totals = llm_usage.usage_summary()["DeepSeek"]
+    assert (totals["calls"], totals["prompt_tokens"], totals["cached_tokens"], totals["completion_tokens"]) == (1, 1000, 900, 20)
+    assert llm_usage.call_records()[0]["first_token_latency"] is not None
+    assert "90.0%" in llm_usage.format_usage_summary()
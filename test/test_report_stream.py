@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer import extract_stock_codes
+from report_stream import RecommendedStocksWatcher, StreamingReport
+
+
+def test_watcher_detects_tag_split_across_chunks():
+    found = []
+    watcher = RecommendedStocksWatcher(extract_stock_codes, found.append)
+    for chunk in ["分析正文 <recommended_stocks>[\"600", "000\"]</recommended_st", "ocks>", " 尾部"]:
+        watcher.feed(chunk)
+    assert found == [["600000"]]
+    assert watcher.codes == ["600000"]
+
+
+def test_reopened_section_discards_previous_attempt(tmp_path):
+    report = StreamingReport("run", root=str(tmp_path))
+    report.open_section("600000").write("失败的一半")
+    report.open_section("600000").write("完整内容")
+    report.close_section("600000")
+    report.open_section("600001").write("出错")
+    report.close_section("600001", keep=False)
+
+    files = sorted(p.name for p in (tmp_path / "run").iterdir())
+    assert files == ["600000.md"]
+    assert (tmp_path / "run" / "600000.md").read_text(encoding="utf-8") == "完整内容"
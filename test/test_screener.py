@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import screener
+
+
+def _spot():
+    return pd.DataFrame({
+        "code": ["600001", "600002", "600003", "600004", "600005", "600006"],
+        "name": ["甲", "乙", "*ST丙", "丁", "戊", "己"],
+        "change_pct": [3.0, 5.0, 4.0, -6.0, 2.0, 9.9],
+        "amount": [5e8, 3e8, 5e8, 5e8, 5e7, 5e8],
+        "vol_ratio": [1.5, 2.5, 3.0, 2.0, 2.0, 4.0],
+        "pe": [20.0, 30.0, 15.0, 10.0, 25.0, 40.0],
+        "pb": [2.0, 3.0, 1.0, 1.0, 2.0, 5.0],
+    })
+
+
+def test_screen_filters_and_ranks():
+    result = screener.screen(_spot())
+    # 600003 为 ST，600004 跌幅过大，600005 成交额不足，600006 接近涨停
+    assert result["code"].tolist() == ["600002", "600001"]
+
+
+def test_screen_restricts_to_sector_members():
+    result = screener.screen(_spot(), sector_members={"600001"})
+    assert result["code"].tolist() == ["600001"]
+
+
+def test_screen_respects_limit_and_pe_band():
+    result = screener.screen(_spot(), {"pe": (0, 25), "limit": 1})
+    assert result["code"].tolist() == ["600001"]
@@ -0,0 +1,48 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import trade_calendar
+from ttl_cache import TTLCache
+
+# 2024 年国庆休市：10-01 ~ 10-07，10-08 恢复交易
+TRADE_DATES = ["2024-09-26", "2024-09-27", "2024-09-30", "2024-10-08", "2024-10-09"]
+
+
+def test_last_session_skips_holidays():
+    calendar = trade_calendar.TradeCalendar(np.array(TRADE_DATES, dtype="datetime64[D]"))
+
+    assert not calendar.is_trading_day(datetime.date(2024, 10, 3))
+    assert calendar.is_trading_day(datetime.date(2024, 10, 8))
+    assert calendar.last_session(datetime.date(2024, 10, 3)) == datetime.date(2024, 9, 30)
+    assert calendar.last_session(datetime.date(2024, 10, 8)) == datetime.date(2024, 10, 8)
+
+
+def test_calendar_without_dates_only_skips_weekends():
+    calendar = trade_calendar.TradeCalendar()
+
+    assert calendar.is_trading_day(datetime.date(2024, 10, 3))
+    assert calendar.last_session(datetime.date(2024, 10, 6)) == datetime.date(2024, 10, 4)
+
+
+def test_calendar_loaded_once_and_cached(monkeypatch, tmp_path):
+    calls = []
+
+    def fake_call(endpoint):
+        calls.append(endpoint)
+        return pd.DataFrame({"trade_date": pd.to_datetime(TRADE_DATES).date})
+
+    import data_fetcher
+    monkeypatch.setattr(data_fetcher, "call_akshare", fake_call)
+    today = datetime.date(2024, 10, 3)
+
+    first = trade_calendar.load_trade_calendar(TTLCache("calendar", root=str(tmp_path)), today=today)
+    second = trade_calendar.load_trade_calendar(TTLCache("calendar", root=str(tmp_path)), today=today)
+
+    assert calls == ["tool_trade_date_hist_sina"]
+    assert second.last_session(today) == first.last_session(today) == datetime.date(2024, 9, 30)
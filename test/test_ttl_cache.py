@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ttl_cache import TTLCache
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = TTLCache("t", root=str(tmp_path))
+    cache.set("k", 1, ttl=0.05)
+    assert cache.get("k") == (True, 1)
+    time.sleep(0.06)
+    assert cache.get("k") == (False, None)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_survive_restart(tmp_path):
+    TTLCache("t", root=str(tmp_path)).set(("info", "600519"), {"行业": "酿酒行业"})
+    restarted = TTLCache("t", root=str(tmp_path))
+    assert restarted.get(("info", "600519")) == (True, {"行业": "酿酒行业"})
+
+
+def test_lru_eviction_removes_least_recently_used(tmp_path):
+    cache = TTLCache("t", root=str(tmp_path), max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert len(os.listdir(tmp_path / "t")) == 2
+
+
+def test_get_or_fetch_skips_uncacheable_values(tmp_path):
+    cache = TTLCache("t", root=None)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return None
+
+    cache.get_or_fetch("k", fetch)
+    cache.get_or_fetch("k", fetch)
+    assert len(calls) == 2
+
+
+def test_set_accepts_absolute_expiry(tmp_path):
+    cache = TTLCache("t", root=str(tmp_path))
+    cache.set("k", 1, expires_at=time.time() - 1)
+    assert cache.get("k") == (False, None)
+    cache.set("k", 2, expires_at=time.time() + 60)
+    assert cache.get("k") == (True, 2)
@@ -0,0 +1,87 @@
+import datetime
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from ttl_cache import TTLCache, DEFAULT_CACHE_DIR
+
+# 交易日历缓存有效期 (秒)，日历按年发布，过期或不覆盖今天时重新获取
+DEFAULT_TRADE_CALENDAR_TTL = 7 * 86400
+CALENDAR_ENDPOINT = "tool_trade_date_hist_sina"
+
+class TradeCalendar:
+    """
+    交易日历：判断是否为交易日，解析最近一个交易日
+    dates 为空时 (日历获取失败) 退化为只排除周六、周日
+    """
+
+    def __init__(self, dates: Optional[np.ndarray] = None):
+        self.dates = np.sort(np.asarray(dates, dtype='datetime64[D]')) if dates is not None and len(dates) else None
+
+    def covers(self, day: datetime.date) -> bool:
+        return self.dates is not None and self.dates[0] <= np.datetime64(day, 'D') <= self.dates[-1]
+
+    def is_trading_day(self, day: datetime.date) -> bool:
+        if not self.covers(day):
+            return day.weekday() < 5
+        target = np.datetime64(day, 'D')
+        index = np.searchsorted(self.dates, target)
+        return index < len(self.dates) and self.dates[index] == target
+
+    def last_session(self, day: datetime.date) -> datetime.date:
+        """
+        返回 day 当天或之前最近的一个交易日
+        """
+        if not self.covers(day):
+            while day.weekday() >= 5:
+                day -= datetime.timedelta(days=1)
+            return day
+        index = np.searchsorted(self.dates, np.datetime64(day, 'D'), side='right') - 1
+        return self.dates[max(index, 0)].astype(datetime.date)
+
+def _fetch_trade_dates() -> np.ndarray:
+    from data_fetcher import call_akshare
+
+    df = call_akshare(CALENDAR_ENDPOINT)
+    if df is None or df.empty:
+        return np.empty(0, dtype='datetime64[D]')
+    return pd.to_datetime(df['trade_date']).to_numpy().astype('datetime64[D]')
+
+def load_trade_calendar(cache: Optional[TTLCache] = None, today: Optional[datetime.date] = None) -> TradeCalendar:
+    """
+    读取交易日历：优先使用本地缓存，缓存过期或不覆盖今天时从 akshare 重新获取
+    获取失败时退化为只排除周末的日历
+    """
+    today = today or datetime.date.today()
+    if cache is None:
+        cache = TTLCache("calendar", root=getattr(config, 'CACHE_DIR', DEFAULT_CACHE_DIR), max_entries=1)
+    found, dates = cache.get(CALENDAR_ENDPOINT)
+    if found and TradeCalendar(dates).covers(today):
+        return TradeCalendar(dates)
+    try:
+        dates = _fetch_trade_dates()
+    except Exception as e:
+        print(f"获取交易日历失败，按周末判断非交易日: {e}")
+        return TradeCalendar(dates if found else None)
+    if len(dates):
+        cache.set(CALENDAR_ENDPOINT, dates, ttl=getattr(config, 'TRADE_CALENDAR_TTL', DEFAULT_TRADE_CALENDAR_TTL))
+    return TradeCalendar(dates)
+
+_calendar: Optional[TradeCalendar] = None
+_calendar_day: Optional[datetime.date] = None
+_calendar_lock = threading.Lock()
+
+def get_trade_calendar() -> TradeCalendar:
+    """
+    获取进程内共享的交易日历 (每天最多加载一次)
+    """
+    global _calendar, _calendar_day
+    today = datetime.date.today()
+    with _calendar_lock:
+        if _calendar is None or _calendar_day != today:
+            _calendar = load_trade_calendar(today=today)
+            _calendar_day = today
+        return _calendar
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from metrics import increment
+
+# 默认缓存根目录 (容器内通过 docker-compose 挂载 ./data:/app/data 持久化)
+DEFAULT_CACHE_DIR = "/app/data/cache"
+DEFAULT_MAX_ENTRIES = 2000
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存，内存 + 磁盘两级
+    - 每个条目单独写入一个 pickle 文件，容器重启后仍可命中
+    - 条目数超过 max_entries 时按最近最少使用淘汰 (同时删除磁盘文件)
+    - 记录命中/未命中次数，便于评估缓存效果
+    """
+
+    def __init__(self, name: str, root: Optional[str] = DEFAULT_CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES, default_ttl: float = 86400):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key_hash -> (expires_at, value)，按访问顺序排列，末尾为最近使用
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.directory = None
+        if root:
+            directory = os.path.join(root, name)
+            try:
+                os.makedirs(directory, exist_ok=True)
+                self.directory = directory
+            except:
+                # 无法创建目录 (例如非容器环境)，仅使用内存缓存
+                self.directory = None
+        self._load_index()
+
+    @staticmethod
+    def _hash_key(key: Hashable) -> str:
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def _path(self, key_hash: str) -> str:
+        return os.path.join(self.directory, f"{key_hash}.pkl")
+
+    def _load_index(self):
+        """
+        启动时扫描磁盘目录，按修改时间恢复 LRU 顺序 (值在首次访问时再读取)
+        """
+        if not self.directory:
+            return
+        try:
+            files = [f for f in os.listdir(self.directory) if f.endswith('.pkl')]
+            files.sort(key=lambda f: os.path.getmtime(os.path.join(self.directory, f)))
+        except Exception:
+            return
+        for filename in files:
+            self._entries[filename[:-4]] = None
+        self._evict()
+
+    def _read_disk(self, key_hash: str) -> Optional[Tuple[float, Any]]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key_hash), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _write_disk(self, key_hash: str, entry: Tuple[float, Any]):
+        if not self.directory:
+            return
+        try:
+            tmp_path = self._path(key_hash) + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key_hash))
+        except Exception as e:
+            print(f"写入缓存失败 ({self.name}): {e}")
+
+    def _remove_file(self, key_hash: str):
+        if self.directory:
+            try:
+                os.remove(self._path(key_hash))
+            except OSError:
+                pass
+
+    def _evict_locked(self) -> list:
+        """
+        淘汰超出容量的条目 (需持有锁)，返回需要删除磁盘文件的 key 列表
+        """
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            evicted.append(oldest)
+        return evicted
+
+    def _evict(self):
+        with self._lock:
+            evicted = self._evict_locked()
+        for key_hash in evicted:
+            self._remove_file(key_hash)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        查询缓存，返回 (是否命中, 值)
+        锁只保护内存中的 LRU 记录，磁盘读写在锁外进行
+        """
+        key_hash = self._hash_key(key)
+        with self._lock:
+            known = key_hash in self._entries
+            entry = self._entries.get(key_hash)
+        if entry is None and known:
+            entry = self._read_disk(key_hash)
+        now = time.time()
+        with self._lock:
+            if entry is not None and entry[0] > now:
+                if key_hash in self._entries:
+                    self._entries[key_hash] = entry
+                    self._entries.move_to_end(key_hash)
+                self.hits += 1
+                increment("cache_hits", cache=self.name)
+                return True, entry[1]
+            # 期间若有其他线程写入了新值则保留，只清理本次读到的过期/损坏条目
+            current = self._entries.get(key_hash)
+            expired = known and (current is None or current is entry)
+            if expired:
+                self._entries.pop(key_hash, None)
+            self.misses += 1
+        increment("cache_misses", cache=self.name)
+        if expired:
+            self._remove_file(key_hash)
+        return False, None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        """
+        写入缓存，ttl 为秒数 (默认使用 default_ttl)，也可直接指定过期时间戳 expires_at
+        """
+        key_hash = self._hash_key(key)
+        if expires_at is None:
+            expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        entry = (expires_at, value)
+        with self._lock:
+            self._entries[key_hash] = entry
+            self._entries.move_to_end(key_hash)
+            evicted = self._evict_locked()
+        self._write_disk(key_hash, entry)
+        for evicted_hash in evicted:
+            self._remove_file(evicted_hash)
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], ttl: Optional[float] = None,
+                     should_cache: Callable[[Any], bool] = lambda value: value is not None,
+                     expires_at: Optional[float] = None) -> Any:
+        """
+        命中则直接返回缓存值，否则调用 fetch 获取并写入缓存
+        should_cache 用于过滤不应缓存的结果 (如空数据)
+        """
+        hit, value = self.get(key)
+        if hit:
+            return value
+        value = fetch()
+        if should_cache(value):
+            self.set(key, value, ttl, expires_at=expires_at)
+        return value
+
+    def clear(self):
+        with self._lock:
+            key_hashes = list(self._entries)
+            self._entries.clear()
+        for key_hash in key_hashes:
+            self._remove_file(key_hash)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}